@@ -0,0 +1,276 @@
+import time
+import asyncio
+import logging
+from typing import Callable, Optional
+
+import aiohttp
+import ujson
+
+from app.binance_client import BinanceFutures
+
+log = logging.getLogger("app.account_stream")
+
+
+def order_from_event(o: dict) -> dict:
+    """ORDER_TRADE_UPDATE "o" payload in the shape of the REST order responses."""
+    return {
+        "orderId": o.get("i"),
+        "clientOrderId": o.get("c"),
+        "symbol": o.get("s"),
+        "side": o.get("S"),
+        "type": o.get("o"),
+        "status": o.get("X"),
+        "origQty": o.get("q"),
+        "executedQty": o.get("z"),
+        "avgPrice": o.get("ap"),
+        "price": o.get("p"),
+        "stopPrice": o.get("sp"),
+        "reduceOnly": o.get("R"),
+    }
+
+
+class AccountMirror:
+    """Live local copy of balances, positions and open orders.
+
+    Fed by the listenKey user data stream (ACCOUNT_UPDATE /
+    ORDER_TRADE_UPDATE) and reconciled against REST every `reconcile_sec`,
+    so /balance and pre-trade exposure checks are plain dict reads.
+    Data is kept in the same shape as the REST responses.
+
+    Stream updates that arrive while a REST snapshot is in flight are held
+    back and applied on top of it, so an older snapshot never overwrites
+    newer stream state. Order listeners are still called immediately.
+    """
+
+    def __init__(
+        self,
+        binance: BinanceFutures,
+        ws_url: str,
+        reconcile_sec: float = 300.0,
+        keepalive_sec: float = 1800.0,
+        refresh_delay: float = 0.5,
+    ):
+        self.binance = binance
+        self.ws_url = ws_url.rstrip("/")
+        self.reconcile_sec = reconcile_sec
+        self.keepalive_sec = keepalive_sec
+        # ACCOUNT_UPDATE bursts within this window share one /fapi/v2/account refresh
+        self.refresh_delay = refresh_delay
+
+        self.balances: dict[str, dict] = {}
+        self.account: dict = {}
+        # (symbol, positionSide) -> position
+        self.positions: dict[tuple[str, str], dict] = {}
+        # orderId -> order
+        self.open_orders: dict[int, dict] = {}
+
+        self.ready = False
+        self.synced_at: float = 0.0
+        self.event_at: float = 0.0
+        self._listen_key: Optional[str] = None
+        # stream events held back while a REST snapshot is in flight
+        self._pending: Optional[list[dict]] = None
+        self._reconcile_lock = asyncio.Lock()
+        self._refresh: Optional[asyncio.Task] = None
+        self._refresh_again = False
+        # called with the order dict for every ORDER_TRADE_UPDATE
+        self.order_listeners: list[Callable[[dict], None]] = []
+        # called after the snapshot that follows a reconnect: order events sent while down never arrive
+        self.resync_listeners: list[Callable[[], None]] = []
+        self._connects = 0
+
+    # --- reads -----------------------------------------------------------
+
+    def position_amt(self, symbol: str) -> float:
+        """Net position amount for symbol across position sides."""
+        return sum(float(p.get("positionAmt", 0)) for (s, _), p in self.positions.items() if s == symbol)
+
+    def orders_for(self, symbol: str) -> list[dict]:
+        return [o for o in self.open_orders.values() if o.get("symbol") == symbol]
+
+    def snapshot(self) -> tuple[list[dict], dict, list[dict]]:
+        """(balances, account, positions) shaped like the /fapi/v2 REST responses."""
+        return list(self.balances.values()), dict(self.account), list(self.positions.values())
+
+    # --- REST reconciliation ---------------------------------------------
+
+    async def reconcile(self):
+        """Replace state with a REST snapshot, then re-apply the stream events that arrived meanwhile."""
+        async with self._reconcile_lock:
+            self._pending = []
+            try:
+                balances, account, positions, orders = await asyncio.gather(
+                    self.binance.futures_account_balance(),
+                    self.binance.futures_account_info(),
+                    self.binance.positions_risk(),
+                    self.binance.open_orders(),
+                )
+                self.balances = {b["asset"]: b for b in balances}
+                self.account = {}
+                self._apply_account(account)
+                self.positions = {(p["symbol"], p.get("positionSide", "BOTH")): p for p in positions}
+                self.open_orders = {o["orderId"]: o for o in orders}
+                self.synced_at = time.monotonic()
+                self.ready = True
+            finally:
+                # stream events carry absolute values, so replaying them in order ends at the newest state
+                pending, self._pending = self._pending, None
+                for data in pending:
+                    self._apply(data)
+                if any(data.get("e") == "ACCOUNT_UPDATE" for data in pending):
+                    # the snapshot may predate them; fetch totals again
+                    self._schedule_refresh()
+
+    def _apply_account(self, account: dict):
+        for k in ("totalWalletBalance", "totalUnrealizedProfit", "availableBalance"):
+            self.account[k] = account.get(k)
+        for a in account.get("assets", []):
+            bal = self.balances.get(a.get("asset"))
+            if bal is not None:
+                bal["availableBalance"] = a.get("availableBalance")
+                bal["crossWalletBalance"] = a.get("crossWalletBalance", bal.get("crossWalletBalance"))
+
+    def _schedule_refresh(self):
+        if self._refresh is not None and not self._refresh.done():
+            self._refresh_again = True
+            return
+        self._refresh = asyncio.create_task(self._refresh_account())
+
+    async def _refresh_account(self):
+        """Wallet totals and available balance are not in ACCOUNT_UPDATE; fetch them after one."""
+        self._refresh_again = True
+        while self._refresh_again:
+            self._refresh_again = False
+            await asyncio.sleep(self.refresh_delay)
+            try:
+                account = await self.binance.futures_account_info()
+            except Exception as e:
+                log.warning(f"Account refresh after ACCOUNT_UPDATE failed: {e}")
+                return
+            # an update that lands during the request sets _refresh_again, so this never ends stale
+            self._apply_account(account)
+
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_sec)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                log.error(f"❌ Account reconcile failed: {e}")
+
+    # --- user data stream ------------------------------------------------
+
+    def on_event(self, data: dict):
+        event = data.get("e")
+        if event == "ACCOUNT_UPDATE":
+            self._apply_or_hold(data)
+            self._schedule_refresh()
+        elif event == "ORDER_TRADE_UPDATE":
+            self._apply_or_hold(data)
+            order = order_from_event(data.get("o", {}))
+            for listener in self.order_listeners:
+                try:
+                    listener(order)
+                except Exception as e:
+                    log.error(f"Order listener {getattr(listener, '__name__', listener)} failed: {e}")
+        elif event == "listenKeyExpired":
+            raise ConnectionError("listenKey expired")
+        else:
+            return
+        self.event_at = time.monotonic()
+
+    def _apply_or_hold(self, data: dict):
+        if self._pending is not None:
+            self._pending.append(data)
+        else:
+            self._apply(data)
+
+    def _apply(self, data: dict):
+        event = data.get("e")
+        if event == "ACCOUNT_UPDATE":
+            update = data.get("a", {})
+            for b in update.get("B", []):
+                bal = self.balances.setdefault(b["a"], {"asset": b["a"]})
+                bal["balance"] = b["wb"]
+                bal["crossWalletBalance"] = b["cw"]
+            for p in update.get("P", []):
+                key = (p["s"], p.get("ps", "BOTH"))
+                pos = self.positions.setdefault(key, {"symbol": p["s"], "positionSide": key[1]})
+                pos["positionAmt"] = p["pa"]
+                pos["entryPrice"] = p["ep"]
+                pos["unRealizedProfit"] = p["up"]
+            self.account["totalUnrealizedProfit"] = str(
+                sum(float(p.get("unRealizedProfit", 0)) for p in self.positions.values())
+            )
+        elif event == "ORDER_TRADE_UPDATE":
+            order = order_from_event(data.get("o", {}))
+            if order["status"] in ("NEW", "PARTIALLY_FILLED"):
+                self.open_orders[order["orderId"]] = order
+            else:
+                self.open_orders.pop(order["orderId"], None)
+
+    async def _keepalive_loop(self):
+        while True:
+            await asyncio.sleep(self.keepalive_sec)
+            try:
+                await self.binance.keepalive_listen_key()
+            except Exception as e:
+                log.error(f"❌ listenKey keepalive failed: {e}")
+
+    async def _stream_once(self):
+        resp = await self.binance.new_listen_key()
+        self._listen_key = resp["listenKey"]
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(f"{self.ws_url}/ws/{self._listen_key}", heartbeat=30) as ws:
+                log.info("📡 User data stream connected")
+                # events may have been missed while disconnected; snapshot only once the socket
+                # is open, so nothing falls between the snapshot and the first stream event
+                self._connects += 1
+                resync = asyncio.create_task(self.reconcile())
+                resync.add_done_callback(self._resynced)
+                try:
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self.on_event(ujson.loads(msg.data))
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+                finally:
+                    resync.cancel()
+
+    def _resynced(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            log.error(f"❌ Account reconcile after connect failed: {task.exception()}")
+            return
+        if self._connects == 1:
+            return  # startup: whoever listens did its own lookup
+        for listener in self.resync_listeners:
+            try:
+                listener()
+            except Exception as e:
+                log.error(f"Resync listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+    async def run(self):
+        reconcile_task = asyncio.create_task(self._reconcile_loop())
+        keepalive_task = asyncio.create_task(self._keepalive_loop())
+        backoff = 1.0
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    await self._stream_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.error(f"❌ User data stream error: {e}")
+                if time.monotonic() - started > 60:
+                    backoff = 1.0
+                log.warning(f"User data stream disconnected, reconnecting in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+        finally:
+            reconcile_task.cancel()
+            keepalive_task.cancel()
+            if self._refresh is not None:
+                self._refresh.cancel()
@@ -1,64 +1,442 @@
 import time
+import hmac
+import json
+import uuid
+import random
+import asyncio
+import hashlib
 import logging
-from decimal import Decimal
-from binance import Client, SecurityType
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from urllib.parse import urlencode
+
+import aiohttp
+import ujson
+from yarl import URL
+from binance import SecurityType
+from binance.common.exceptions import StatusException, InvalidResponseException
+
+from app.exchange_info import ExchangeInfoCache
+from app.latency import latency
+from app.metrics import BINANCE_LATENCY, BINANCE_RESPONSES
+from app.rate_limit import Priority, RequestScheduler, weight_for
 
 log = logging.getLogger("app.binance")
 
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+# Static part of every order we send, per order kind
+ORDER_TEMPLATES = {
+    "MARKET": {"type": "MARKET"},
+    "TP": {"type": "LIMIT", "timeInForce": "GTC", "reduceOnly": "true", "workingType": "MARK_PRICE"},
+    "SL": {"type": "STOP_MARKET", "reduceOnly": "true", "workingType": "MARK_PRICE"},
+}
+
+# Error codes after which the order may or may not have been executed
+UNKNOWN_STATUS_CODES = {-1001, -1007}
+ORDER_NOT_FOUND = -2013
+UNKNOWN_ORDER = -2011  # cancel of an order that is no longer open
+DUPLICATE_CLIENT_ID = -4116
+RETRY_BASE_SEC = 0.1
+RETRY_CAP_SEC = 2.0
+ORDER_PATH = "/fapi/v1/order"
+
+
+def describe(exc: Exception) -> str:
+    return str(exc) or type(exc).__name__
+
+
+def status_unknown(exc: Exception) -> bool:
+    """True if a failed order call may still have reached the matching engine."""
+    if isinstance(exc, (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)):
+        return True
+    if isinstance(exc, StatusException):
+        return exc.status >= 500 or exc.code in UNKNOWN_STATUS_CODES
+    return False
+
+
+@dataclass
+class LegResult:
+    """Outcome of one leg (TP / SL) of an order bracket."""
+    leg: str
+    ok: bool
+    order: Optional[dict] = None
+    error: Optional[str] = None
+
+
 class BinanceFutures:
-    def __init__(self, api_key: str, api_secret: str, base_url: str):
-        # Initialize binance-sdk Client with api_key, api_secret and api_host
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        base_url: str,
+        timeout: float = 10.0,
+        scheduler: Optional[RequestScheduler] = None,
+        entry_deadline: float = 5.0,
+        protective_deadline: float = 15.0,
+        attempt_timeout: float = 2.0,
+    ):
         self.base_url = base_url.rstrip("/")
-        self.client = Client(
-            api_key=api_key,
-            api_secret=api_secret,
-            api_host=self.base_url
-        )
+        self.api_key = api_key
+        self._secret = api_secret.encode("utf-8")
+        self.timeout = timeout
+        # binance-sdk opens a new HTTP session per call, so we keep our own
+        # pooled keep-alive session and sign requests ourselves
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._urls: dict[str, str] = {}
+        self._templates: dict[tuple[str, str], dict] = {}
+        self.time_offset_ms = 0.0
+        self.exchange_info = ExchangeInfoCache(self._fetch_exchange_info)
+        self.scheduler = scheduler or RequestScheduler()
+        # total time budget (s) for one order, including retries
+        self.deadlines = {Priority.ENTRY: entry_deadline, Priority.PROTECTIVE: protective_deadline}
+        self.attempt_timeout = attempt_timeout
+        # orders are only accepted within this long of their timestamp, so an attempt we gave up
+        # on can no longer execute once it has passed (Binance dedups client IDs only while open)
+        self.order_recv_window_ms = max(1, int(attempt_timeout * 1000))
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=50, keepalive_timeout=120, ttl_dns_cache=300),
+                headers={"Accept": "application/json", "User-Agent": "tg-signal-binance"},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def timestamp_ms(self) -> int:
+        """Local clock corrected by the last measured server-time offset."""
+        return int(time.time() * 1000 + self.time_offset_ms)
+
+    def _url(self, path: str) -> str:
+        url = self._urls.get(path)
+        if url is None:
+            url = self._urls[path] = f"{self.base_url}{path}"
+        return url
+
+    def _encode(self, params: dict, signed: bool) -> str:
+        if signed:
+            params["timestamp"] = self.timestamp_ms()
+            query = urlencode(params)
+            sig = hmac.new(self._secret, query.encode("utf-8"), hashlib.sha256).hexdigest()
+            return f"{query}&signature={sig}"
+        return urlencode(params)
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: dict = None,
+        security_type=SecurityType.TRADE,
+        priority: Priority = Priority.ACCOUNT,
+        orders: int = 0,
+        timeout: Optional[float] = None,
+    ):
+        """Internal helper: wait for rate-limit budget, then sign and send over the pooled session.
+
+        `orders` is how many orders the call places (counted against the
+        order-rate limits); `timeout` overrides the session timeout for this
+        call. Raises RequestShed if the scheduler drops it.
+        """
+        weight = weight_for(method, path, params)
+        await self.scheduler.acquire(priority, weight, orders)
+        # signed after the wait so the timestamp is fresh
+        need_api_key, need_signed = security_type.value
+        query = self._encode(dict(params) if params else {}, need_signed)
+        headers = {"X-MBX-APIKEY": self.api_key} if need_api_key else {}
+        url = self._url(path)
+        log.debug("Binance Req: %s %s", method, path, extra={"sample": True})
+
+        kwargs = {}
+        if timeout is not None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=max(timeout, 0.05))
+        if method in ("GET", "DELETE"):
+            if query:
+                # already encoded and signed; stop yarl from re-quoting it
+                url = URL(f"{url}?{query}", encoded=True)
+        else:
+            headers.update(FORM_HEADERS)
+            kwargs["data"] = query
+
+        resp_headers, status = None, 0
+        t0 = time.perf_counter()
+        try:
+            with latency.span(f"binance.{method} {path}"):
+                async with self._get_session().request(method, url, headers=headers, **kwargs) as response:
+                    resp_headers, status = response.headers, response.status
+                    text = await response.text()
+                    if not 200 <= response.status < 300:
+                        raise StatusException(response, text)
+                    try:
+                        return ujson.loads(text)
+                    except ValueError:
+                        raise InvalidResponseException(response, text)
+        finally:
+            BINANCE_LATENCY.observe(time.perf_counter() - t0, method, path)
+            BINANCE_RESPONSES.inc(status)
+            self.scheduler.release(weight, orders, resp_headers, status)
+
+    # --- warm-up -------------------------------------------------------------
+
+    async def sync_time(self) -> float:
+        """Measure the server-time offset (ms), assuming a symmetric round trip."""
+        t0 = time.time() * 1000
+        resp = await self._request("GET", "/fapi/v1/time", security_type=SecurityType.NONE, priority=Priority.METADATA)
+        t1 = time.time() * 1000
+        self.time_offset_ms = resp["serverTime"] - (t0 + t1) / 2
+        return self.time_offset_ms
+
+    async def warm_up(self, symbols: Iterable[str] = ()):
+        """Open the pooled TLS connection, sync server time and build order templates."""
+        for symbol in symbols:
+            self.prepare_symbol(symbol)
+        offset = await self.sync_time()
+        log.info(f"🔥 Binance connection warmed up (server time offset {offset:+.0f}ms)")
 
-    async def _request(self, method: str, path: str, params: dict = None, security_type=SecurityType.TRADE):
-        """Internal helper to dispatch requests through binance-sdk."""
-        if params is None:
-            params = {}
-            
-        # Construct full URL
-        url = f"{self.base_url}{path}"
-        log.info(f"Binance Req: {method} {url}")
-        
-        # binance-sdk methods: client.get, client.post, etc.
-        func = getattr(self.client, method.lower())
-        return await func(url, security_type=security_type, **params)
-
-
-    async def market_order(self, symbol: str, side: str, qty: float):
-        return await self._request("POST", "/fapi/v1/order", {
-            "symbol": symbol,
-            "side": side,
-            "type": "MARKET",
-            "quantity": qty,
-        })
+    async def run_keepalive(self, interval_sec: float):
+        """Background task: keep the pooled connection open and the time offset fresh."""
+        while True:
+            await asyncio.sleep(interval_sec)
+            try:
+                offset = await self.sync_time()
+                if abs(offset) > 1000:
+                    log.warning(f"Server time offset is {offset:+.0f}ms")
+            except Exception as e:
+                log.error(f"❌ Binance keep-alive failed: {e}")
+
+    def prepare_symbol(self, symbol: str):
+        for kind, static in ORDER_TEMPLATES.items():
+            self._templates[(symbol, kind)] = {"symbol": symbol, **static}
+        for path in ("/fapi/v1/order", "/fapi/v1/batchOrders"):
+            self._url(path)
+
+    def _order(self, symbol: str, kind: str, **fields) -> dict:
+        """Copy of the precomputed template for (symbol, kind) with per-order fields filled in."""
+        template = self._templates.get((symbol, kind))
+        if template is None:
+            self.prepare_symbol(symbol)
+            template = self._templates[(symbol, kind)]
+        params = dict(template)
+        params.update(fields)
+        return params
+
+    # --- orders --------------------------------------------------------------
+
+    @staticmethod
+    def _client_id(params: dict, client_order_id: Optional[str]) -> dict:
+        # every order gets an ID so an unknown outcome can be looked up
+        params["newClientOrderId"] = client_order_id or f"tg{uuid.uuid4().hex[:20]}"
+        return params
+
+    async def query_order(
+        self, symbol: str, client_order_id: str, priority: Priority = Priority.ACCOUNT, timeout: Optional[float] = None,
+    ) -> Optional[dict]:
+        """The order with this newClientOrderId, or None if Binance has no such order."""
+        try:
+            return await self._request(
+                "GET", ORDER_PATH, {"symbol": symbol, "origClientOrderId": client_order_id},
+                priority=priority, timeout=timeout,
+            )
+        except StatusException as e:
+            if e.code == ORDER_NOT_FOUND:
+                return None
+            raise
+
+    async def send_order(
+        self, params: dict, priority: Priority, deadline: Optional[float] = None, reconcile_first: bool = False,
+    ) -> dict:
+        """POST one order within its deadline, retrying 5xx errors and timeouts with jittered backoff.
+
+        When an attempt's outcome is unknown, the order is looked up by its
+        newClientOrderId before anything is resent, so a retry never doubles
+        it. A lookup that finds nothing only counts once the lost attempt's
+        recvWindow has passed; until then it may still be executing, and a
+        filled MARKET order no longer blocks its client ID. `deadline` is a
+        time.monotonic() value (default: now plus the priority's budget);
+        `reconcile_first` starts with that lookup.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.deadlines.get(priority, self.timeout)
+        cid = params.setdefault("newClientOrderId", f"tg{uuid.uuid4().hex[:20]}")
+        params.setdefault("recvWindow", self.order_recv_window_ms)
+        window = params["recvWindow"] / 1000
+        unknown = reconcile_first
+        # until then an earlier attempt (or the caller's batch) may still be accepted
+        in_flight_until = time.monotonic() + window if reconcile_first else 0.0
+        error: Exception = asyncio.TimeoutError(f"order {cid} outcome unknown at deadline")
+        attempt = 0
+        while True:
+            sent = False
+            try:
+                if unknown:
+                    remaining = deadline - time.monotonic()
+                    existing = await self.query_order(
+                        params["symbol"], cid, priority=priority, timeout=min(remaining, self.attempt_timeout),
+                    )
+                    if existing is not None:
+                        log.info(f"Order {cid} found on reconcile: {existing.get('status')}")
+                        return existing
+                    wait = in_flight_until - time.monotonic()
+                    if wait > 0:
+                        if time.monotonic() + wait >= deadline:
+                            break
+                        # not there yet is not the same as never: look again once it can no longer land
+                        await asyncio.sleep(wait)
+                        continue
+                    unknown = False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"order {cid} deadline exceeded")
+                sent = True
+                return await self._request(
+                    "POST", ORDER_PATH, params,
+                    priority=priority, orders=1, timeout=min(remaining, self.attempt_timeout),
+                )
+            except StatusException as e:
+                # a duplicate ID means an earlier attempt landed after all
+                if e.code != DUPLICATE_CLIENT_ID and not status_unknown(e):
+                    raise
+                error = e
+            except Exception as e:
+                if not status_unknown(e):
+                    raise
+                error = e
+            unknown = True
+            if sent:
+                # signed before it failed, so the exchange drops it after this at the latest
+                in_flight_until = time.monotonic() + window
+            attempt += 1
+            delay = random.uniform(0, min(RETRY_CAP_SEC, RETRY_BASE_SEC * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                raise error
+            log.warning(f"Order {cid} attempt {attempt} failed ({describe(error)}), reconciling in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        # still unknown: it could land after the deadline, so it must not be resent
+        raise error
+
+    async def market_order(self, symbol: str, side: str, qty: float, client_order_id: Optional[str] = None):
+        return await self.send_order(self._client_id(self._order(
+            symbol, "MARKET",
+            side=side,
+            quantity=self.exchange_info.format_qty(symbol, qty, market=True),
+        ), client_order_id), Priority.ENTRY)
+
+    def _tp_params(self, symbol: str, side: str, qty: float, price: float, client_order_id: Optional[str] = None) -> dict:
+        return self._client_id(self._order(
+            symbol, "TP",
+            side=side,
+            quantity=self.exchange_info.format_qty(symbol, qty),
+            price=self.exchange_info.format_price(symbol, price),
+        ), client_order_id)
+
+    def _sl_params(
+        self, symbol: str, side: str, qty: float, stop_price: float, client_order_id: Optional[str] = None,
+    ) -> dict:
+        return self._client_id(self._order(
+            symbol, "SL",
+            side=side,
+            stopPrice=self.exchange_info.format_price(symbol, stop_price),
+            quantity=self.exchange_info.format_qty(symbol, qty),
+        ), client_order_id)
 
     async def limit_reduce_only(self, symbol: str, side: str, qty: float, price: float):
-        return await self._request("POST", "/fapi/v1/order", {
-            "symbol": symbol,
-            "side": side,
-            "type": "LIMIT",
-            "timeInForce": "GTC",
-            "quantity": qty,
-            "price": f"{price}",
-            "reduceOnly": "true", # Binance expects string "true" for this endpoint
-            "workingType": "MARK_PRICE",
-        })
-
-    async def stop_market_reduce_only(self, symbol: str, side: str, qty: float, stop_price: float):
-        return await self._request("POST", "/fapi/v1/order", {
-            "symbol": symbol,
-            "side": side,
-            "type": "STOP_MARKET",
-            "stopPrice": f"{stop_price}",
-            "quantity": qty,
-            "reduceOnly": "true",
-            "workingType": "MARK_PRICE",
-        })
+        return await self.send_order(self._tp_params(symbol, side, qty, price), Priority.PROTECTIVE)
+
+    async def stop_market_reduce_only(
+        self, symbol: str, side: str, qty: float, stop_price: float, client_order_id: Optional[str] = None,
+    ):
+        return await self.send_order(self._sl_params(symbol, side, qty, stop_price, client_order_id), Priority.PROTECTIVE)
+
+    async def cancel_order(
+        self, symbol: str, client_order_id: str, priority: Priority = Priority.PROTECTIVE,
+    ) -> Optional[dict]:
+        """Cancel by newClientOrderId; None if the order is no longer open (filled, canceled, never placed)."""
+        try:
+            return await self._request(
+                "DELETE", ORDER_PATH, {"symbol": symbol, "origClientOrderId": client_order_id}, priority=priority,
+            )
+        except StatusException as e:
+            if e.code in (UNKNOWN_ORDER, ORDER_NOT_FOUND):
+                return None
+            raise
+
+    async def place_bracket(
+        self,
+        symbol: str,
+        side: str,
+        qty: float,
+        tp_price: Optional[float] = None,
+        sl_price: Optional[float] = None,
+        batch: bool = True,
+        client_ids: Optional[dict[str, str]] = None,
+    ) -> list[LegResult]:
+        """Place the protective TP/SL legs in one round trip.
+
+        `side` is the closing side. Uses /fapi/v1/batchOrders when both legs
+        are present, otherwise (or with batch=False) sends them concurrently.
+        Each leg gets its own LegResult; one failing leg never hides the other.
+        `client_ids` maps "TP" / "SL" to their newClientOrderId.
+        """
+        client_ids = client_ids or {}
+        legs = []
+        if tp_price:
+            legs.append(("TP", self._tp_params(symbol, side, qty, tp_price, client_ids.get("TP"))))
+        if sl_price:
+            legs.append(("SL", self._sl_params(symbol, side, qty, sl_price, client_ids.get("SL"))))
+        if not legs:
+            return []
+
+        deadline = time.monotonic() + self.deadlines[Priority.PROTECTIVE]
+        if batch and len(legs) > 1:
+            try:
+                resp = await self._request("POST", "/fapi/v1/batchOrders", {
+                    "batchOrders": json.dumps([params for _, params in legs], separators=(",", ":")),
+                    "recvWindow": self.order_recv_window_ms,
+                }, priority=Priority.PROTECTIVE, orders=len(legs), timeout=self.attempt_timeout)
+            except Exception as e:
+                if not status_unknown(e):
+                    return [LegResult(name, False, error=str(e)) for name, _ in legs]
+                # the batch may have partly landed: settle each leg by its client order ID
+                log.warning(f"Batch order outcome unknown ({describe(e)}), reconciling legs")
+                return await self._send_legs(legs, deadline, reconcile_first=True)
+            results: list[Optional[LegResult]] = []
+            retry = []
+            for (name, params), item in zip(legs, resp):
+                if isinstance(item, dict) and "orderId" in item:
+                    results.append(LegResult(name, True, order=item))
+                elif isinstance(item, dict) and item.get("code") in UNKNOWN_STATUS_CODES:
+                    results.append(None)
+                    retry.append((name, params))
+                else:
+                    err = item.get("msg", item) if isinstance(item, dict) else item
+                    results.append(LegResult(name, False, error=str(err)))
+            if retry:
+                retried = iter(await self._send_legs(retry, deadline, reconcile_first=True))
+                results = [r if r is not None else next(retried) for r in results]
+            return results
+
+        return await self._send_legs(legs, deadline)
+
+    async def _send_legs(self, legs: list[tuple[str, dict]], deadline: float, reconcile_first: bool = False):
+        responses = await asyncio.gather(
+            *(
+                self.send_order(params, Priority.PROTECTIVE, deadline=deadline, reconcile_first=reconcile_first)
+                for _, params in legs
+            ),
+            return_exceptions=True,
+        )
+        return [
+            LegResult(name, False, error=describe(r)) if isinstance(r, Exception)
+            else LegResult(name, True, order=r)
+            for (name, _), r in zip(legs, responses)
+        ]
+
+    async def set_leverage(self, symbol: str, leverage: int):
+        return await self._request("POST", "/fapi/v1/leverage", {"symbol": symbol, "leverage": leverage})
 
     async def futures_account_balance(self):
         return await self._request("GET", "/fapi/v2/balance")
@@ -69,16 +447,32 @@ class BinanceFutures:
     async def positions_risk(self):
         return await self._request("GET", "/fapi/v2/positionRisk")
 
-    async def round_quantity(self, symbol: str, qty: float) -> float:
-        """Round quantity down to the stepSize defined for the symbol."""
+    async def open_orders(self, symbol: str = None):
+        params = {"symbol": symbol} if symbol else {}
+        return await self._request("GET", "/fapi/v1/openOrders", params)
+
+    async def new_listen_key(self):
+        return await self._request("POST", "/fapi/v1/listenKey", security_type=SecurityType.USER_STREAM)
+
+    async def keepalive_listen_key(self):
+        return await self._request("PUT", "/fapi/v1/listenKey", security_type=SecurityType.USER_STREAM)
+
+    async def _fetch_exchange_info(self):
         # exchangeInfo is NONE security type (public)
-        info = await self._request("GET", "/fapi/v1/exchangeInfo", security_type=SecurityType.NONE)
-        for s in info.get("symbols", []):
-            if s.get("symbol") == symbol:
-                for f in s.get("filters", []):
-                    if f.get("filterType") == "LOT_SIZE":
-                        step = Decimal(str(f.get("stepSize", "1")))
-                        qty_dec = Decimal(str(qty))
-                        rounded = (qty_dec // step) * step
-                        return float(rounded)
-        return qty
+        return await self._request(
+            "GET", "/fapi/v1/exchangeInfo", security_type=SecurityType.NONE, priority=Priority.METADATA,
+        )
+
+    async def round_quantity(self, symbol: str, qty: float, market: bool = False) -> float:
+        """Round quantity down to the (market) lot stepSize defined for the symbol."""
+        filters = await self.exchange_info.filters(symbol)
+        if filters is None:
+            return qty
+        return float(filters.round_qty(qty, market))
+
+    async def round_price(self, symbol: str, price: float) -> float:
+        """Round price to the nearest tickSize defined for the symbol."""
+        filters = await self.exchange_info.filters(symbol)
+        if filters is None:
+            return price
+        return float(filters.round_price(price))
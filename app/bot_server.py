@@ -1,38 +1,52 @@
+import asyncio
+import logging
+
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 
-from app.config import load_settings
-from app.logger import setup_logger
-from app.binance_client import BinanceFutures
-
-settings = load_settings()
-log = setup_logger(settings.LOG_LEVEL)
+from app.latency import latency, format_report
 
-binance = BinanceFutures(
-    api_key=settings.BINANCE_API_KEY,
-    api_secret=settings.BINANCE_API_SECRET,
-    base_url=settings.BINANCE_BASE_URL,
-)
+log = logging.getLogger("tg-signal-binance")
 
-def is_admin(update: Update) -> bool:
+def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     if not update.effective_chat:
         return False
+    settings = context.application.bot_data["container"].settings
     return str(update.effective_chat.id) == str(settings.TG_ADMIN_CHAT_ID)
 
 async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("✅ Bot is online. Use /balance")
+    await update.message.reply_text("✅ Bot is online. Use /balance or /latency")
 
 async def balance_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_admin(update):
+    if not is_admin(update, context):
         await update.message.reply_text("❌ Not authorized")
         return
-    try:
-        balances = await binance.futures_account_balance()
-        account = await binance.futures_account_info()
-        positions = await binance.positions_risk()
-    except Exception as e:
-        await update.message.reply_text(f"❌ Error: {e}")
-        return
+    mirror = context.application.bot_data.get("account_mirror")
+    ipc = context.application.bot_data.get("ipc")
+    snapshot = None
+    if mirror is not None and mirror.ready:
+        # served from the user-data-stream mirror, no REST calls
+        snapshot = mirror.snapshot()
+    elif ipc is not None and ipc.connected.is_set():
+        # split mode: the executor process owns the mirror
+        try:
+            r = await ipc.request("balance")
+            snapshot = r["balances"], r["account"], r["positions"]
+        except Exception as e:
+            log.warning(f"Executor balance unavailable, falling back to REST: {e}")
+    if snapshot is not None:
+        balances, account, positions = snapshot
+    else:
+        binance = context.application.bot_data["container"].binance
+        try:
+            balances, account, positions = await asyncio.gather(
+                binance.futures_account_balance(),
+                binance.futures_account_info(),
+                binance.positions_risk(),
+            )
+        except Exception as e:
+            await update.message.reply_text(f"❌ Error: {e}")
+            return
     usdt = next((b for b in balances if b.get("asset") == "USDT"), None)
     total_wallet = account.get("totalWalletBalance")
     total_unrealized = account.get("totalUnrealizedProfit")
@@ -63,8 +77,29 @@ async def balance_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
     await update.message.reply_text("\n".join(msg), parse_mode="Markdown")
 
-def build_bot_app() -> Application:
-    app = Application.builder().token(settings.TG_BOT_TOKEN).build()
+async def latency_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update, context):
+        await update.message.reply_text("❌ Not authorized")
+        return
+    ipc = context.application.bot_data.get("ipc")
+    if ipc is not None:
+        # signals are timed in the executor process
+        try:
+            report = await ipc.request("latency")
+        except Exception as e:
+            await update.message.reply_text(f"❌ Error: {e}")
+            return
+    else:
+        report = format_report(latency)
+    await update.message.reply_text(f"⏱ *Latency (ms)*\n```\n{report}\n```", parse_mode="Markdown")
+
+def build_bot_app(container, account_mirror=None, ipc=None) -> Application:
+    """Command handlers share the process's Container (settings, Binance client)."""
+    app = Application.builder().token(container.settings.TG_BOT_TOKEN).build()
+    app.bot_data["container"] = container
+    app.bot_data["account_mirror"] = account_mirror
+    app.bot_data["ipc"] = ipc
     app.add_handler(CommandHandler("start", start_cmd))
     app.add_handler(CommandHandler("balance", balance_cmd))
+    app.add_handler(CommandHandler("latency", latency_cmd))
     return app
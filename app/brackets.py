@@ -0,0 +1,265 @@
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from collections import Counter, defaultdict
+from typing import Callable, Optional
+
+from app.binance_client import BinanceFutures, describe, status_unknown
+from app.dedup import client_order_id
+from app.journal import FINAL_STATUSES, Bracket, TradeJournal
+from app.rate_limit import Priority, RequestShed
+
+log = logging.getLogger("app.brackets")
+
+# leg statuses after which there is nothing left to cancel
+DONE_STATUSES = FINAL_STATUSES + ("FAILED",)
+
+
+class BracketManager:
+    """Keeps the TP / SL legs of every open bracket consistent after the entry.
+
+    When one protective leg fills, the other is canceled; optionally the stop
+    is moved to the entry price once the mark reaches a signal TP. Everything
+    is event driven: ORDER_TRADE_UPDATE from AccountMirror, mark-price ticks
+    from MarketDataFeed. Price levels sit in per-symbol heaps, so a tick costs
+    one comparison per direction no matter how many brackets are open; a
+    bracket's levels leave the heaps when it closes.
+    Accounts without a user data stream (sub-accounts) have their TP / SL
+    looked up once the mark crosses that leg's price instead.
+
+    Bracket state lives in the TradeJournal, which also persists every change.
+    """
+
+    def __init__(
+        self,
+        journal: TradeJournal,
+        clients: dict[str, BinanceFutures],
+        streamed: frozenset = frozenset(),
+        breakeven_after_tp: int = 0,
+        recheck_sec: float = 5.0,
+        max_checks: int = 3,
+    ):
+        self.journal = journal
+        self.clients = clients
+        # accounts whose fills arrive on the user data stream
+        self.streamed = streamed
+        self.breakeven_after_tp = breakeven_after_tp
+        self.recheck_sec = recheck_sec
+        self.max_checks = max_checks
+        self.notify: Optional[Callable[[str, str], None]] = None
+        # symbol -> heap of (level, seq, bracket key, action) fired when the mark rises to level
+        self._up: dict[str, list] = defaultdict(list)
+        # symbol -> heap of (-level, seq, bracket key, action) fired when the mark falls to level
+        self._down: dict[str, list] = defaultdict(list)
+        self._seq = itertools.count()
+        self._tasks: set[asyncio.Task] = set()
+        self.stats: Counter = Counter()
+
+    # --- tracking --------------------------------------------------------
+
+    def _arm(self, bracket: Bracket, level: Optional[float], rising: bool, action: str):
+        if not level:
+            return
+        key = (bracket.signal_key, bracket.account)
+        if rising:
+            heapq.heappush(self._up[bracket.symbol], (level, next(self._seq), key, action))
+        else:
+            heapq.heappush(self._down[bracket.symbol], (-level, next(self._seq), key, action))
+
+    def _disarm(self, bracket: Bracket):
+        """Drop every trigger of a closed bracket, including levels the mark never reached."""
+        key = (bracket.signal_key, bracket.account)
+        for heaps in (self._up, self._down):
+            heap = heaps.get(bracket.symbol)
+            if not heap:
+                continue
+            heap[:] = [entry for entry in heap if entry[2] != key]
+            heapq.heapify(heap)
+            if not heap:
+                del heaps[bracket.symbol]
+
+    def _update_leg(self, bracket: Bracket, leg: str, order: dict):
+        was_open = bracket.status == "open"
+        self.journal.update_leg(bracket, leg, order)
+        if was_open and bracket.status != "open":
+            self._disarm(bracket)
+
+    def watch(self, bracket: Bracket):
+        """Arm the price triggers of a newly opened (or reloaded) bracket."""
+        long = bracket.side == "BUY"
+        if bracket.account not in self.streamed:
+            self._arm(bracket, bracket.tp_price, long, "TP")
+            self._arm(bracket, bracket.sl_price, not long, "SL")
+        n = self.breakeven_after_tp
+        if n > 0 and len(bracket.tps) >= n and not bracket.breakeven:
+            self._arm(bracket, bracket.tps[n - 1], long, "breakeven")
+
+    def load(self):
+        """Watch every bracket the journal restored at startup."""
+        brackets = self.journal.open_brackets()
+        for bracket in brackets:
+            self.watch(bracket)
+        if brackets:
+            log.info(f"🧷 Watching {len(brackets)} open bracket(s)")
+            self._spawn(self.resync(brackets))
+
+    async def resync(self, brackets: list[Bracket]):
+        """Look up protective legs once after a restart; fills missed while down close out here."""
+        async def one(bracket: Bracket):
+            for leg in [leg for leg in bracket.legs if leg != "E"]:
+                if bracket.status != "open":
+                    return
+                await self._check(bracket, leg, attempts=1, priority=Priority.ACCOUNT)
+
+        await asyncio.gather(*(one(b) for b in brackets))
+
+    def on_stream_resync(self):
+        """User data stream reconnected (AccountMirror listener): look up what filled while it was down."""
+        brackets = [b for b in self.journal.open_brackets() if b.account in self.streamed]
+        if brackets:
+            log.info(f"🧷 Re-checking {len(brackets)} bracket(s) after a user data stream reconnect")
+            self._spawn(self.resync(brackets))
+
+    # --- events ----------------------------------------------------------
+
+    def on_order_update(self, order: dict):
+        """ORDER_TRADE_UPDATE (AccountMirror listener); replaces the journal's own listener."""
+        found = self.journal.find(order.get("clientOrderId"))
+        if found is None:
+            return
+        bracket, leg = found
+        self._update_leg(bracket, leg, order)
+        if leg != "E" and order.get("status") == "FILLED":
+            self._spawn(self._close_out(bracket, leg))
+
+    def on_price(self, symbol: str, price: float):
+        """Mark-price tick (MarketDataFeed listener)."""
+        up = self._up.get(symbol)
+        while up and up[0][0] <= price:
+            _, _, key, action = heapq.heappop(up)
+            self._fire(key, action)
+        down = self._down.get(symbol)
+        while down and -down[0][0] >= price:
+            _, _, key, action = heapq.heappop(down)
+            self._fire(key, action)
+
+    def _fire(self, key: tuple[str, str], action: str):
+        bracket = self.journal.brackets.get(key)
+        if bracket is None:
+            return  # closed since it was armed
+        if action == "breakeven":
+            self._spawn(self._breakeven(bracket))
+        else:
+            self._spawn(self._check(bracket, action, attempts=self.max_checks))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # --- actions ---------------------------------------------------------
+
+    async def _check(self, bracket: Bracket, leg: str, attempts: int, priority: Priority = Priority.PROTECTIVE):
+        """Query one leg and feed a changed status back through on_order_update."""
+        client = self.clients.get(bracket.account)
+        for attempt in range(attempts):
+            info = bracket.legs.get(leg) or {}
+            if client is None or bracket.status != "open" or info.get("status") in DONE_STATUSES:
+                return
+            self.stats["checks"] += 1
+            try:
+                order = await client.query_order(bracket.symbol, info["client_id"], priority=priority)
+            except Exception as e:
+                log.warning(f"[{bracket.account}] {leg} lookup for {bracket.signal_key} failed: {describe(e)}")
+                order = None
+            if order is not None and order.get("status") != info.get("status"):
+                self.on_order_update(order)
+            if attempt + 1 < attempts:
+                # the mark crossed the level but the order may fill a little later
+                await asyncio.sleep(self.recheck_sec)
+
+    async def _close_out(self, bracket: Bracket, filled: str):
+        """Cancel every other protective leg still working after `filled` closed the position."""
+        orphans = [
+            leg for leg, info in bracket.legs.items()
+            if leg not in ("E", filled) and info.get("status") not in DONE_STATUSES
+        ]
+        if not orphans:
+            return
+        results = await asyncio.gather(*(self._cancel(bracket, leg) for leg in orphans))
+        canceled = [leg for leg, ok in zip(orphans, results) if ok]
+        log.info(f"🧹 [{bracket.account}] {filled} filled for {bracket.signal_key}, canceled {', '.join(canceled) or 'nothing'}")
+        if canceled and self.notify:
+            self.notify(
+                f"🧹 *{filled} Filled*\n[{bracket.account}] `{bracket.symbol}` canceled {', '.join(canceled)}",
+                bracket.signal_key,
+            )
+
+    async def _cancel(self, bracket: Bracket, leg: str) -> bool:
+        client = self.clients.get(bracket.account)
+        if client is None:
+            return False
+        cid = bracket.legs[leg]["client_id"]
+        deadline = time.monotonic() + client.deadlines[Priority.PROTECTIVE]
+        delay = 0.2
+        while True:
+            try:
+                resp = await client.cancel_order(bracket.symbol, cid)
+                break
+            except Exception as e:
+                retryable = isinstance(e, RequestShed) or status_unknown(e)
+                if not retryable or time.monotonic() + delay >= deadline:
+                    log.error(f"❌ [{bracket.account}] Cancel of orphaned {leg} {cid} failed: {describe(e)}")
+                    return False
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 2.0)
+        if resp is None:
+            # no longer open: learn how it ended (it may have filled too)
+            try:
+                resp = await client.query_order(bracket.symbol, cid)
+            except Exception as e:
+                log.warning(f"[{bracket.account}] Lookup of {leg} {cid} failed: {describe(e)}")
+            if resp is None:
+                return False
+        self._update_leg(bracket, leg, resp)
+        if resp.get("status") != "CANCELED":
+            return False
+        self.stats["canceled"] += 1
+        return True
+
+    async def _breakeven(self, bracket: Bracket):
+        """Place a new stop at the entry price, then cancel the old one (never unprotected in between)."""
+        client = self.clients.get(bracket.account)
+        sl = bracket.legs.get("SL")
+        if client is None or bracket.breakeven or not sl or sl.get("status") in DONE_STATUSES:
+            return
+        bracket.breakeven = True  # before any await: one move per bracket
+        price = await client.round_price(bracket.symbol, bracket.entry_price)
+        cid = client_order_id(bracket.signal_key, bracket.account, "BE")
+        try:
+            order = await client.stop_market_reduce_only(
+                bracket.symbol, bracket.close_side, bracket.qty, price, client_order_id=cid,
+            )
+        except Exception as e:
+            # e.g. -2021 when the mark is already back through the entry; keep the original stop
+            log.error(f"❌ [{bracket.account}] Breakeven stop for {bracket.signal_key} failed: {describe(e)}")
+            return
+        self.journal.replace_leg(bracket, "SL", {
+            "client_id": cid, "order_id": order.get("orderId"), "status": order.get("status"),
+        }, keep_as="SL0")
+        bracket.sl_price = price
+        self.stats["breakeven"] += 1
+        log.info(f"🛡 [{bracket.account}] SL for {bracket.signal_key} moved to breakeven {price}")
+        if self.notify:
+            self.notify(f"🛡 *SL → Breakeven*\n[{bracket.account}] `{bracket.symbol}` stop `{price}`", bracket.signal_key)
+        await self._cancel(bracket, "SL0")
+        if bracket.status != "open":
+            # a TP filled while the new stop was in flight; it missed that close-out
+            await self._cancel(bracket, "SL")
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        self._tasks.clear()
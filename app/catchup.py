@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Optional
+
+log = logging.getLogger("app.catchup")
+
+LIVE, BACKLOG, STALE = "live", "backlog", "stale"
+
+
+class CatchUpGate:
+    """Decides what to do with a signal given its age, for bursts replayed after a reconnect.
+
+    classify() sorts a signal into live (execute now), backlog (older than
+    `backlog_age`) or stale (older than `max_age`). Backlog signals wait in
+    newest() for a short collapse window per symbol and only the newest one
+    per symbol goes on; a live signal for the symbol supersedes them all.
+    Every waiter is its own task, so live signals never queue behind them.
+    """
+
+    def __init__(self, max_age: float = 60.0, backlog_age: float = 5.0, window: float = 1.0):
+        self.max_age = max_age
+        self.backlog_age = backlog_age
+        self.window = window
+        # symbol -> (msg_ts, signal_key) of the newest signal seen in the current window
+        self._newest: dict[str, tuple[float, str]] = {}
+        self._flush: dict[str, asyncio.Future] = {}
+        self.collapsed = 0
+        self.stale = 0
+
+    def classify(self, age: Optional[float]) -> str:
+        if age is None:
+            return LIVE
+        if self.max_age > 0 and age > self.max_age:
+            self.stale += 1
+            return STALE
+        if self.backlog_age > 0 and age > self.backlog_age:
+            return BACKLOG
+        return LIVE
+
+    def _offer(self, symbol: str, msg_ts: float, signal_key: str):
+        best = self._newest.get(symbol)
+        if best is None or (msg_ts, signal_key) > best:
+            self._newest[symbol] = (msg_ts, signal_key)
+
+    def supersede(self, symbol: str, msg_ts: float, signal_key: str):
+        """A live signal for `symbol`: any backlog waiting on it is now outdated."""
+        if symbol in self._flush:
+            self._offer(symbol, msg_ts, signal_key)
+
+    async def newest(self, symbol: str, msg_ts: float, signal_key: str) -> bool:
+        """Wait out the collapse window; True if this is still the newest signal for its symbol."""
+        self._offer(symbol, msg_ts, signal_key)
+        flush = self._flush.get(symbol)
+        if flush is None:
+            loop = asyncio.get_running_loop()
+            flush = self._flush[symbol] = loop.create_future()
+            loop.call_later(self.window, self._close_window, symbol)
+        await asyncio.shield(flush)
+        if flush.result()[1] == signal_key:
+            return True
+        self.collapsed += 1
+        return False
+
+    def _close_window(self, symbol: str):
+        flush = self._flush.pop(symbol)
+        best = self._newest.pop(symbol)
+        flush.set_result(best)
@@ -3,6 +3,14 @@ import json
 from typing import Optional
 from pydantic import BaseModel
 
+class AccountConfig(BaseModel):
+    """Extra (sub-)account the same signals are copied to."""
+    name: str
+    api_key: str
+    api_secret: str
+    usdt_per_trade: Optional[float] = None  # defaults to DEFAULT_USDT_PER_TRADE
+    leverage: Optional[int] = None  # defaults to DEFAULT_LEVERAGE
+
 class Settings(BaseModel):
     TG_API_ID: int
     TG_API_HASH: str
@@ -13,22 +21,79 @@ class Settings(BaseModel):
     TG_ADMIN_CHAT_ID: str
     TG_ORDER_CHAT_ID: Optional[str] = None
     TG_FORWARD_CHAT_ID: Optional[str] = None
+    FORWARD_QUEUE_SIZE: int = 500
+    FORWARD_BATCH_INTERVAL_SEC: float = 2.0
+    FORWARD_BATCH_MAX: int = 20
+    FORWARD_OVERFLOW: str = "drop_oldest"  # drop_oldest / drop_new / spill
+    FORWARD_SPILL_PATH: str = "/data/forward_spill.jsonl"
+    FORWARD_NATIVE: bool = True
 
     BINANCE_API_KEY: str
     BINANCE_API_SECRET: str
     BINANCE_BASE_URL: str = "https://fapi.binance.com"
+    BINANCE_WS_URL: str = "wss://fstream.binance.com"
+    BINANCE_TIMEOUT_SEC: float = 10.0
+    BINANCE_KEEPALIVE_SEC: float = 30.0
+    BINANCE_WEIGHT_LIMIT_1M: int = 2400
+    BINANCE_ORDER_LIMIT_10S: int = 300
+    BINANCE_ORDER_LIMIT_1M: int = 1200
+    ENTRY_DEADLINE_SEC: float = 5.0
+    PROTECTIVE_DEADLINE_SEC: float = 15.0
+    ORDER_ATTEMPT_TIMEOUT_SEC: float = 2.0
+    EXCHANGE_INFO_REFRESH_SEC: int = 3600
+
+    MARKET_DATA_ENABLED: bool = True
+    MARKET_DATA_MAX_AGE_SEC: float = 10.0
+    MAX_ENTRY_DEVIATION_PCT: float = 0.0  # 0 disables the guard
+
+    ACCOUNT_STREAM_ENABLED: bool = True
+    ACCOUNT_RECONCILE_SEC: float = 300.0
+    SKIP_IF_POSITION_OPEN: bool = False
 
     DEFAULT_USDT_PER_TRADE: float = 10.0
     DEFAULT_LEVERAGE: int = 10
 
+    ACCOUNTS: list[AccountConfig] = []
+    ACCOUNT_MAX_CONCURRENCY: int = 2
+    APPLY_LEVERAGE: bool = False
+
     SYMBOL_MAP: dict[str, str] = {}
 
     PLACE_TP_ORDERS: bool = True
     PLACE_SL_ORDER: bool = True
+    USE_BATCH_ORDERS: bool = True
 
     TP_INDEX: int = 2
 
+    NOTIFY_QUEUE_SIZE: int = 1000
+    CHAT_CACHE_TTL_SEC: int = 600
+    DEDUP_WINDOW_SEC: float = 300.0  # 0 disables signal deduplication
+    DEDUP_MAX_ENTRIES: int = 1024
+    # Catch-up after a reconnect, by message age against server time
+    SIGNAL_MAX_AGE_SEC: float = 60.0  # older signals are never executed; 0 disables
+    STALE_SIGNAL_ACTION: str = "notify"  # notify | drop
+    CATCHUP_AGE_SEC: float = 5.0  # older signals are backlog: newest per symbol only
+    CATCHUP_WINDOW_SEC: float = 1.0
+
+    JOURNAL_ENABLED: bool = True
+    JOURNAL_PATH: str = "/data/trades.db"
+    # cancel the orphaned TP / SL when the other fills (needs the journal)
+    BRACKET_MANAGER_ENABLED: bool = True
+    BREAKEVEN_AFTER_TP: int = 0  # move SL to entry once the mark reaches signal TPn; 0 disables
+
+    # all | listener | executor | bot | split (supervises the other three)
+    PROCESS_ROLE: str = "all"
+    IPC_SOCKET_PATH: str = "/data/ipc.sock"
+    IPC_QUEUE_SIZE: int = 1000
+
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # text | json
+    LOG_SAMPLE_EVERY: int = 100  # keep 1 in N high-volume records; 1 keeps all
+
+    # Prometheus text endpoint at /metrics; 0 disables
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9108
+    METRICS_LAG_INTERVAL_SEC: float = 0.5
 
 def load_settings() -> Settings:
     symbol_map_raw = os.getenv("SYMBOL_MAP", "{}")
@@ -43,20 +108,72 @@ def load_settings() -> Settings:
         TG_ADMIN_CHAT_ID=str(os.getenv("TG_ADMIN_CHAT_ID", "")),
         TG_ORDER_CHAT_ID=os.getenv("TG_ORDER_CHAT_ID") or None,
         TG_FORWARD_CHAT_ID=os.getenv("TG_FORWARD_CHAT_ID") or None,
+        FORWARD_QUEUE_SIZE=int(os.getenv("FORWARD_QUEUE_SIZE", "500")),
+        FORWARD_BATCH_INTERVAL_SEC=float(os.getenv("FORWARD_BATCH_INTERVAL_SEC", "2")),
+        FORWARD_BATCH_MAX=int(os.getenv("FORWARD_BATCH_MAX", "20")),
+        FORWARD_OVERFLOW=os.getenv("FORWARD_OVERFLOW", "drop_oldest"),
+        FORWARD_SPILL_PATH=os.getenv("FORWARD_SPILL_PATH", "/data/forward_spill.jsonl"),
+        FORWARD_NATIVE=os.getenv("FORWARD_NATIVE", "true").lower() == "true",
 
         BINANCE_API_KEY=os.getenv("BINANCE_API_KEY", ""),
         BINANCE_API_SECRET=os.getenv("BINANCE_API_SECRET", ""),
         BINANCE_BASE_URL=os.getenv("BINANCE_BASE_URL", "https://fapi.binance.com"),
+        BINANCE_WS_URL=os.getenv("BINANCE_WS_URL", "wss://fstream.binance.com"),
+        BINANCE_TIMEOUT_SEC=float(os.getenv("BINANCE_TIMEOUT_SEC", "10")),
+        BINANCE_KEEPALIVE_SEC=float(os.getenv("BINANCE_KEEPALIVE_SEC", "30")),
+        BINANCE_WEIGHT_LIMIT_1M=int(os.getenv("BINANCE_WEIGHT_LIMIT_1M", "2400")),
+        BINANCE_ORDER_LIMIT_10S=int(os.getenv("BINANCE_ORDER_LIMIT_10S", "300")),
+        BINANCE_ORDER_LIMIT_1M=int(os.getenv("BINANCE_ORDER_LIMIT_1M", "1200")),
+        ENTRY_DEADLINE_SEC=float(os.getenv("ENTRY_DEADLINE_SEC", "5")),
+        PROTECTIVE_DEADLINE_SEC=float(os.getenv("PROTECTIVE_DEADLINE_SEC", "15")),
+        ORDER_ATTEMPT_TIMEOUT_SEC=float(os.getenv("ORDER_ATTEMPT_TIMEOUT_SEC", "2")),
+        EXCHANGE_INFO_REFRESH_SEC=int(os.getenv("EXCHANGE_INFO_REFRESH_SEC", "3600")),
+
+        MARKET_DATA_ENABLED=os.getenv("MARKET_DATA_ENABLED", "true").lower() == "true",
+        MARKET_DATA_MAX_AGE_SEC=float(os.getenv("MARKET_DATA_MAX_AGE_SEC", "10")),
+        MAX_ENTRY_DEVIATION_PCT=float(os.getenv("MAX_ENTRY_DEVIATION_PCT", "0")),
+
+        ACCOUNT_STREAM_ENABLED=os.getenv("ACCOUNT_STREAM_ENABLED", "true").lower() == "true",
+        ACCOUNT_RECONCILE_SEC=float(os.getenv("ACCOUNT_RECONCILE_SEC", "300")),
+        SKIP_IF_POSITION_OPEN=os.getenv("SKIP_IF_POSITION_OPEN", "false").lower() == "true",
 
         DEFAULT_USDT_PER_TRADE=float(os.getenv("DEFAULT_USDT_PER_TRADE", "10")),
         DEFAULT_LEVERAGE=int(os.getenv("DEFAULT_LEVERAGE", "10")),
 
+        ACCOUNTS=json.loads(os.getenv("ACCOUNTS", "[]")),
+        ACCOUNT_MAX_CONCURRENCY=int(os.getenv("ACCOUNT_MAX_CONCURRENCY", "2")),
+        APPLY_LEVERAGE=os.getenv("APPLY_LEVERAGE", "false").lower() == "true",
+
         SYMBOL_MAP=json.loads(symbol_map_raw),
 
         PLACE_TP_ORDERS=os.getenv("PLACE_TP_ORDERS", "true").lower() == "true",
         PLACE_SL_ORDER=os.getenv("PLACE_SL_ORDER", "true").lower() == "true",
+        USE_BATCH_ORDERS=os.getenv("USE_BATCH_ORDERS", "true").lower() == "true",
 
         TP_INDEX=int(os.getenv("TP_INDEX", "2")),
 
+        NOTIFY_QUEUE_SIZE=int(os.getenv("NOTIFY_QUEUE_SIZE", "1000")),
+        CHAT_CACHE_TTL_SEC=int(os.getenv("CHAT_CACHE_TTL_SEC", "600")),
+        DEDUP_WINDOW_SEC=float(os.getenv("DEDUP_WINDOW_SEC", "300")),
+        DEDUP_MAX_ENTRIES=int(os.getenv("DEDUP_MAX_ENTRIES", "1024")),
+        SIGNAL_MAX_AGE_SEC=float(os.getenv("SIGNAL_MAX_AGE_SEC", "60")),
+        STALE_SIGNAL_ACTION=os.getenv("STALE_SIGNAL_ACTION", "notify").lower(),
+        CATCHUP_AGE_SEC=float(os.getenv("CATCHUP_AGE_SEC", "5")),
+        CATCHUP_WINDOW_SEC=float(os.getenv("CATCHUP_WINDOW_SEC", "1")),
+        JOURNAL_ENABLED=os.getenv("JOURNAL_ENABLED", "true").lower() == "true",
+        JOURNAL_PATH=os.getenv("JOURNAL_PATH", "/data/trades.db"),
+        BRACKET_MANAGER_ENABLED=os.getenv("BRACKET_MANAGER_ENABLED", "true").lower() == "true",
+        BREAKEVEN_AFTER_TP=int(os.getenv("BREAKEVEN_AFTER_TP", "0")),
+
+        PROCESS_ROLE=os.getenv("PROCESS_ROLE", "all").lower(),
+        IPC_SOCKET_PATH=os.getenv("IPC_SOCKET_PATH", "/data/ipc.sock"),
+        IPC_QUEUE_SIZE=int(os.getenv("IPC_QUEUE_SIZE", "1000")),
+
         LOG_LEVEL=os.getenv("LOG_LEVEL", "INFO"),
+        LOG_FORMAT=os.getenv("LOG_FORMAT", "text").lower(),
+        LOG_SAMPLE_EVERY=int(os.getenv("LOG_SAMPLE_EVERY", "100")),
+
+        METRICS_HOST=os.getenv("METRICS_HOST", "127.0.0.1"),
+        METRICS_PORT=int(os.getenv("METRICS_PORT", "9108")),
+        METRICS_LAG_INTERVAL_SEC=float(os.getenv("METRICS_LAG_INTERVAL_SEC", "0.5")),
     )
@@ -0,0 +1,284 @@
+import time
+import asyncio
+from functools import cached_property
+from typing import Optional
+
+from app.config import Settings, load_settings
+from app.logger import setup_logger
+from app.latency import latency
+
+# app.main imports this first, so boot milestones are measured from here
+STARTED = time.perf_counter()
+
+
+class Container:
+    """Settings, logger and the long-lived clients of one process, each built once on first use.
+
+    Nothing is constructed at import time. Heavy libraries (telethon, the
+    Binance SDK / aiohttp) are imported inside the property that needs them,
+    so a bot or listener process never loads what it does not use and the
+    parser / executor modules import without any network library.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None):
+        if settings is not None:
+            self.settings = settings
+        self.boot: list[tuple[str, float]] = []
+        self._first_signal = False
+
+    @cached_property
+    def settings(self) -> Settings:
+        return load_settings()
+
+    @cached_property
+    def log(self):
+        s = self.settings
+        return setup_logger(s.LOG_LEVEL, fmt=s.LOG_FORMAT, sample_every=s.LOG_SAMPLE_EVERY)
+
+    # --- boot timing -----------------------------------------------------
+
+    def mark(self, stage: str) -> float:
+        """Record a startup milestone in ms since the first app import."""
+        ms = (time.perf_counter() - STARTED) * 1000
+        self.boot.append((stage, ms))
+        latency.record(f"boot.{stage}", ms)
+        return ms
+
+    def boot_summary(self) -> str:
+        """Per-stage durations, like SignalTrace.summary(), plus the total."""
+        parts, last = [], 0.0
+        for stage, ms in self.boot:
+            parts.append(f"{stage}={ms - last:.0f}ms")
+            last = ms
+        return f"{' '.join(parts)} | total={last:.0f}ms"
+
+    def signal_done(self):
+        """Log time-to-first-signal once per process."""
+        if self._first_signal:
+            return
+        self._first_signal = True
+        ms = self.mark("first_signal")
+        self.log.info(f"⏱ First signal executed {ms / 1000:.1f}s after start")
+
+    # --- Telegram ----------------------------------------------------------
+
+    @cached_property
+    def tg_client(self):
+        from telethon import TelegramClient
+
+        s = self.settings
+        return TelegramClient(s.TG_SESSION, s.TG_API_ID, s.TG_API_HASH)
+
+    @cached_property
+    def outbox(self):
+        from app.notifier import NotificationOutbox
+
+        s = self.settings
+        return NotificationOutbox(
+            self.tg_client,
+            [s.TG_ADMIN_CHAT_ID, s.TG_ORDER_CHAT_ID],
+            maxsize=s.NOTIFY_QUEUE_SIZE,
+        )
+
+    @cached_property
+    def entity_cache(self):
+        from app.router import EntityCache
+
+        return EntityCache(ttl=self.settings.CHAT_CACHE_TTL_SEC)
+
+    @cached_property
+    def forwarder(self):
+        s = self.settings
+        if not s.TG_FORWARD_CHAT_ID:
+            return None
+        from app.forwarder import ForwardPipeline
+
+        return ForwardPipeline(
+            self.tg_client,
+            s.TG_FORWARD_CHAT_ID,
+            self.entity_cache,
+            maxsize=s.FORWARD_QUEUE_SIZE,
+            interval=s.FORWARD_BATCH_INTERVAL_SEC,
+            max_batch=s.FORWARD_BATCH_MAX,
+            overflow=s.FORWARD_OVERFLOW,
+            spill_path=s.FORWARD_SPILL_PATH,
+            native_forward=s.FORWARD_NATIVE,
+        )
+
+    # --- Binance -----------------------------------------------------------
+
+    def new_binance(self, api_key: str, api_secret: str):
+        """Client for one account, with its own rate-limit scheduler and order deadlines.
+
+        FanOutExecutor later shares the primary's IP weight budget with the rest.
+        """
+        from app.binance_client import BinanceFutures
+        from app.rate_limit import RequestScheduler
+
+        s = self.settings
+        return BinanceFutures(
+            api_key=api_key,
+            api_secret=api_secret,
+            base_url=s.BINANCE_BASE_URL,
+            timeout=s.BINANCE_TIMEOUT_SEC,
+            scheduler=RequestScheduler(
+                weight_limit=s.BINANCE_WEIGHT_LIMIT_1M,
+                order_limit_10s=s.BINANCE_ORDER_LIMIT_10S,
+                order_limit_1m=s.BINANCE_ORDER_LIMIT_1M,
+            ),
+            entry_deadline=s.ENTRY_DEADLINE_SEC,
+            protective_deadline=s.PROTECTIVE_DEADLINE_SEC,
+            attempt_timeout=s.ORDER_ATTEMPT_TIMEOUT_SEC,
+        )
+
+    @cached_property
+    def binance(self):
+        """The primary account's client, shared by execution, streams and bot commands."""
+        return self.new_binance(self.settings.BINANCE_API_KEY, self.settings.BINANCE_API_SECRET)
+
+    @cached_property
+    def executor(self):
+        """Primary account from BINANCE_API_KEY plus any sub-accounts from ACCOUNTS."""
+        from app.executor import Account, FanOutExecutor
+
+        s = self.settings
+        accounts = [Account(
+            "main", self.binance,
+            s.DEFAULT_USDT_PER_TRADE, s.DEFAULT_LEVERAGE,
+            asyncio.Semaphore(s.ACCOUNT_MAX_CONCURRENCY),
+        )]
+        for cfg in s.ACCOUNTS:
+            accounts.append(Account(
+                cfg.name,
+                self.new_binance(cfg.api_key, cfg.api_secret),
+                cfg.usdt_per_trade or s.DEFAULT_USDT_PER_TRADE,
+                cfg.leverage or s.DEFAULT_LEVERAGE,
+                asyncio.Semaphore(s.ACCOUNT_MAX_CONCURRENCY),
+            ))
+        return FanOutExecutor(accounts, use_batch=s.USE_BATCH_ORDERS)
+
+    @cached_property
+    def market(self):
+        from app.market_data import MarketDataFeed
+
+        s = self.settings
+        # XAUUSDT is always streamed because execute_signal currently pins it
+        return MarketDataFeed(
+            s.BINANCE_WS_URL,
+            set(s.SYMBOL_MAP.values()) | {"XAUUSDT"},
+            max_age=s.MARKET_DATA_MAX_AGE_SEC,
+        )
+
+    @cached_property
+    def account_mirror(self):
+        from app.account_stream import AccountMirror
+
+        mirror = AccountMirror(
+            self.binance,
+            self.settings.BINANCE_WS_URL,
+            reconcile_sec=self.settings.ACCOUNT_RECONCILE_SEC,
+        )
+        # the bracket manager updates the journal itself before reacting to a fill
+        tracker = self.brackets or self.journal
+        if tracker:
+            mirror.order_listeners.append(tracker.on_order_update)
+        if self.brackets:
+            mirror.resync_listeners.append(self.brackets.on_stream_resync)
+        return mirror
+
+    # --- signal state ------------------------------------------------------
+
+    @cached_property
+    def deduper(self):
+        from app.dedup import SignalDeduper
+
+        s = self.settings
+        return SignalDeduper(maxsize=s.DEDUP_MAX_ENTRIES, window_sec=s.DEDUP_WINDOW_SEC)
+
+    @cached_property
+    def catchup(self):
+        from app.catchup import CatchUpGate
+
+        s = self.settings
+        return CatchUpGate(max_age=s.SIGNAL_MAX_AGE_SEC, backlog_age=s.CATCHUP_AGE_SEC, window=s.CATCHUP_WINDOW_SEC)
+
+    @cached_property
+    def journal(self):
+        if not self.settings.JOURNAL_ENABLED:
+            return None
+        from app.journal import TradeJournal
+
+        return TradeJournal(self.settings.JOURNAL_PATH)
+
+    @cached_property
+    def brackets(self):
+        s = self.settings
+        if not s.BRACKET_MANAGER_ENABLED or self.journal is None:
+            return None
+        from app.brackets import BracketManager
+
+        manager = BracketManager(
+            self.journal,
+            {acc.name: acc.client for acc in self.executor.accounts},
+            # only the primary account has a user data stream
+            streamed=frozenset({"main"}) if s.ACCOUNT_STREAM_ENABLED else frozenset(),
+            breakeven_after_tp=s.BREAKEVEN_AFTER_TP,
+        )
+        self.market.price_listeners.append(manager.on_price)
+        return manager
+
+    # --- metrics -------------------------------------------------------------
+
+    @cached_property
+    def metrics(self):
+        """The process metrics registry, plus scrape-time gauges over the components built here.
+
+        Each gauge only reads what this process has already constructed
+        (cached properties land in __dict__), so scraping never builds a client.
+        """
+        from app.metrics import metrics
+
+        built = self.__dict__
+
+        def accounts():
+            executor = built.get("executor")
+            return [(acc.name, acc.client.scheduler.snapshot()) for acc in executor.accounts] if executor else []
+
+        def queue(name: str):
+            component = built.get(name)
+            return component.queue.qsize() if component else None
+
+        def dropped(name: str):
+            component = built.get(name)
+            return component.dropped if component else None
+
+        metrics.gauge(
+            "binance_weight_used", "Request weight used in the current 1m window (estimate incl. in-flight).",
+            ("account",), fn=lambda: {(name,): snap["weight_1m"] for name, snap in accounts()},
+        )
+        metrics.gauge(
+            "binance_orders_10s", "Orders counted against the 10s order limit.",
+            ("account",), fn=lambda: {(name,): snap["orders_10s"] for name, snap in accounts()},
+        )
+        metrics.gauge(
+            "binance_requests_queued", "Requests waiting for rate-limit budget.",
+            ("account",), fn=lambda: {(name,): snap["queued"] for name, snap in accounts()},
+        )
+        metrics.gauge(
+            "binance_requests_shed", "Requests dropped to protect the rate-limit budget since start.",
+            ("account", "priority"),
+            fn=lambda: {(name, p): n for name, snap in accounts() for p, n in snap["shed"].items()},
+        )
+        metrics.gauge("notify_queue_depth", "Notifications waiting to be sent.", fn=lambda: queue("outbox"))
+        metrics.gauge("notify_dropped", "Notifications dropped on a full outbox since start.", fn=lambda: dropped("outbox"))
+        metrics.gauge("forward_queue_depth", "Messages waiting to be forwarded.", fn=lambda: queue("forwarder"))
+        metrics.gauge("forward_dropped", "Forwarded messages dropped since start.", fn=lambda: dropped("forwarder"))
+        metrics.gauge(
+            "brackets_open", "Open brackets tracked by the trade journal.",
+            fn=lambda: len(built["journal"].brackets) if built.get("journal") else None,
+        )
+        metrics.gauge(
+            "catchup_signals", "Backlog signals collapsed or dropped as stale since start.", ("reason",),
+            fn=lambda: {("collapsed",): built["catchup"].collapsed, ("stale",): built["catchup"].stale} if "catchup" in built else None,
+        )
+        return metrics
@@ -0,0 +1,81 @@
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from app.parser import Signal
+
+log = logging.getLogger("app.dedup")
+
+CLIENT_ID_PREFIX = "tg"
+
+
+def fingerprint(sig: Signal) -> str:
+    """Normalized identity of a signal: the same trade reposted or re-sent hashes the same."""
+    levels = ",".join(f"{tp:g}" for tp in sig.tps)
+    sl = f"{sig.sl:g}" if sig.sl is not None else "-"
+    raw = f"{sig.symbol.upper()}|{sig.side.upper()}|{sig.entry:g}|{levels}|{sl}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def client_order_id(signal_key: str, account: str, leg: str) -> str:
+    """Deterministic newClientOrderId for one leg of one signal on one account.
+
+    Binance allows [.A-Z:/a-z0-9_-]{1,36}; this is always 22-23 characters.
+    """
+    digest = hashlib.blake2b(f"{signal_key}|{account}".encode("utf-8"), digest_size=8).hexdigest()
+    return f"{CLIENT_ID_PREFIX}{digest}-{leg}"
+
+
+class SignalDeduper:
+    """Bounded LRU of recently seen signals, by message and by fingerprint.
+
+    A message is a duplicate if the same (chat, message) was already handled
+    (Telethon redelivery after a reconnect) or the same signal fingerprint
+    was seen within `window_sec` (reposts / copies across channels).
+    """
+
+    def __init__(self, maxsize: int = 1024, window_sec: float = 300.0):
+        self.maxsize = maxsize
+        self.window_sec = window_sec
+        self._items: OrderedDict = OrderedDict()
+        self.duplicates = 0
+
+    def _seen(self, key: str, now: float) -> bool:
+        expires = self._items.get(key)
+        if expires is None:
+            return False
+        if expires < now:
+            del self._items[key]
+            return False
+        return True
+
+    def _put(self, key: str, expires: float):
+        self._items[key] = expires
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def check(self, message_key: str, fp: str) -> Optional[str]:
+        """Return why this is a duplicate ("message" / "signal"), or None after recording it."""
+        if self.window_sec <= 0:
+            return None
+        now = time.monotonic()
+        msg, sig = f"m:{message_key}", f"s:{fp}"
+        reason = "message" if self._seen(msg, now) else "signal" if self._seen(sig, now) else None
+        if reason:
+            self.duplicates += 1
+            return reason
+        self._put(msg, now + self.window_sec)
+        self._put(sig, now + self.window_sec)
+        return None
+
+    def restore(self, message_key: str, fp: str, age_sec: float):
+        """Re-add a signal handled `age_sec` ago, e.g. from the trade journal after a restart."""
+        remaining = self.window_sec - age_sec
+        if remaining <= 0:
+            return
+        expires = time.monotonic() + remaining
+        self._put(f"m:{message_key}", expires)
+        self._put(f"s:{fp}", expires)
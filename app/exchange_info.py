@@ -0,0 +1,176 @@
+import asyncio
+import time
+import logging
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Awaitable, Callable, Optional
+
+log = logging.getLogger("app.exchange_info")
+
+ZERO = Decimal("0")
+
+
+def fmt_decimal(value: Decimal) -> str:
+    """Plain (non-scientific) string for a Decimal, without trailing zeros."""
+    s = format(value.normalize(), "f")
+    return s if s != "-0" else "0"
+
+
+def floor_to_step(value: Decimal, step: Decimal) -> Decimal:
+    if step <= 0:
+        return value
+    return (value // step) * step
+
+
+def round_to_tick(value: Decimal, tick: Decimal) -> Decimal:
+    if tick <= 0:
+        return value
+    return (value / tick).quantize(Decimal(1), rounding=ROUND_HALF_UP) * tick
+
+
+@dataclass(frozen=True)
+class SymbolFilters:
+    symbol: str
+    step_size: Decimal
+    min_qty: Decimal
+    max_qty: Decimal
+    market_step_size: Decimal
+    market_min_qty: Decimal
+    market_max_qty: Decimal
+    tick_size: Decimal
+    min_notional: Decimal
+    price_precision: int
+    quantity_precision: int
+
+    def round_qty(self, qty, market: bool = False) -> Decimal:
+        """Round qty down to the lot step. Returns 0 when below the minimum."""
+        step = self.market_step_size if market else self.step_size
+        min_qty = self.market_min_qty if market else self.min_qty
+        max_qty = self.market_max_qty if market else self.max_qty
+        q = floor_to_step(Decimal(str(qty)), step)
+        if max_qty > 0 and q > max_qty:
+            q = floor_to_step(max_qty, step)
+        if q < min_qty:
+            return ZERO
+        return q
+
+    def round_price(self, price) -> Decimal:
+        """Round price to the nearest tick."""
+        return round_to_tick(Decimal(str(price)), self.tick_size)
+
+
+def parse_symbol_filters(info: dict) -> SymbolFilters:
+    filters = {f.get("filterType"): f for f in info.get("filters", [])}
+    lot = filters.get("LOT_SIZE", {})
+    market_lot = filters.get("MARKET_LOT_SIZE", lot)
+    price = filters.get("PRICE_FILTER", {})
+    notional = filters.get("MIN_NOTIONAL", {})
+
+    def d(f: dict, key: str, default: str = "0") -> Decimal:
+        return Decimal(str(f.get(key, default)))
+
+    return SymbolFilters(
+        symbol=info["symbol"],
+        step_size=d(lot, "stepSize", "1"),
+        min_qty=d(lot, "minQty"),
+        max_qty=d(lot, "maxQty"),
+        market_step_size=d(market_lot, "stepSize", "1"),
+        market_min_qty=d(market_lot, "minQty"),
+        market_max_qty=d(market_lot, "maxQty"),
+        tick_size=d(price, "tickSize"),
+        # futures uses "notional", spot-style payloads use "minNotional"
+        min_notional=d(notional, "notional", notional.get("minNotional", "0")),
+        price_precision=int(info.get("pricePrecision", 8)),
+        quantity_precision=int(info.get("quantityPrecision", 8)),
+    )
+
+
+class ExchangeInfoCache:
+    """Symbol -> SymbolFilters index built from /fapi/v1/exchangeInfo.
+
+    Loaded once at startup and refreshed in the background so the signal
+    path only ever does a dict lookup. If it was never loaded, a signal
+    tries once; after a failure no signal refetches for `retry_sec` and the
+    refresh loop retries on that interval instead. Until then filters() is
+    None and values go out unrounded, as for an unknown symbol.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[dict]], retry_sec: float = 30.0):
+        self._fetch = fetch
+        self._symbols: dict[str, SymbolFilters] = {}
+        self._lock = asyncio.Lock()
+        self.loaded_at: float = 0.0
+        self.retry_sec = retry_sec
+        # monotonic time and error of the last failed load; 0 after a success
+        self.failed_at: float = 0.0
+        self._error: Optional[Exception] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at > 0
+
+    async def load(self):
+        async with self._lock:
+            await self._load()
+
+    async def _load(self):
+        try:
+            info = await self._fetch()
+        except Exception as e:
+            self.failed_at, self._error = time.monotonic(), e
+            raise
+        symbols = {}
+        for s in info.get("symbols", []):
+            try:
+                symbols[s["symbol"]] = parse_symbol_filters(s)
+            except Exception as e:
+                log.warning(f"Skipping filters for {s.get('symbol')}: {e}")
+        # swap the whole index at once so readers never see a partial one
+        self._symbols = symbols
+        self.loaded_at = time.monotonic()
+        self.failed_at, self._error = 0.0, None
+        log.info(f"Exchange info loaded: {len(symbols)} symbols")
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._lock:
+            # callers queued behind a load that just failed must not all refetch
+            if self.loaded:
+                return
+            since = time.monotonic() - self.failed_at
+            if self.failed_at and since < self.retry_sec:
+                raise RuntimeError(f"Exchange info unavailable (load failed {since:.0f}s ago: {self._error})")
+            await self._load()
+
+    def get(self, symbol: str) -> Optional[SymbolFilters]:
+        return self._symbols.get(symbol)
+
+    async def filters(self, symbol: str) -> Optional[SymbolFilters]:
+        """Cached filters; only hits the API if the cache was never loaded. None if unavailable."""
+        try:
+            await self.ensure_loaded()
+        except Exception as e:
+            log.warning(f"No exchange info for {symbol}, using unrounded values: {e}")
+        return self._symbols.get(symbol)
+
+    def format_qty(self, symbol: str, qty, market: bool = False) -> str:
+        f = self.get(symbol)
+        if f is None:
+            return fmt_decimal(Decimal(str(qty)))
+        return fmt_decimal(f.round_qty(qty, market))
+
+    def format_price(self, symbol: str, price) -> str:
+        f = self.get(symbol)
+        if f is None:
+            return fmt_decimal(Decimal(str(price)))
+        return fmt_decimal(f.round_price(price))
+
+    async def run_refresh(self, interval_sec: float):
+        """Background task: reload the index every interval_sec (retry_sec after a failure)."""
+        while True:
+            await asyncio.sleep(self.retry_sec if self.failed_at else interval_sec)
+            try:
+                await self.load()
+            except Exception as e:
+                log.error(f"Exchange info refresh failed: {e}")
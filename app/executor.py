@@ -0,0 +1,153 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+from app.dedup import client_order_id
+from app.latency import latency
+
+if TYPE_CHECKING:
+    # aiohttp / Binance SDK stay out of plain imports (parser and executor tests)
+    from app.binance_client import BinanceFutures, LegResult
+
+log = logging.getLogger("app.executor")
+
+
+def calc_qty(usdt: float, leverage: int, entry_price: float) -> float:
+    notional = usdt * leverage
+    return notional / entry_price
+
+
+@dataclass
+class Account:
+    name: str
+    client: "BinanceFutures"
+    usdt_per_trade: float
+    leverage: int
+    semaphore: asyncio.Semaphore
+
+
+@dataclass
+class OrderPlan:
+    """Everything about a signal that is the same for every account."""
+    symbol: str
+    side: str
+    ref_price: float
+    tp_price: Optional[float] = None
+    sl_price: Optional[float] = None
+    # "<chat_id>:<message_id>"; seeds deterministic newClientOrderIds
+    signal_key: Optional[str] = None
+    # every TP level of the signal (only tp_price is placed); used for breakeven
+    tps: tuple = ()
+
+    @property
+    def close_side(self) -> str:
+        return "BUY" if self.side == "SELL" else "SELL"
+
+    def client_id(self, account: str, leg: str) -> Optional[str]:
+        if self.signal_key is None:
+            return None
+        return client_order_id(self.signal_key, account, leg)
+
+
+@dataclass
+class AccountResult:
+    account: str
+    qty: float = 0.0
+    entry: Optional[dict] = None
+    error: Optional[str] = None
+    legs: list["LegResult"] = field(default_factory=list)
+    # time.monotonic() when the entry was acked
+    filled_at: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.entry is not None and all(leg.ok for leg in self.legs)
+
+
+class FanOutExecutor:
+    """Runs the entry + TP/SL bracket for every account concurrently.
+
+    Each account has its own pooled BinanceFutures client and a semaphore
+    capping how many signals it executes at once. Symbol filters are shared
+    from the first (primary) account's exchange-info cache, and so is the
+    request-weight budget, since Binance counts weight per IP.
+    """
+
+    def __init__(self, accounts: list[Account], use_batch: bool = True):
+        if not accounts:
+            raise ValueError("FanOutExecutor needs at least one account")
+        self.accounts = accounts
+        self.use_batch = use_batch
+        primary = accounts[0].client
+        for acc in accounts[1:]:
+            acc.client.exchange_info = primary.exchange_info
+            acc.client.scheduler.share_weight(primary.scheduler)
+
+    @property
+    def primary(self) -> "BinanceFutures":
+        return self.accounts[0].client
+
+    async def warm_up(self, symbols, apply_leverage: bool = False):
+        symbols = list(symbols)
+
+        async def one(acc: Account):
+            try:
+                await acc.client.warm_up(symbols)
+                if apply_leverage:
+                    for symbol in symbols:
+                        await acc.client.set_leverage(symbol, acc.leverage)
+            except Exception as e:
+                log.error(f"❌ Warm-up failed for account {acc.name}: {e}")
+
+        await asyncio.gather(*(one(acc) for acc in self.accounts))
+
+    async def close(self):
+        await asyncio.gather(*(acc.client.close() for acc in self.accounts))
+
+    async def execute(self, plan: OrderPlan) -> list[AccountResult]:
+        return await asyncio.gather(*(self._execute_one(acc, plan) for acc in self.accounts))
+
+    async def _execute_one(self, acc: Account, plan: OrderPlan) -> AccountResult:
+        result = AccountResult(account=acc.name)
+        async with acc.semaphore:
+            client = acc.client
+            qty = calc_qty(acc.usdt_per_trade, acc.leverage, plan.ref_price)
+            result.qty = qty = await client.round_quantity(plan.symbol, qty, market=True)
+            if qty <= 0:
+                result.error = "Invalid qty"
+                return result
+            filters = client.exchange_info.get(plan.symbol)
+            if filters and qty * plan.ref_price < float(filters.min_notional):
+                result.error = f"notional below minimum {filters.min_notional}"
+                return result
+
+            try:
+                with latency.span("exec.entry"):
+                    result.entry = await client.market_order(
+                        plan.symbol, plan.side, qty, client_order_id=plan.client_id(acc.name, "E"),
+                    )
+                result.filled_at = time.monotonic()
+            except Exception as e:
+                result.error = str(e)
+                log.error(f"[{acc.name}] Entry order failed: {e}")
+                return result
+
+            with latency.span("exec.bracket"):
+                result.legs = await client.place_bracket(
+                    plan.symbol, plan.close_side, qty,
+                    tp_price=plan.tp_price,
+                    sl_price=plan.sl_price,
+                    batch=self.use_batch,
+                    client_ids={leg: plan.client_id(acc.name, leg) for leg in ("TP", "SL")},
+                )
+        return result
+
+
+def fill_spread_ms(results: list[AccountResult]) -> float:
+    """Time between the first and last entry ack across accounts."""
+    times = [r.filled_at for r in results if r.filled_at is not None]
+    if len(times) < 2:
+        return 0.0
+    return (max(times) - min(times)) * 1000
@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime, date
+from io import BytesIO
+from typing import Optional
+
+import ujson
+
+from app.latency import latency
+from app.metrics import TELEGRAM_SEND
+from app.notifier import to_chat_id
+from app.router import EntityCache
+
+log = logging.getLogger("app.forwarder")
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_new", "spill")
+
+# Above this a batch goes out as a .json file instead of a text message
+MAX_INLINE_LEN = 4000
+
+# Backoff between attempts to forward a spilled chunk that failed to send
+REPLAY_RETRY_SEC = 1.0
+REPLAY_RETRY_MAX_SEC = 60.0
+
+
+def json_serial(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, bytes):
+        return obj.hex()
+    return str(obj)
+
+
+def dumps(obj) -> str:
+    """Compact JSON. ujson for the common case; stdlib when raw bytes are present
+    (ujson rejects bytes before consulting `default`)."""
+    try:
+        return ujson.dumps(obj, default=json_serial, ensure_ascii=False)
+    except (TypeError, UnicodeDecodeError, OverflowError):
+        return json.dumps(obj, default=json_serial, ensure_ascii=False, separators=(",", ":"))
+
+
+class ForwardPipeline:
+    """Forwards incoming messages to TG_FORWARD_CHAT_ID from a bounded queue.
+
+    submit() is a non-blocking enqueue, so forwarding load can never delay
+    signal handling. A worker drains the queue every `interval` seconds and
+    sends the batch as one JSON document (message or file). When the queue
+    is full, `overflow` decides whether the oldest or newest message is
+    dropped, or whether the new one is spilled to a JSONL file on disk.
+    Spilled messages are serialized and written from a thread, and read
+    back `max_batch` lines at a time and forwarded (as JSON only) whenever
+    the queue has drained, including ones left by an earlier run. A chunk
+    stays on disk until it was sent.
+    """
+
+    def __init__(
+        self,
+        client,
+        forward_id,
+        entity_cache: EntityCache,
+        maxsize: int = 500,
+        interval: float = 2.0,
+        max_batch: int = 20,
+        overflow: str = "drop_oldest",
+        spill_path: Optional[str] = None,
+        native_forward: bool = True,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown forward overflow policy: {overflow}")
+        self.client = client
+        self.forward_id = to_chat_id(forward_id)
+        self.entity_cache = entity_cache
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.interval = interval
+        self.max_batch = max_batch
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self.native_forward = native_forward
+        self.dropped = 0
+        self.spilled = 0
+        self._worker: Optional[asyncio.Task] = None
+        # (chat info, message) waiting for the writer thread
+        self._spill_buf: list[tuple] = []
+        self._spill_task: Optional[asyncio.Task] = None
+        self._spill_lock = asyncio.Lock()
+        self._spill_pending = overflow == "spill" and bool(spill_path)
+        # read position in the .replay file, and backoff after a failed send
+        self._replay_offset = 0
+        self._replay_failures = 0
+        self._replay_after = 0.0
+
+    def submit(self, event):
+        try:
+            self.queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            pass
+        if self.overflow == "drop_oldest":
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.queue.put_nowait(event)
+            self.dropped += 1
+        elif self.overflow == "spill" and self.spill_path:
+            self._spill(event)
+        else:
+            self.dropped += 1
+        if (self.dropped + self.spilled) % 100 == 1:
+            log.warning(f"Forward queue full ({self.overflow}): dropped={self.dropped} spilled={self.spilled}")
+
+    def _spill(self, event):
+        info = self.entity_cache.get(event.chat_id) or f"? (ID: {event.chat_id})"
+        self._spill_buf.append((info, event.message))
+        self.spilled += 1
+        if self._spill_task is None:
+            self._spill_task = asyncio.create_task(self._write_spill())
+
+    async def _write_spill(self):
+        try:
+            async with self._spill_lock:
+                while self._spill_buf:
+                    items, self._spill_buf = self._spill_buf, []
+                    try:
+                        await asyncio.to_thread(self._append_spill, items)
+                        self._spill_pending = True
+                    except Exception as e:
+                        self.spilled -= len(items)
+                        self.dropped += len(items)
+                        log.error(f"❌ Forward spill failed: {e}")
+        finally:
+            self._spill_task = None
+
+    def _append_spill(self, items: list[tuple]):
+        lines = [dumps({"from": info, "message": message.to_dict()}) for info, message in items]
+        with open(self.spill_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+            f.write("\n")
+
+    def _read_spill(self, offset: int) -> tuple[list[str], int]:
+        """Up to max_batch lines of the spill from `offset`, and the offset after them.
+
+        The spill file is moved aside to .replay and read from there, so new
+        spills never interleave with a replay; a .replay left by an earlier
+        run is finished first.
+        """
+        replay = self.spill_path + ".replay"
+        if not os.path.exists(replay):
+            try:
+                os.replace(self.spill_path, replay)
+            except FileNotFoundError:
+                return [], 0
+            offset = 0
+        lines = []
+        with open(replay, "rb") as f:
+            f.seek(offset)
+            while len(lines) < self.max_batch:
+                line = f.readline()
+                if not line:
+                    break
+                offset += len(line)
+                if line.strip():
+                    lines.append(line.decode("utf-8", "replace"))
+        if lines:
+            return lines, offset
+        os.remove(replay)
+        return self._read_spill(0)
+
+    async def _replay_spill(self) -> bool:
+        """Forward the next chunk of spilled messages; False if there is none to send now."""
+        if not self._spill_pending or time.monotonic() < self._replay_after:
+            return False
+        async with self._spill_lock:
+            lines, offset = await asyncio.to_thread(self._read_spill, self._replay_offset)
+            if not lines:
+                self._spill_pending = False
+                self._replay_offset = 0
+                return False
+        records = []
+        for line in lines:
+            try:
+                records.append(ujson.loads(line))
+            except ValueError:
+                # only the last line can be cut short, by a crash mid-write
+                log.warning(f"Skipping unreadable spilled forward: {line[:80]!r}")
+        try:
+            if records:
+                with latency.span("forward.replay"):
+                    await self._send_records(records)
+        except Exception as e:
+            # the offset stays put, so the same chunk is read again after the backoff
+            self._replay_failures += 1
+            delay = min(REPLAY_RETRY_MAX_SEC, REPLAY_RETRY_SEC * 2 ** (self._replay_failures - 1))
+            delay = max(delay, getattr(e, "seconds", 0))  # FloodWait
+            self._replay_after = time.monotonic() + delay
+            log.error(f"❌ Failed to forward {len(records)} spilled message(s), retrying in {delay:.0f}s: {e}")
+            return False
+        self._replay_failures = 0
+        self._replay_offset = offset
+        return True
+
+    async def _next(self):
+        """The next queued event, or None once a backed-off spill replay is due."""
+        wait = self._replay_after - time.monotonic()
+        if not self._spill_pending or wait <= 0:
+            return await self.queue.get()
+        try:
+            return await asyncio.wait_for(self.queue.get(), wait)
+        except asyncio.TimeoutError:
+            return None
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 10.0):
+        """Send what is still queued, then stop the worker; spilled messages stay on disk."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"Forward flush timed out with {self.queue.qsize()} message(s) pending")
+        self._worker.cancel()
+        self._worker = None
+        if self._spill_task is not None:
+            await self._spill_task
+
+    async def _run(self):
+        while True:
+            if self.queue.empty() and await self._replay_spill():
+                continue
+            event = await self._next()
+            if event is None:
+                continue
+            batch = [event]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            t0 = time.perf_counter()
+            try:
+                with latency.span("forward.batch"):
+                    await self._send_batch(batch)
+            except Exception as e:
+                log.error(f"❌ Failed to forward batch of {len(batch)}: {e}")
+            finally:
+                TELEGRAM_SEND.observe(time.perf_counter() - t0, "forward_batch")
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _send_batch(self, events: list):
+        records = []
+        for event in events:
+            chat_info = await self.entity_cache.chat_info(event)
+            # 1. Native Telegram Forward (preserves media, formatting, etc.)
+            if self.native_forward:
+                try:
+                    await event.message.forward_to(self.forward_id)
+                except Exception as e:
+                    log.error(f"❌ Native forward failed: {e}")
+            records.append({"from": chat_info, "message": event.message.to_dict()})
+        await self._send_records(records)
+
+    async def _send_records(self, records: list):
+        # 2. One compact JSON document for the whole batch
+        doc = dumps(records)
+        caption = f"{len(records)} message(s), last from {records[-1]['from']}"
+        if len(doc) > MAX_INLINE_LEN:
+            f = BytesIO(doc.encode("utf-8"))
+            f.name = f"forward_{records[0]['message'].get('id')}_{len(records)}.json"
+            await self.client.send_file(self.forward_id, f, caption=caption)
+        else:
+            await self.client.send_message(self.forward_id, f"**{caption}:**\n```json\n{doc}\n```")
+        log.debug("✅ Forwarded batch of %d", len(records), extra={"sample": True})
@@ -0,0 +1,222 @@
+import os
+import asyncio
+import itertools
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import ujson
+
+log = logging.getLogger("app.ipc")
+
+# One JSON document per line; this bounds a single message
+MAX_LINE = 1 << 20
+
+Handler = Callable[[dict], Awaitable[Optional[dict]]]
+
+
+def _frame(msg: dict) -> bytes:
+    return ujson.dumps(msg, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+class IpcServer:
+    """Newline-delimited JSON over a Unix socket, served by the executor process.
+
+    Every incoming message is passed to `handler`; when it carries an "id"
+    the handler's return value is sent back as {"id", "result"} (or
+    {"id", "error"}), and when it carries a "seq" it is acknowledged with
+    {"ack": seq} once handled. Clients say {"op": "hello", "role": ...}
+    first so broadcast() can target one role, e.g. notifications to the
+    listener.
+    """
+
+    def __init__(self, path: str, handler: Handler):
+        self.path = path
+        self.handler = handler
+        self._clients: dict[asyncio.StreamWriter, str] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous run
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._on_client, self.path, limit=MAX_LINE)
+        log.info(f"🔌 IPC server listening on {self.path}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self._clients):
+            writer.close()
+        self._clients.clear()
+
+    def broadcast(self, msg: dict, role: Optional[str] = None) -> int:
+        """Write msg to every connected client (of `role`) without waiting. Returns how many got it."""
+        data = _frame(msg)
+        sent = 0
+        for writer, client_role in list(self._clients.items()):
+            if role is not None and client_role != role:
+                continue
+            if writer.is_closing():
+                self._clients.pop(writer, None)
+                continue
+            writer.write(data)
+            sent += 1
+        return sent
+
+    async def _on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._clients[writer] = "?"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    msg = ujson.loads(line)
+                except ValueError:
+                    log.error(f"Dropping malformed IPC message: {line[:200]!r}")
+                    continue
+                if msg.get("op") == "hello":
+                    self._clients[writer] = msg.get("role", "?")
+                    log.info(f"🔌 IPC client connected: {self._clients[writer]}")
+                    continue
+                # handled concurrently so a slow request never delays the next signal
+                asyncio.create_task(self._handle(msg, writer))
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            log.warning(f"IPC client {self._clients.get(writer)} dropped: {e}")
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    async def _handle(self, msg: dict, writer: asyncio.StreamWriter):
+        msg_id = msg.get("id")
+        try:
+            result = await self.handler(msg)
+            reply = {"id": msg_id, "result": result}
+        except Exception as e:
+            log.error(f"IPC handler failed for {msg.get('op')}: {e}")
+            reply = {"id": msg_id, "error": str(e)}
+        if writer.is_closing():
+            # no ack: the client resends it on its next connection
+            return
+        if msg_id is not None:
+            writer.write(_frame(reply))
+        if "seq" in msg:
+            writer.write(_frame({"ack": msg["seq"]}))
+
+
+class IpcClient:
+    """Reconnecting client for the executor's IPC socket.
+
+    send() is a non-blocking enqueue into a bounded outbox that is flushed
+    whenever the connection is up, so the caller never waits on the other
+    process (messages queue up while the executor restarts). A sent message
+    is kept until the executor acknowledges it and is written again on the
+    next connection if that never happened; receivers must tolerate the
+    repeat (signals are deduplicated by signal_key). request() waits for
+    the reply to one message and is not resent: its caller gets the error.
+    """
+
+    def __init__(self, path: str, role: str, handler: Optional[Handler] = None, maxsize: int = 1000):
+        self.path = path
+        self.role = role
+        self.handler = handler
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.connected = asyncio.Event()
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._seqs = itertools.count(1)
+        # seq -> message written but not acknowledged yet, oldest first
+        self._unacked: OrderedDict = OrderedDict()
+
+    def send(self, msg: dict) -> bool:
+        # unacknowledged messages count against the same bound as queued ones
+        if self.queue.maxsize and self.queue.qsize() + len(self._unacked) >= self.queue.maxsize:
+            self.dropped += 1
+            log.warning(f"IPC outbox full, dropped {msg.get('op')} message ({self.dropped} total)")
+            return False
+        if "id" not in msg:
+            msg = {**msg, "seq": next(self._seqs)}
+        self.queue.put_nowait(msg)
+        return True
+
+    async def request(self, op: str, timeout: float = 5.0, **fields):
+        if not self.connected.is_set():
+            raise ConnectionError("executor is not connected")
+        msg_id = next(self._ids)
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = fut
+        self.send({"op": op, "id": msg_id, **fields})
+        try:
+            reply = await asyncio.wait_for(fut, timeout)
+        finally:
+            self._pending.pop(msg_id, None)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply.get("result")
+
+    def _write(self, writer: asyncio.StreamWriter, msg: dict):
+        if "seq" in msg:
+            self._unacked[msg["seq"]] = msg
+        writer.write(_frame(msg))
+
+    async def _writer_loop(self, writer: asyncio.StreamWriter):
+        while True:
+            self._write(writer, await self.queue.get())
+            # drain whatever else is queued before waiting on the socket
+            while not self.queue.empty():
+                self._write(writer, self.queue.get_nowait())
+            await writer.drain()
+
+    async def _session(self):
+        reader, writer = await asyncio.open_unix_connection(self.path, limit=MAX_LINE)
+        writer.write(_frame({"op": "hello", "role": self.role}))
+        if self._unacked:
+            # possibly lost with the previous connection; ahead of anything queued since
+            log.info(f"🔌 IPC resending {len(self._unacked)} unacknowledged message(s)")
+            for msg in self._unacked.values():
+                writer.write(_frame(msg))
+        self.connected.set()
+        log.info(f"🔌 IPC connected to {self.path} as {self.role}")
+        sender = asyncio.create_task(self._writer_loop(writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                msg = ujson.loads(line)
+                if "ack" in msg:
+                    self._unacked.pop(msg["ack"], None)
+                    continue
+                fut = self._pending.get(msg.get("id")) if "id" in msg else None
+                if fut is not None:
+                    if not fut.done():
+                        fut.set_result(msg)
+                elif self.handler is not None:
+                    try:
+                        await self.handler(msg)
+                    except Exception as e:
+                        log.error(f"IPC handler failed for {msg.get('op')}: {e}")
+        finally:
+            self.connected.clear()
+            sender.cancel()
+            writer.close()
+
+    async def run(self):
+        backoff = 0.2
+        while True:
+            try:
+                await self._session()
+                backoff = 0.2
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ValueError) as e:
+                log.warning(f"IPC connection to {self.path} failed: {e}")
+            for fut in self._pending.values():
+                if not fut.done():
+                    fut.set_exception(ConnectionError("executor disconnected"))
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 5.0)
@@ -0,0 +1,289 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Optional
+
+import ujson
+
+from app.executor import AccountResult, OrderPlan
+
+log = logging.getLogger("app.journal")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    signal_key TEXT,
+    account TEXT,
+    client_id TEXT,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS signals (
+    signal_key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS brackets (
+    signal_key TEXT NOT NULL,
+    account TEXT NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (signal_key, account)
+);
+CREATE INDEX IF NOT EXISTS brackets_status ON brackets (status);
+"""
+
+# ORDER_TRADE_UPDATE statuses after which a leg is no longer working
+FINAL_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "REJECTED")
+
+
+@dataclass
+class Bracket:
+    """One account's position from one signal plus its protective legs."""
+    signal_key: str
+    account: str
+    symbol: str
+    side: str
+    qty: float
+    entry_price: float
+    tp_price: Optional[float] = None
+    sl_price: Optional[float] = None
+    # leg ("E" / "TP" / "SL", "SL0" for a replaced stop) -> {"client_id", "order_id", "status"}
+    legs: dict = field(default_factory=dict)
+    status: str = "open"
+    opened_at: float = 0.0
+    tps: list = field(default_factory=list)
+    breakeven: bool = False
+
+    @property
+    def close_side(self) -> str:
+        return "BUY" if self.side == "SELL" else "SELL"
+
+    def leg_for(self, client_id: str) -> Optional[str]:
+        return next((leg for leg, o in self.legs.items() if o.get("client_id") == client_id), None)
+
+
+class TradeJournal:
+    """Append-only SQLite (WAL) journal of signals, orders and fills under /data.
+
+    record_*() only enqueue, so the hot path never touches the disk; a
+    background task commits the queue in batches from a worker thread.
+    Besides the `events` log the writer keeps two small tables current
+    (`signals` and `brackets`), so open() can rebuild the deduper and the
+    open-bracket state with two indexed SELECTs instead of replaying history.
+    """
+
+    def __init__(self, path: str, maxsize: int = 10000):
+        self.path = path
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.brackets: dict[tuple[str, str], Bracket] = {}
+        self._by_client_id: dict[str, tuple[str, str]] = {}
+        self.dropped = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    # --- startup ---------------------------------------------------------
+
+    def open(self, signal_window_sec: float = 0.0) -> list[tuple[str, str, float]]:
+        """Create/open the database and load open brackets.
+
+        Returns (signal_key, fingerprint, age_sec) for signals handled within
+        `signal_window_sec`, for seeding the deduper.
+        """
+        started = time.perf_counter()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        for (data,) in self._conn.execute("SELECT data FROM brackets WHERE status = 'open'"):
+            self._track(Bracket(**ujson.loads(data)))
+        recent = []
+        if signal_window_sec > 0:
+            now = time.time()
+            rows = self._conn.execute(
+                "SELECT signal_key, fingerprint, ts FROM signals WHERE ts >= ?", (now - signal_window_sec,),
+            )
+            recent = [(key, fp, now - ts) for key, fp, ts in rows]
+        elapsed = (time.perf_counter() - started) * 1000
+        log.info(f"📒 Journal {self.path}: {len(self.brackets)} open bracket(s), {len(recent)} recent signal(s) in {elapsed:.1f}ms")
+        return recent
+
+    def _track(self, bracket: Bracket):
+        key = (bracket.signal_key, bracket.account)
+        self.brackets[key] = bracket
+        for leg in bracket.legs.values():
+            if leg.get("client_id"):
+                self._by_client_id[leg["client_id"]] = key
+
+    def _untrack(self, bracket: Bracket):
+        self.brackets.pop((bracket.signal_key, bracket.account), None)
+        for leg in bracket.legs.values():
+            self._by_client_id.pop(leg.get("client_id"), None)
+
+    def open_brackets(self, symbol: Optional[str] = None) -> list[Bracket]:
+        return [b for b in self.brackets.values() if symbol is None or b.symbol == symbol]
+
+    def find(self, client_id: Optional[str]) -> Optional[tuple[Bracket, str]]:
+        """(open bracket, leg) that owns this newClientOrderId."""
+        key = self._by_client_id.get(client_id)
+        bracket = self.brackets.get(key) if key else None
+        if bracket is None:
+            return None
+        return bracket, bracket.leg_for(client_id)
+
+    # --- recording (non-blocking) ----------------------------------------
+
+    def _put(self, item: tuple):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            log.error(f"Journal queue full, dropped {item[0]} record ({self.dropped} total)")
+
+    def _put_bracket(self, bracket: Bracket, ts: float):
+        # serialized here: the bracket keeps changing on the event loop while the row waits for the writer
+        self._put(("bracket", ts, bracket.signal_key, bracket.account, bracket.status, ujson.dumps(asdict(bracket))))
+
+    def record_signal(self, signal_key: str, fingerprint: str, data: dict):
+        self._put(("signal", time.time(), signal_key, fingerprint, data))
+
+    def record_execution(self, plan: OrderPlan, results: list[AccountResult]) -> list[Bracket]:
+        """Journal every order of an executed signal; returns the bracket opened per filled account."""
+        now = time.time()
+        opened = []
+        for res in results:
+            legs = {}
+            if res.entry is not None:
+                legs["E"] = {
+                    "client_id": res.entry.get("clientOrderId"),
+                    "order_id": res.entry.get("orderId"),
+                    "status": res.entry.get("status"),
+                }
+            for leg in res.legs:
+                order = leg.order or {}
+                legs[leg.leg] = {
+                    "client_id": order.get("clientOrderId"),
+                    "order_id": order.get("orderId"),
+                    "status": order.get("status") if leg.ok else "FAILED",
+                    "error": leg.error,
+                }
+            self._put(("execution", now, plan.signal_key, res.account, {
+                "symbol": plan.symbol, "side": plan.side, "qty": res.qty,
+                "error": res.error, "entry": res.entry, "legs": legs,
+            }))
+            if res.entry is None:
+                continue
+            bracket = Bracket(
+                signal_key=plan.signal_key or "",
+                account=res.account,
+                symbol=plan.symbol,
+                side=plan.side,
+                qty=res.qty,
+                entry_price=float(res.entry.get("avgPrice") or plan.ref_price),
+                tp_price=plan.tp_price,
+                sl_price=plan.sl_price,
+                legs=legs,
+                opened_at=now,
+                tps=list(plan.tps),
+            )
+            self._track(bracket)
+            self._put_bracket(bracket, now)
+            opened.append(bracket)
+        return opened
+
+    def on_order_update(self, order: dict):
+        """Fill / cancel from the user data stream (AccountMirror listener)."""
+        found = self.find(order.get("clientOrderId"))
+        if found is not None:
+            self.update_leg(*found, order)
+
+    def update_leg(self, bracket: Bracket, leg: str, order: dict):
+        """Record a new status for one leg; also works after the bracket closed (late cancels)."""
+        bracket.legs[leg]["status"] = order.get("status")
+        now = time.time()
+        self._put(("order", now, bracket.signal_key, bracket.account, order))
+        # a filled TP or stop closes the position
+        if leg != "E" and order.get("status") == "FILLED" and bracket.status == "open":
+            bracket.status = "closed"
+            self._untrack(bracket)
+        self._put_bracket(bracket, now)
+
+    def replace_leg(self, bracket: Bracket, leg: str, info: dict, keep_as: str):
+        """Swap in a new order for `leg`; the old one stays tracked as `keep_as` until it is canceled."""
+        bracket.legs[keep_as] = bracket.legs[leg]
+        bracket.legs[leg] = info
+        if bracket.status == "open":
+            self._track(bracket)
+        self._put_bracket(bracket, time.time())
+
+    # --- writer ----------------------------------------------------------
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 10.0):
+        """Flush pending records, then stop the writer and close the database."""
+        if self._worker is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                log.warning(f"Journal flush timed out with {self.queue.qsize()} record(s) pending")
+            self._worker.cancel()
+            self._worker = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                log.error(f"❌ Journal write failed ({len(batch)} record(s)): {e}")
+            for _ in batch:
+                self.queue.task_done()
+
+    def _write(self, batch: list[tuple]):
+        """One transaction per drained batch (runs in a worker thread)."""
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            for item in batch:
+                kind, ts = item[0], item[1]
+                if kind == "signal":
+                    _, _, signal_key, fingerprint, data = item
+                    conn.execute(
+                        "INSERT OR REPLACE INTO signals (signal_key, fingerprint, ts) VALUES (?, ?, ?)",
+                        (signal_key, fingerprint, ts),
+                    )
+                    conn.execute(
+                        "INSERT INTO events (ts, kind, signal_key, data) VALUES (?, ?, ?, ?)",
+                        (ts, kind, signal_key, ujson.dumps(data)),
+                    )
+                elif kind == "bracket":
+                    _, _, signal_key, account, status, data = item
+                    conn.execute(
+                        "INSERT OR REPLACE INTO brackets (signal_key, account, status, data, updated) VALUES (?, ?, ?, ?, ?)",
+                        (signal_key, account, status, data, ts),
+                    )
+                else:
+                    _, _, signal_key, account, data = item
+                    conn.execute(
+                        "INSERT INTO events (ts, kind, signal_key, account, client_id, data) VALUES (?, ?, ?, ?, ?, ?)",
+                        (ts, kind, signal_key, account, data.get("clientOrderId"), ujson.dumps(data)),
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
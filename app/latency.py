@@ -0,0 +1,131 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from typing import Optional
+
+log = logging.getLogger("app.latency")
+
+
+def _percentile(sorted_samples: list[float], pct: float) -> float:
+    # nearest-rank percentile; samples are already sorted
+    idx = max(0, min(len(sorted_samples) - 1, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[idx]
+
+
+class LatencyTracker:
+    """Rolling in-memory latency samples per stage, in milliseconds."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+
+    def record(self, stage: str, ms: float):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self.window)
+        samples.append(ms)
+
+    @contextmanager
+    def span(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - t0) * 1000)
+
+    def timed(self, stage: str):
+        """Decorator recording the wall time of every call under `stage`."""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(stage):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def percentiles(self, stage: str) -> Optional[dict]:
+        samples = self._samples.get(stage)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "p50": _percentile(ordered, 50),
+            "p95": _percentile(ordered, 95),
+            "p99": _percentile(ordered, 99),
+            "max": ordered[-1],
+        }
+
+    def snapshot(self) -> dict[str, dict]:
+        return {stage: self.percentiles(stage) for stage in sorted(self._samples) if self._samples[stage]}
+
+    def reset(self):
+        self._samples.clear()
+
+
+class SignalTrace:
+    """Monotonic per-stage timestamps for one signal, from Telegram receive to last ack."""
+
+    def __init__(self, tracker: LatencyTracker, msg_date: Optional[datetime] = None, key: Optional[str] = None):
+        self.tracker = tracker
+        self.key = key
+        self.t0 = self.last = time.monotonic()
+        self.stages: list[tuple[str, float]] = []
+        if msg_date is not None:
+            # message date is second-resolution server time, so this is coarse
+            self.delivery_ms = max(0.0, (time.time() - msg_date.timestamp()) * 1000)
+            tracker.record("tg_delivery", self.delivery_ms)
+        else:
+            self.delivery_ms = None
+
+    def mark(self, stage: str) -> float:
+        """Close the current stage; returns its duration in ms."""
+        now = time.monotonic()
+        ms = (now - self.last) * 1000
+        self.last = now
+        self.stages.append((stage, ms))
+        self.tracker.record(f"signal.{stage}", ms)
+        return ms
+
+    def finish(self) -> float:
+        total = (time.monotonic() - self.t0) * 1000
+        self.tracker.record("signal.total", total)
+        # summary() runs on the logging thread, not here
+        log.info(
+            "⏱ Signal trace: %s | total=%.1fms", self, total,
+            extra={"signal": self.key, "stage": "total", "ms": round(total, 1), "stages": {s: round(ms, 2) for s, ms in self.stages}},
+        )
+        return total
+
+    def __str__(self) -> str:
+        return self.summary()
+
+    def summary(self) -> str:
+        parts = [f"{stage}={ms:.1f}ms" for stage, ms in self.stages]
+        if self.delivery_ms is not None:
+            parts.insert(0, f"tg_delivery={self.delivery_ms:.0f}ms")
+        return " ".join(parts)
+
+
+def format_report(tracker: LatencyTracker) -> str:
+    snap = tracker.snapshot()
+    if not snap:
+        return "No latency samples yet."
+    lines = [f"{'stage':<32} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8}"]
+    for stage, p in snap.items():
+        lines.append(f"{stage[:32]:<32} {p['count']:>5} {p['p50']:>8.1f} {p['p95']:>8.1f} {p['p99']:>8.1f}")
+    return "\n".join(lines)
+
+
+latency = LatencyTracker()
@@ -1,8 +1,102 @@
+import sys
+import atexit
+import queue
 import logging
+import logging.handlers
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
 
-def setup_logger(level: str = "INFO"):
-    logging.basicConfig(
-        level=getattr(logging, level.upper(), logging.INFO),
-        format="%(asctime)s | %(levelname)s | %(message)s",
-    )
-    return logging.getLogger("tg-signal-binance")
+import ujson
+
+LOGGER_NAME = "tg-signal-binance"
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(message)s"
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record untouched; message, args and traceback are formatted on the listener thread.
+
+    The stock QueueHandler formats in the caller, which would put that work
+    back on the event loop. Pass immutable args (or ones nobody mutates later)
+    to %-style calls.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class SampleFilter(logging.Filter):
+    """Keep 1 in `every` records logged with extra={"sample": True}, per call site.
+
+    For high-volume lines (per request / per forwarded message). Errors are
+    never sampled; kept records carry `sampled=every` so counts can be scaled.
+    """
+
+    def __init__(self, every: int = 100):
+        super().__init__()
+        self.every = max(1, every)
+        self._seen: Counter = Counter()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or not getattr(record, "sample", False) or record.levelno >= logging.ERROR:
+            return True
+        site = (record.pathname, record.lineno)
+        n = self._seen[site]
+        self._seen[site] = n + 1
+        if n % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus any `extra=` fields (signal, stage, ms, ...)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != "sample":
+                doc[key] = value
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        return ujson.dumps(doc, ensure_ascii=False, default=str)
+
+
+def setup_logger(level: str = "INFO", fmt: str = "text", sample_every: int = 100):
+    """Route all logging through a queue drained by a background thread.
+
+    Callers only pay for building the LogRecord and a queue put; formatting
+    and the stdout write happen on the listener thread. `fmt` is "text"
+    (the classic `time | LEVEL | message` line) or "json".
+    """
+    global _listener
+    log = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return log
+
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    handler = DeferredQueueHandler(queue.SimpleQueue())
+    handler.addFilter(SampleFilter(sample_every))
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    _listener = logging.handlers.QueueListener(handler.queue, stream)
+    _listener.start()
+    # flush what is still queued on interpreter exit
+    atexit.register(_listener.stop)
+    return log
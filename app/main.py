@@ -1,170 +1,200 @@
+import sys
+import time
+import signal
 import asyncio
-import json
-from datetime import datetime, date
-from telethon import TelegramClient, events
+import logging
+import argparse
+from datetime import datetime, timezone
+from typing import Optional
 
-from app.config import load_settings
-from app.logger import setup_logger
-from app.parser import parse_signal
-from app.binance_client import BinanceFutures
-from app.bot_server import build_bot_app
+from app.container import Container
+from app.parser import Signal, parse_signal
+from app.latency import latency, SignalTrace, format_report
+from app.router import MessageRouter
+from app.executor import AccountResult, OrderPlan, fill_spread_ms
+from app.dedup import fingerprint
+from app.ipc import IpcServer, IpcClient
+from app.catchup import BACKLOG, STALE
+from app.metrics import ORDERS, PARSES, SIGNALS, MetricsServer, metrics, watch_loop_lag
 
-settings = load_settings()
-log = setup_logger(settings.LOG_LEVEL)
+# Everything (settings, clients, streams) is built on first use, so importing this module is free
+container = Container()
+log = logging.getLogger("tg-signal-binance")
 
-client = TelegramClient(settings.TG_SESSION, settings.TG_API_ID, settings.TG_API_HASH)
+DEFAULT_LISTEN_CHAT_ID = 1685845137
 
-binance = BinanceFutures(
-    api_key=settings.BINANCE_API_KEY,
-    api_secret=settings.BINANCE_API_SECRET,
-    base_url=settings.BINANCE_BASE_URL,
-)
+router = MessageRouter()
 
+# Set by main() in the split roles: the executor serves the socket, listener and bot connect to it
+ipc_server: IpcServer = None
+ipc_client: IpcClient = None
 
-def map_symbol(tg_symbol: str) -> str:
-    return settings.SYMBOL_MAP.get(tg_symbol, tg_symbol)
-
-
-def calc_qty(usdt: float, leverage: int, entry_price: float) -> float:
-    notional = usdt * leverage
-    return notional / entry_price
-
-@client.on(events.NewMessage())
-async def forward_all_messages(event):
-    """Forward ALL incoming messages as JSON if TG_FORWARD_CHAT_ID is configured"""
-    if not settings.TG_FORWARD_CHAT_ID:
-        return
-    
-    text = getattr(event.message, 'message', '')
-    try:
-        chat = await event.get_chat()
-        chat_info = f"{chat.title if hasattr(chat, 'title') else chat.first_name} (ID: {event.chat_id})"
-        log.info(f"📩 Message from {chat_info} | Text: {text[:50]}... | Forwarding to {settings.TG_FORWARD_CHAT_ID}")
-        
-        msg_dict = event.message.to_dict()
-        def json_serial(obj):
-            if isinstance(obj, (datetime, date)):
-                return obj.isoformat()
-            if isinstance(obj, bytes):
-                return obj.hex()
-            return str(obj)
-
-        msg_json = json.dumps(msg_dict, default=json_serial, indent=2)
-        
-        forward_id = settings.TG_FORWARD_CHAT_ID
-        if forward_id.isdigit() or (forward_id.startswith('-') and forward_id[1:].isdigit()):
-            forward_id = int(forward_id)
-        
-        # 1. Native Telegram Forward (preserves media, formatting, etc.)
-        try:
-            await event.message.forward_to(forward_id)
-            log.info(f"➡️ Native forward successful")
-        except Exception as e:
-            log.error(f"❌ Native forward failed: {e}")
-
-        # 2. JSON Dump (as requested in previous feature)
-        if len(msg_json) > 4000:
-            from io import BytesIO
-            f = BytesIO(msg_json.encode('utf-8'))
-            f.name = f"msg_{event.message.id}.json"
-            await client.send_file(forward_id, f, caption=f"From {chat_info}")
-        else:
-            await client.send_message(forward_id, f"**From {chat_info}:**\n```json\n{msg_json}\n```")
-        log.info(f"✅ JSON dump completed")
-    except Exception as e:
-        log.error(f"❌ Failed to forward message: {e}")
-
-async def notify_chats(message: str):
-    """Send message to TG_ADMIN_CHAT_ID and TG_ORDER_CHAT_ID"""
-    chats_to_notify = []
-    if settings.TG_ADMIN_CHAT_ID:
-        chats_to_notify.append(settings.TG_ADMIN_CHAT_ID)
-    if settings.TG_ORDER_CHAT_ID:
-        chats_to_notify.append(settings.TG_ORDER_CHAT_ID)
-
-    for chat_id in chats_to_notify:
-        try:
-            target_id = chat_id
-            if str(target_id).replace('-', '').isdigit():
-                target_id = int(target_id)
-            await client.send_message(target_id, message)
-        except Exception as e:
-            log.error(f"Failed to send notification to {chat_id}: {e}")
 
-@client.on(events.NewMessage())
-async def on_new_message(event):
-    """Process trading signals from configured listen chat for notification and execution"""
-    DEFAULT_LISTEN_CHAT_ID = 1685845137
+def map_symbol(tg_symbol: str) -> str:
+    return container.settings.SYMBOL_MAP.get(tg_symbol, tg_symbol)
 
+def signal_chat_ids() -> set[int]:
+    """Chats whose messages are parsed as signals: the listen chat (or default) and the admin chat."""
     allowed_chat_ids = set()
 
     # 1. Configured Listen ID (or default)
-    listen_id = getattr(settings, "TG_LISTEN_CHAT_ID", None)
+    listen_id = getattr(container.settings, "TG_LISTEN_CHAT_ID", None)
     if listen_id in (None, "", 0, ""):
         listen_id = DEFAULT_LISTEN_CHAT_ID
-    
-    try:
-        listen_id_str = str(listen_id).strip()
-        if listen_id_str.replace("-", "").isdigit():
-            allowed_chat_ids.add(int(listen_id_str))
-    except Exception as e:
-        log.error(f"Error parsing listen_id: {e}")
+
+    listen_id_str = str(listen_id).strip()
+    if listen_id_str.replace("-", "").isdigit():
+        allowed_chat_ids.add(int(listen_id_str))
+    else:
+        log.error(f"Invalid TG_LISTEN_CHAT_ID: {listen_id}")
 
     # 2. Admin ID (always allowed to send signals)
-    if settings.TG_ADMIN_CHAT_ID:
-        try:
-            admin_id_str = str(settings.TG_ADMIN_CHAT_ID).strip()
-            if admin_id_str.replace("-", "").isdigit():
-                allowed_chat_ids.add(int(admin_id_str))
-        except Exception as e:
-            log.error(f"Error parsing admin_id: {e}")
+    if container.settings.TG_ADMIN_CHAT_ID:
+        admin_id_str = str(container.settings.TG_ADMIN_CHAT_ID).strip()
+        if admin_id_str.replace("-", "").isdigit():
+            allowed_chat_ids.add(int(admin_id_str))
+        else:
+            log.error(f"Invalid TG_ADMIN_CHAT_ID: {container.settings.TG_ADMIN_CHAT_ID}")
 
-    if event.chat_id not in allowed_chat_ids:
-        return
+    return allowed_chat_ids
 
+async def forward_all_messages(event):
+    """Hand every incoming message to the forwarding pipeline (non-blocking)"""
+    container.forwarder.submit(event)
 
+def notify_chats(message: str, key: str = None):
+    """Queue message for TG_ADMIN_CHAT_ID and TG_ORDER_CHAT_ID (never blocks).
+
+    Messages with the same key (one signal) are edited into a single message.
+    In the executor process they are relayed to the listener, which owns the Telethon client.
+    """
+    if ipc_server is not None:
+        ipc_server.broadcast({"op": "notify", "message": message, "key": key}, role="listener")
+    else:
+        container.outbox.notify(message, key)
+
+async def on_new_message(event):
+    """Process trading signals from configured listen chat for notification and execution"""
     text = event.raw_text.strip()
     if not text:
         return
 
+    msg_date = getattr(event.message, "date", None)
+    signal_key = f"{event.chat_id}:{event.message.id}"
+    trace = SignalTrace(latency, msg_date, key=signal_key)
+
     # Try to parse as signal first
     sig = parse_signal(text)
+    PARSES.inc("hit" if sig else "miss")
     if not sig:
         return
+    trace.mark("parse")
+
+    chat_info = await container.entity_cache.chat_info(event)
+    trace.mark("get_chat")
+
+    if ipc_client is not None:
+        # listener process: hand off to the executor and get back to reading Telegram
+        ipc_client.send({
+            "op": "signal",
+            "signal_key": signal_key,
+            "date": msg_date.timestamp() if msg_date else None,
+            "text": text,
+            "chat_info": chat_info,
+            "signal": vars(sig),
+        })
+        return
+    await execute_signal(sig, signal_key, text, chat_info, trace, msg_date)
+
+async def execute_signal(
+    sig: Signal, signal_key: str, text: str, chat_info: str, trace: SignalTrace, msg_date: Optional[datetime] = None,
+):
+    """Dedup, staleness, risk checks, TP/SL levels and execution for one parsed signal"""
+    # Redelivered updates and reposted signals must not open a second position
+    fp = fingerprint(sig)
+    duplicate = container.deduper.check(signal_key, fp)
+    if duplicate:
+        log.warning(
+            "Duplicate %s %s (%s %s %s), skipping", duplicate, signal_key, sig.symbol, sig.side, sig.entry,
+            extra={"signal": signal_key, "stage": "dedup"},
+        )
+        SIGNALS.inc("duplicate")
+        return
+    if container.journal:
+        container.journal.record_signal(signal_key, fp, {"text": text, **vars(sig)})
+
+    # Backlog replayed after a reconnect: drop or notify old signals, keep only the newest per symbol
+    catchup = container.catchup
+    msg_ts = msg_date.timestamp() if msg_date else None
+    age = container.binance.timestamp_ms() / 1000 - msg_ts if msg_ts else None
+    verdict = catchup.classify(age)
+    if verdict == BACKLOG:
+        if not await catchup.newest(sig.symbol, msg_ts, signal_key):
+            skip_signal(sig, signal_key, f"superseded by a newer {sig.symbol} signal in the backlog", "superseded")
+            return
+        trace.mark("catchup")
+    elif verdict == STALE:
+        skip_signal(sig, signal_key, f"{age:.0f}s old (max {catchup.max_age:.0f}s)", "stale")
+        return
+    elif msg_ts:
+        catchup.supersede(sig.symbol, msg_ts, signal_key)
 
     # If it is a signal, always prepare info
     symbol = 'XAUUSDT'# map_symbol(sig.symbol)
     side = sig.side.upper()
-    close_side = "BUY" if side == "SELL" else "SELL"
-    
-    qty = calc_qty(settings.DEFAULT_USDT_PER_TRADE, settings.DEFAULT_LEVERAGE, sig.entry)
-    qty = await binance.round_quantity(symbol, qty)
-    qty = float(f"{qty:.3f}")
+
+    # Live mark price from the local stream table (no REST); falls back to the signal's entry
+    mark_price = container.market.price(symbol)
+    if mark_price and container.settings.MAX_ENTRY_DEVIATION_PCT > 0:
+        deviation = abs(mark_price - sig.entry) / sig.entry * 100
+        if deviation > container.settings.MAX_ENTRY_DEVIATION_PCT:
+            log.warning(f"Signal entry {sig.entry} is {deviation:.2f}% from mark {mark_price}, skipping")
+            notify_chats(
+                f"⏭ *Signal Skipped*\n`{symbol}` entry `{sig.entry}` is `{deviation:.2f}%` from mark `{mark_price}`",
+                signal_key,
+            )
+            SIGNALS.inc("skipped")
+            return
+    ref_price = mark_price or sig.entry
+
+    # Existing exposure from the local account mirror (no REST)
+    if container.account_mirror.ready:
+        open_amt = container.account_mirror.position_amt(symbol)
+        if open_amt and container.settings.SKIP_IF_POSITION_OPEN:
+            log.warning(f"{symbol} already has an open position ({open_amt}), skipping signal")
+            notify_chats(f"⏭ *Signal Skipped*\n`{symbol}` already has an open position `{open_amt}`", signal_key)
+            SIGNALS.inc("skipped")
+            return
 
     # Determine SL price
     sl_price = sig.sl
-    if sl_price is None and settings.PLACE_SL_ORDER:
+    if sl_price is None and container.settings.PLACE_SL_ORDER:
         if side == "BUY":
-            sl_price = sig.entry - 10
+            sl_price = ref_price - 10
         else:
-            sl_price = sig.entry + 10
+            sl_price = ref_price + 10
 
     # Determine TP price
     tp_price = None
-    if settings.PLACE_TP_ORDERS and sig.tps:
-        idx = settings.TP_INDEX - 1
+    if container.settings.PLACE_TP_ORDERS and sig.tps:
+        idx = container.settings.TP_INDEX - 1
         if 0 <= idx < len(sig.tps):
             tp_price = sig.tps[idx]
 
-    chat = await event.get_chat()
-    chat_info = f"{chat.title if hasattr(chat, 'title') else chat.first_name} (ID: {event.chat_id})"
-    
+    # Snap TP/SL to the symbol tickSize (served from the exchange-info cache)
+    if tp_price:
+        tp_price = await container.binance.round_price(symbol, tp_price)
+    if sl_price:
+        sl_price = await container.binance.round_price(symbol, sl_price)
+    trace.mark("round_price")
+
     order_info = (
         f"🌟 *Signal Detected*\n"
         f"• From: `{chat_info}`\n"
         f"• Symbol: `{symbol}` ({sig.symbol})\n"
         f"• Side: `{side}`\n"
         f"• Entry: `{sig.entry}`\n"
+        f"• Mark: `{mark_price if mark_price else 'N/A'}`\n"
         f"• SL: `{sl_price if sl_price else 'N/A'}`\n"
         f"• TP: `{tp_price if tp_price else 'N/A'}`"
     )
@@ -180,67 +210,176 @@ async def on_new_message(event):
     #     except Exception as e:
     #         log.error(f"Failed to send order info to order chat: {e}")
 
-    log.info(f"🚀 Executing trade for signal from {chat_info}...")
+    log.info("🚀 Executing trade for signal from %s...", chat_info, extra={"signal": signal_key, "stage": "execute"})
     
     # Notify Admin that execution is starting
     notify_msg = f"⚡ *Executing Trade*\n" + order_info
-    await notify_chats(notify_msg)
-
-    if qty <= 0:
-        log.error("Invalid qty")
-        return
-
-    # entry order
-    try:
-        r_entry = await binance.market_order(symbol, side, qty)
-        await notify_chats(f"✅ *ENTRY OK*\n`{symbol}` {side} qty `{qty}` price `{r_entry.get('avgPrice', sig.entry)}`")
-    except Exception as e:
-        err_msg = f"❌ *ENTRY FAILED*\n`{symbol}` {side} qty `{qty}` price `\nError: `{e}`"
-        log.error(f"Entry order failed: {e}")
-        await notify_chats(err_msg)
-        return
-
-    # TP
-    if tp_price:
-        try:
-            r_tp = await binance.limit_reduce_only(symbol, close_side, qty, tp_price)
-            log.info(f"TP{settings.TP_INDEX} placed @ {tp_price}: {r_tp}")
-            await notify_chats(f"🎯 *TP{settings.TP_INDEX} Placed*\nPrice: `{tp_price}`")
-        except Exception as e:
-            log.error(f"TP{settings.TP_INDEX} failed @ {tp_price}: {e}")
-            await notify_chats(f"⚠️ *TP{settings.TP_INDEX} Failed*\nError: `{e}`")
-
-    # SL
-    if settings.PLACE_SL_ORDER and sl_price:
-        try:
-            r_sl = await binance.stop_market_reduce_only(symbol, close_side, qty, sl_price)
-            log.info(f"SL placed @ {sl_price}: {r_sl}")
-            await notify_chats(f"🛑 *SL Placed*\nPrice: `{sl_price}`")
-        except Exception as e:
-            log.error(f"SL failed: {e}")
-            await notify_chats(f"⚠️ *SL Failed*\nError: `{e}`")
+    notify_chats(notify_msg, signal_key)
+
+    plan = OrderPlan(
+        symbol, side, ref_price,
+        tp_price=tp_price,
+        sl_price=sl_price if container.settings.PLACE_SL_ORDER else None,
+        signal_key=signal_key,
+        tps=tuple(sig.tps),
+    )
+    # entry + TP/SL for every account at once
+    results = await container.executor.execute(plan)
+    trace.mark("execute")
+    SIGNALS.inc("executed")
+    if container.journal:
+        opened = container.journal.record_execution(plan, results)
+        if container.brackets:
+            for bracket in opened:
+                container.brackets.watch(bracket)
+    report_results(plan, results, signal_key)
+    trace.finish()
+    container.signal_done()
+
+def skip_signal(sig: Signal, signal_key: str, reason: str, outcome: str):
+    """Old signal from a catch-up burst: never executed, optionally still announced."""
+    SIGNALS.inc(outcome)
+    log.warning(
+        "Not executing %s %s %s @ %s: %s", signal_key, sig.symbol, sig.side, sig.entry, reason,
+        extra={"signal": signal_key, "stage": "catchup"},
+    )
+    if container.settings.STALE_SIGNAL_ACTION == "notify":
+        notify_chats(
+            f"⏭ *Old Signal Not Executed*\n`{sig.symbol}` {sig.side.upper()} entry `{sig.entry}`\nReason: {reason}",
+            signal_key,
+        )
+
+def report_results(plan: OrderPlan, results: list[AccountResult], signal_key: str):
+    multi = len(results) > 1
+    tp_index = container.settings.TP_INDEX
+    extra = {"signal": signal_key, "stage": "report"}
+    for res in results:
+        tag = f"[{res.account}] " if multi else ""
+        ORDERS.inc(res.account, "entry", "ok" if res.entry is not None else "failed")
+        if res.entry is None:
+            log.error("%sEntry order failed: %s", tag, res.error, extra={**extra, "account": res.account})
+            notify_chats(f"❌ *ENTRY FAILED*\n{tag}`{plan.symbol}` {plan.side} qty `{res.qty}`\nError: `{res.error}`", signal_key)
+            continue
+        notify_chats(f"✅ *ENTRY OK*\n{tag}`{plan.symbol}` {plan.side} qty `{res.qty}` price `{res.entry.get('avgPrice', plan.ref_price)}`", signal_key)
+        for r in res.legs:
+            ORDERS.inc(res.account, r.leg, "ok" if r.ok else "failed")
+            if r.leg == "TP":
+                if r.ok:
+                    log.info("%sTP%d placed @ %s: %s", tag, tp_index, plan.tp_price, r.order, extra={**extra, "account": res.account})
+                    notify_chats(f"🎯 *TP{tp_index} Placed*\n{tag}Price: `{plan.tp_price}`", signal_key)
+                else:
+                    log.error("%sTP%d failed @ %s: %s", tag, tp_index, plan.tp_price, r.error, extra={**extra, "account": res.account})
+                    notify_chats(f"⚠️ *TP{tp_index} Failed*\n{tag}Error: `{r.error}`", signal_key)
+            else:
+                if r.ok:
+                    log.info("%sSL placed @ %s: %s", tag, plan.sl_price, r.order, extra={**extra, "account": res.account})
+                    notify_chats(f"🛑 *SL Placed*\n{tag}Price: `{plan.sl_price}`", signal_key)
+                else:
+                    log.error("%sSL failed: %s", tag, r.error, extra={**extra, "account": res.account})
+                    notify_chats(f"⚠️ *SL Failed*\n{tag}Error: `{r.error}`", signal_key)
+    if multi:
+        filled = sum(1 for r in results if r.entry is not None)
+        notify_chats(
+            f"📊 *Accounts*: `{filled}/{len(results)}` filled, spread `{fill_spread_ms(results):.0f}ms`",
+            signal_key,
+        )
+
+def add_routes():
+    """Routes are fixed at startup: signal chats first, then (optionally) forwarding for every chat"""
+    router.add(on_new_message, signal_chat_ids())
+    if container.forwarder:
+        router.add(forward_all_messages)
+
+async def route_message(event):
+    await router.dispatch(event)
+
+async def close_pipelines():
+    """Deliver queued forwards and notifications; both go out through the Telethon client."""
+    if container.forwarder:
+        await container.forwarder.close()
+    await container.outbox.close()
 
 async def run_telethon():
+    from telethon import events, functions
+
+    client = container.tg_client
+    client.add_event_handler(route_message, events.NewMessage())
     await client.start()
     me = await client.get_me()
-    log.info(f"Telethon signed in as: {me.first_name} (@{me.username})")
+    ms = container.mark("telethon")
+    log.info(f"Telethon signed in as: {me.first_name} (@{me.username}) {ms:.0f}ms after start")
     log.info("Listening for signals from ALL joined chats...")
-        
-    await client.run_until_disconnected()
+
+    # run_until_disconnected() would disconnect in its own finally, before a shutdown
+    # could flush what is still queued for this client
+    try:
+        await client(functions.updates.GetStateRequest())
+        await client.disconnected
+    finally:
+        await close_pipelines()
+        await client.disconnect()
 
 async def run_bot():
-    bot_app = build_bot_app()
+    from app.bot_server import build_bot_app
+
+    mirror = container.account_mirror if container.settings.ACCOUNT_STREAM_ENABLED and ipc_client is None else None
+    bot_app = build_bot_app(container, account_mirror=mirror, ipc=ipc_client)
     await bot_app.initialize()
     await bot_app.start()
     await bot_app.updater.start_polling()
-    await asyncio.Event().wait()
-
-async def main():
-    log.info("Starting Telethon + Telegram Bot...")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await bot_app.updater.stop()
+        await bot_app.stop()
+        await bot_app.shutdown()
+
+async def handle_ipc(msg: dict):
+    """Executor side of the IPC socket: signals from the listener, queries from the bot."""
+    op = msg.get("op")
+    if op == "signal":
+        date = msg.get("date")
+        msg_date = datetime.fromtimestamp(date, timezone.utc) if date else None
+        trace = SignalTrace(latency, msg_date, key=msg["signal_key"])
+        trace.mark("ipc")
+        await execute_signal(Signal(**msg["signal"]), msg["signal_key"], msg["text"], msg["chat_info"], trace, msg_date)
+    elif op == "balance":
+        if not container.account_mirror.ready:
+            raise RuntimeError("account mirror not ready")
+        balances, account, positions = container.account_mirror.snapshot()
+        return {"balances": balances, "account": account, "positions": positions}
+    elif op == "latency":
+        return format_report(latency)
+    else:
+        raise ValueError(f"unknown IPC op {op!r}")
+
+async def handle_listener_ipc(msg: dict):
+    """Listener side: notifications produced by the executor go out through our outbox."""
+    if msg.get("op") == "notify":
+        container.outbox.notify(msg["message"], msg.get("key"))
+
+async def start_execution():
+    """Journal, Binance warm-up and the market/account streams (roles all and executor)."""
+    # Open brackets and recently executed signals survive restarts
+    if container.journal:
+        try:
+            for signal_key, fp, age in container.journal.open(container.settings.DEDUP_WINDOW_SEC):
+                container.deduper.restore(signal_key, fp, age)
+            container.journal.start()
+        except Exception as e:
+            log.error(f"❌ Trade journal unavailable: {e}")
+        container.mark("journal")
     
+    # Pre-warm the pooled connection and sync server time before the first signal
+    await container.executor.warm_up(container.market.symbols, apply_leverage=container.settings.APPLY_LEVERAGE)
+    for acc in container.executor.accounts:
+        asyncio.create_task(acc.client.run_keepalive(container.settings.BINANCE_KEEPALIVE_SEC))
+    container.mark("warm_up")
+    log.info(f"👥 Executing for {len(container.executor.accounts)} account(s): {', '.join(a.name for a in container.executor.accounts)}")
+
     # Verify Binance connection
     try:
-        balance = await binance.futures_account_balance()
+        balance = await container.binance.futures_account_balance()
         log.info("✅ Binance connection verified.")
         # Attempt to log USDT balance if available
         usdt_balance = next((b for b in balance if b['asset'] == 'USDT'), None)
@@ -249,7 +388,169 @@ async def main():
     except Exception as e:
         log.error(f"❌ Binance connection failed: {e}")
 
-    await asyncio.gather(run_telethon(), run_bot())
+    # Load symbol filters up front so signals never wait on exchangeInfo
+    try:
+        await container.binance.exchange_info.load()
+    except Exception as e:
+        log.error(f"❌ Exchange info load failed: {e}")
+    container.mark("exchange_info")
+    asyncio.create_task(container.binance.exchange_info.run_refresh(container.settings.EXCHANGE_INFO_REFRESH_SEC))
+
+    # Fills cancel the orphaned leg; brackets restored from the journal are re-checked once
+    if container.brackets:
+        container.brackets.notify = notify_chats
+        container.brackets.load()
+
+    if container.settings.MARKET_DATA_ENABLED:
+        asyncio.create_task(container.market.run())
+    if container.settings.ACCOUNT_STREAM_ENABLED:
+        asyncio.create_task(container.account_mirror.run())
+
+async def stop_execution():
+    if container.brackets:
+        await container.brackets.close()
+    if container.journal:
+        await container.journal.close()
+    await container.executor.close()
+
+async def run_executor():
+    """Executor process: owns the Binance clients, journal and streams; serves the IPC socket."""
+    global ipc_server
+    try:
+        await start_execution()
+        ipc_server = IpcServer(container.settings.IPC_SOCKET_PATH, handle_ipc)
+        await ipc_server.start()
+        boot_done()
+        await asyncio.Event().wait()
+    finally:
+        if ipc_server is not None:
+            await ipc_server.close()
+        await stop_execution()
+
+async def run_listener():
+    """Listener process: Telethon, parsing, forwarding and notifications; signals go to the executor."""
+    global ipc_client
+    ipc_client = IpcClient(
+        container.settings.IPC_SOCKET_PATH, "listener",
+        handler=handle_listener_ipc,
+        maxsize=container.settings.IPC_QUEUE_SIZE,
+    )
+    ipc_task = asyncio.create_task(ipc_client.run())
+    add_routes()
+    container.outbox.start()
+    if container.forwarder:
+        container.forwarder.start()
+    boot_done()
+    try:
+        await run_telethon()
+    finally:
+        # no-op if run_telethon got to flush them before disconnecting
+        await close_pipelines()
+        ipc_task.cancel()
+
+async def run_bot_process():
+    """Bot process: command handlers, answered by the executor over IPC."""
+    global ipc_client
+    ipc_client = IpcClient(container.settings.IPC_SOCKET_PATH, "bot", maxsize=container.settings.IPC_QUEUE_SIZE)
+    ipc_task = asyncio.create_task(ipc_client.run())
+    boot_done()
+    try:
+        await run_bot()
+    finally:
+        ipc_task.cancel()
+
+SPLIT_ROLES = ("executor", "listener", "bot")
+
+async def run_metrics(role: str = "all"):
+    """Prometheus endpoint and event-loop lag probe; split roles listen on METRICS_PORT + 0 / 1 / 2."""
+    s = container.settings
+    if not s.METRICS_PORT:
+        return
+    container.metrics  # scrape-time gauges for what this process owns
+    port = s.METRICS_PORT + (SPLIT_ROLES.index(role) if role in SPLIT_ROLES else 0)
+    server = MetricsServer(metrics, s.METRICS_HOST, port)
+    try:
+        await server.start()
+    except OSError as e:
+        # never worth taking the bot down for
+        log.error(f"❌ Metrics endpoint on {s.METRICS_HOST}:{port} failed to start: {e}")
+        return
+    try:
+        await watch_loop_lag(s.METRICS_LAG_INTERVAL_SEC)
+    finally:
+        await server.close()
+
+
+async def supervise(role: str):
+    """Run `python -m app.main --role <role>` and restart it (with backoff) whenever it exits."""
+    backoff = 1.0
+    while True:
+        started = time.monotonic()
+        proc = await asyncio.create_subprocess_exec(sys.executable, "-m", "app.main", "--role", role)
+        log.info(f"▶️ Started {role} process (pid {proc.pid})")
+        try:
+            code = await proc.wait()
+        except asyncio.CancelledError:
+            proc.terminate()
+            await proc.wait()
+            raise
+        if time.monotonic() - started > 60:
+            backoff = 1.0
+        log.error(f"❌ {role} process exited with code {code}, restarting in {backoff:.0f}s")
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, 30.0)
+
+def boot_done():
+    container.mark("ready")
+    log.info(f"🚀 Cold start: {container.boot_summary()}")
+
+async def main(role: str = None):
+    container.log  # logging is configured from settings on first use
+    container.mark("config")
+    role = role or container.settings.PROCESS_ROLE
+    # SIGTERM (docker stop, or the split supervisor stopping a child) cancels this task like
+    # Ctrl-C does, so every role's finally runs: queued notifications, forwards and journal
+    # rows are flushed and, under split, the supervisors terminate their children
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        await run_role(role)
+    except asyncio.CancelledError:
+        log.info(f"Stopped ({role}).")
+
+async def run_role(role: str):
+    if role == "split":
+        log.info(f"Starting {', '.join(SPLIT_ROLES)} processes...")
+        await asyncio.gather(*(supervise(r) for r in SPLIT_ROLES))
+        return
+    if role == "executor":
+        log.info("Starting executor process...")
+        await asyncio.gather(run_executor(), run_metrics(role))
+        return
+    if role == "listener":
+        log.info("Starting Telethon listener process...")
+        await asyncio.gather(run_listener(), run_metrics(role))
+        return
+    if role == "bot":
+        log.info("Starting Telegram Bot process...")
+        await asyncio.gather(run_bot_process(), run_metrics(role))
+        return
+
+    log.info("Starting Telethon + Telegram Bot...")
+    try:
+        await start_execution()
+
+        add_routes()
+        container.outbox.start()
+        if container.forwarder:
+            container.forwarder.start()
+        boot_done()
+        await asyncio.gather(run_telethon(), run_bot(), run_metrics())
+    finally:
+        # no-op if run_telethon got to flush them before disconnecting
+        await close_pipelines()
+        await stop_execution()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    ap = argparse.ArgumentParser(description="Telegram signal -> Binance Futures bot")
+    ap.add_argument("--role", choices=("all", "split") + SPLIT_ROLES, default=container.settings.PROCESS_ROLE)
+    asyncio.run(main(ap.parse_args().role))
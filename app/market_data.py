@@ -0,0 +1,107 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+import aiohttp
+import ujson
+
+log = logging.getLogger("app.market_data")
+
+
+@dataclass(slots=True)
+class Ticker:
+    mark: float = 0.0
+    bid: float = 0.0
+    ask: float = 0.0
+    updated: float = 0.0  # time.monotonic() of the last update
+
+
+class MarketDataFeed:
+    """Latest markPrice / bookTicker per symbol, fed by the futures combined stream.
+
+    Readers only touch the in-memory table, so sizing and guards on the
+    signal path cost zero REST calls. Reconnects with capped backoff.
+    """
+
+    def __init__(self, ws_url: str, symbols: Iterable[str], max_age: float = 10.0):
+        self.ws_url = ws_url.rstrip("/")
+        self.symbols = sorted({s.upper() for s in symbols if s})
+        self.max_age = max_age
+        self.table: dict[str, Ticker] = {s: Ticker() for s in self.symbols}
+        self.connected = False
+        # called with (symbol, mark) on every markPriceUpdate
+        self.price_listeners: list[Callable[[str, float], None]] = []
+
+    @property
+    def stream_url(self) -> str:
+        streams = []
+        for s in self.symbols:
+            streams.append(f"{s.lower()}@markPrice@1s")
+            streams.append(f"{s.lower()}@bookTicker")
+        return f"{self.ws_url}/stream?streams={'/'.join(streams)}"
+
+    def ticker(self, symbol: str) -> Optional[Ticker]:
+        """Ticker for symbol, or None if unknown or older than max_age."""
+        t = self.table.get(symbol)
+        if t is None or not t.updated or time.monotonic() - t.updated > self.max_age:
+            return None
+        return t
+
+    def price(self, symbol: str) -> Optional[float]:
+        """Fresh mark price (falls back to book mid), or None."""
+        t = self.ticker(symbol)
+        if t is None:
+            return None
+        if t.mark:
+            return t.mark
+        if t.bid and t.ask:
+            return (t.bid + t.ask) / 2
+        return None
+
+    def on_message(self, data: dict):
+        payload = data.get("data", data)
+        t = self.table.get(payload.get("s"))
+        if t is None:
+            return
+        event = payload.get("e")
+        if event == "markPriceUpdate":
+            t.mark = float(payload["p"])
+            for listener in self.price_listeners:
+                try:
+                    listener(payload["s"], t.mark)
+                except Exception as e:
+                    log.error(f"Price listener {getattr(listener, '__name__', listener)} failed: {e}")
+        elif event == "bookTicker":
+            t.bid = float(payload["b"])
+            t.ask = float(payload["a"])
+        else:
+            return
+        t.updated = time.monotonic()
+
+    async def run(self):
+        if not self.symbols:
+            log.warning("Market data feed has no symbols, not starting")
+            return
+        backoff = 1.0
+        while True:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(self.stream_url, heartbeat=30) as ws:
+                        self.connected = True
+                        backoff = 1.0
+                        log.info(f"📡 Market data connected: {', '.join(self.symbols)}")
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self.on_message(ujson.loads(msg.data))
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"❌ Market data stream error: {e}")
+            self.connected = False
+            log.warning(f"Market data disconnected, reconnecting in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
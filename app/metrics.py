@@ -0,0 +1,246 @@
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from typing import Callable, Optional, Union
+
+log = logging.getLogger("app.metrics")
+
+_STARTED = time.monotonic()
+
+# Prometheus default buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# value, or {label values: value} for a labelled metric
+Sample = Union[float, dict[tuple, float]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    """Monotonic count per label tuple; inc() is one dict update."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labels, k)} {_num(v)}" for k, v in sorted(self._values.items(), key=str)]
+
+
+class Gauge(Metric):
+    """Point-in-time value per label tuple, either set() by the owner or read from `fn` at scrape time.
+
+    `fn` returns a number, or {label values: number} for a labelled gauge, so
+    state that already lives on an object (queue depth, rate-limit budget)
+    is never copied on the hot path.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), fn: Optional[Callable[[], Sample]] = None):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+        self.fn = fn
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def get(self, *labels) -> Optional[float]:
+        return self._values.get(labels)
+
+    def samples(self) -> list[str]:
+        values = dict(self._values)
+        if self.fn is not None:
+            try:
+                current = self.fn()
+            except Exception as e:
+                log.warning(f"Gauge {self.name} callback failed: {e}")
+                current = None
+            if isinstance(current, dict):
+                values.update(current)
+            elif current is not None:
+                values[()] = current
+        return [f"{self.name}{_labels(self.labels, k)} {_num(v)}" for k, v in sorted(values.items(), key=str)]
+
+
+class Histogram(Metric):
+    """Cumulative buckets, sum and count per label tuple. observe() takes seconds."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        # first bucket whose upper bound is >= value; len(buckets) is +Inf
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, series in sorted(self._series.items(), key=str):
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), series):
+                running += n
+                le = 'le="' + _num(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_num(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {running}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of this process, rendered in the Prometheus text format on scrape."""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        metric.name = self.prefix + metric.name
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple = (), fn: Optional[Callable[[], Sample]] = None) -> Gauge:
+        return self._register(Gauge(name, help, labels, fn))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(self.prefix + name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """GET /metrics on a plain asyncio TCP server; one request per connection, no HTTP library needed."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        log.info(f"📈 Metrics on http://{self.host}:{self.port}/metrics")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            # drain the headers; nothing in them matters here
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] in ("GET", "HEAD") and parts[1].split("?")[0] in ("/metrics", "/"):
+                status, body = "200 OK", self.registry.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            head = (
+                f"HTTP/1.1 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+            ).encode()
+            writer.write(head if parts and parts[0] == "HEAD" else head + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+async def watch_loop_lag(interval: float = 0.5):
+    """Sleep `interval` in a loop; how late each wake-up is measures how blocked the event loop was."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        LOOP_LAG.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+
+
+metrics = MetricsRegistry(prefix="tgsb_")
+
+# --- instruments shared across modules --------------------------------------
+
+MESSAGES = metrics.counter("telegram_messages_total", "Telegram messages received, by chat (unrouted chats as 'other').", ("chat",))
+PARSES = metrics.counter("signal_parse_total", "Messages from signal chats by parse result (hit / miss).", ("result",))
+SIGNALS = metrics.counter("signals_total", "Parsed signals by outcome (executed, duplicate, stale, superseded, skipped).", ("outcome",))
+ORDERS = metrics.counter("orders_total", "Orders placed per leg (entry / TP / SL) and result (ok / failed).", ("account", "leg", "result"))
+BINANCE_LATENCY = metrics.histogram("binance_request_seconds", "Binance REST round trip by endpoint.", ("method", "path"))
+BINANCE_RESPONSES = metrics.counter("binance_responses_total", "Binance REST responses by HTTP status (0 = no response).", ("status",))
+TELEGRAM_SEND = metrics.histogram("telegram_send_seconds", "Telegram send / edit / forward calls.", ("op",))
+LOOP_LAG = metrics.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+LOOP_LAG_LAST = metrics.gauge("event_loop_lag_last_seconds", "Lag of the most recent event-loop probe.")
+UPTIME = metrics.gauge("uptime_seconds", "Seconds since this process imported the metrics module.", fn=lambda: time.monotonic() - _STARTED)
@@ -0,0 +1,339 @@
+import json
+import time
+import hmac
+import random
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+
+from aiohttp import web
+
+log = logging.getLogger("app.mock_binance")
+
+# IP request weight per (method, path), matching Binance USD-M futures;
+# anything missing costs 1. New orders only count against the order limits.
+WEIGHTS = {
+    ("POST", "/fapi/v1/order"): 0,
+    ("POST", "/fapi/v1/batchOrders"): 5,
+    ("GET", "/fapi/v2/balance"): 5,
+    ("GET", "/fapi/v2/account"): 5,
+    ("GET", "/fapi/v2/positionRisk"): 5,
+}
+ORDER_PATHS = ("/fapi/v1/order", "/fapi/v1/batchOrders")
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 5.0
+    jitter_ms: float = 2.0
+    # fraction of order requests answered with HTTP 503 / a -2010 rejection
+    error_rate: float = 0.0
+    reject_rate: float = 0.0
+    # fraction of order requests that are executed but answered with 503 / only after stall_ms
+    lost_rate: float = 0.0
+    stall_rate: float = 0.0
+    stall_ms: float = 3000.0
+    # fraction answered with 503 at once but executed late_ms later, if still within recvWindow
+    late_rate: float = 0.0
+    late_ms: float = 100.0
+    # 1-minute budgets (fixed windows); exceeding them answers 429 (418 after ban_after 429s)
+    weight_limit_1m: int = 2400
+    order_limit_10s: int = 300
+    order_limit_1m: int = 1200
+    ban_after: int = 0
+    slippage_bps: float = 1.0
+    prices: dict = field(default_factory=lambda: {"XAUUSDT": 4870.0, "BTCUSDT": 64000.0})
+    api_secret: Optional[str] = None  # when set, signatures are verified
+
+
+class MockBinance:
+    """In-process stand-in for the USD-M futures REST endpoints BinanceFutures uses.
+
+    Simulates latency, 5xx errors, order rejections, orders that execute
+    after the client gave up on them (but never outside their recvWindow),
+    request-weight and order-rate limits (with X-MBX-* usage headers), and
+    fills market orders into positions at the configured price plus slippage.
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, seed: int = 0):
+        self.config = config or MockConfig()
+        self.rng = random.Random(seed)
+        self.positions: dict[str, float] = {}
+        self.orders: dict[int, dict] = {}
+        self.wallet = 10_000.0
+        self.stats = {
+            "requests": 0, "orders": 0, "errors": 0, "rejects": 0, "lost": 0, "stalled": 0,
+            "late": 0, "expired": 0, "rate_limited": 0, "banned": 0,
+        }
+        self._by_client_id: dict[str, dict] = {}
+        self._next_id = 1
+        # name -> [window start, used]; fixed wall-clock windows like Binance's
+        self._windows: dict[str, list] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    # --- lifecycle -------------------------------------------------------
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/fapi/v1/ping", self._ping)
+        app.router.add_get("/fapi/v1/time", self._time)
+        app.router.add_get("/fapi/v1/exchangeInfo", self._exchange_info)
+        app.router.add_post("/fapi/v1/order", self._new_order)
+        app.router.add_get("/fapi/v1/order", self._query_order)
+        app.router.add_delete("/fapi/v1/order", self._cancel_order)
+        app.router.add_post("/fapi/v1/batchOrders", self._batch_orders)
+        app.router.add_get("/fapi/v1/openOrders", self._open_orders)
+        app.router.add_post("/fapi/v1/leverage", self._leverage)
+        app.router.add_post("/fapi/v1/listenKey", self._listen_key)
+        app.router.add_put("/fapi/v1/listenKey", self._listen_key)
+        app.router.add_get("/fapi/v2/balance", self._balance)
+        app.router.add_get("/fapi/v2/account", self._account)
+        app.router.add_get("/fapi/v2/positionRisk", self._position_risk)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # --- plumbing --------------------------------------------------------
+
+    def _count(self, name: str, window_sec: int, cost: int, now: float) -> int:
+        start = now - now % window_sec
+        w = self._windows.setdefault(name, [start, 0])
+        if w[0] != start:
+            w[0], w[1] = start, 0
+        w[1] += cost
+        return w[1]
+
+    @staticmethod
+    def _error(status: int, code: int, msg: str) -> web.Response:
+        return web.json_response({"code": code, "msg": msg}, status=status)
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        cfg = self.config
+        self.stats["requests"] += 1
+        now = time.time()
+        path = request.path
+        weight = WEIGHTS.get((request.method, path), 1)
+        if path == "/fapi/v1/openOrders" and "symbol" not in request.query:
+            weight = 40
+        is_order = path in ORDER_PATHS and request.method == "POST"
+
+        if cfg.latency_ms or cfg.jitter_ms:
+            await asyncio.sleep(max(0.0, cfg.latency_ms + self.rng.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000)
+
+        used = self._count("weight_1m", 60, weight, now)
+        orders_10s = self._count("orders_10s", 10, 1 if is_order else 0, now)
+        orders_1m = self._count("orders_1m", 60, 1 if is_order else 0, now)
+        headers = {
+            "X-MBX-USED-WEIGHT-1M": str(used),
+            "X-MBX-ORDER-COUNT-10S": str(orders_10s),
+            "X-MBX-ORDER-COUNT-1M": str(orders_1m),
+        }
+
+        if used > cfg.weight_limit_1m or (
+            is_order and (orders_10s > cfg.order_limit_10s or orders_1m > cfg.order_limit_1m)
+        ):
+            self.stats["rate_limited"] += 1
+            if cfg.ban_after and self.stats["rate_limited"] > cfg.ban_after:
+                self.stats["banned"] += 1
+                resp = self._error(418, -1003, "Way too many requests; IP banned.")
+            else:
+                resp = self._error(429, -1003, "Too many requests.")
+            resp.headers.update(headers)
+            resp.headers["Retry-After"] = str(int(60 - now % 60) + 1)
+            return resp
+
+        if is_order and self.rng.random() < cfg.error_rate:
+            self.stats["errors"] += 1
+            resp = self._error(503, -1001, "Internal error; unable to process your request.")
+        elif cfg.api_secret and not await self._signature_ok(request):
+            resp = self._error(400, -1022, "Signature for this request is not valid.")
+        elif path == "/fapi/v1/order" and is_order and self.rng.random() < cfg.late_rate:
+            # still queued inside the exchange when the gateway gives up on it
+            self.stats["late"] += 1
+            p = await self._params(request)
+            asyncio.get_running_loop().call_later(cfg.late_ms / 1000, self._place_late, p)
+            resp = self._error(503, -1001, "Internal error; unable to process your request.")
+        else:
+            resp = await handler(request)
+            # executed, but the client can't tell
+            if is_order and self.rng.random() < cfg.lost_rate:
+                self.stats["lost"] += 1
+                resp = self._error(503, -1001, "Internal error; unable to process your request.")
+            elif is_order and self.rng.random() < cfg.stall_rate:
+                self.stats["stalled"] += 1
+                await asyncio.sleep(cfg.stall_ms / 1000)
+        resp.headers.update(headers)
+        return resp
+
+    async def _signature_ok(self, request: web.Request) -> bool:
+        query = request.query_string if request.method in ("GET", "DELETE") else await request.text()
+        if "signature=" not in query:
+            return True  # unsigned endpoint
+        payload, sig = query.rsplit("&signature=", 1)
+        expected = hmac.new(self.config.api_secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, sig)
+
+    async def _params(self, request: web.Request) -> dict:
+        if request.method in ("GET", "DELETE"):
+            return dict(request.query)
+        return dict(await request.post())
+
+    # --- order simulation ------------------------------------------------
+
+    def _place(self, p: dict) -> dict:
+        cfg = self.config
+        if self.rng.random() < cfg.reject_rate:
+            self.stats["rejects"] += 1
+            return {"code": -2010, "msg": "Order would immediately trigger."}
+        cid = p.get("newClientOrderId")
+        existing = self._by_client_id.get(cid) if cid else None
+        if existing is not None and existing["status"] == "NEW":
+            # like Binance, client order IDs only have to be unique among open orders
+            return {"code": -4116, "msg": "ClientOrderId is duplicated."}
+        symbol = p.get("symbol", "")
+        qty = float(p.get("quantity", 0))
+        order_id = self._next_id
+        self._next_id += 1
+        order = {
+            "orderId": order_id,
+            "clientOrderId": p.get("newClientOrderId") or f"mock-{order_id}",
+            "symbol": symbol,
+            "side": p.get("side"),
+            "type": p.get("type"),
+            "origQty": p.get("quantity"),
+            "price": p.get("price", "0"),
+            "stopPrice": p.get("stopPrice", "0"),
+            "reduceOnly": p.get("reduceOnly") == "true",
+            "updateTime": int(time.time() * 1000),
+        }
+        self.stats["orders"] += 1
+        if p.get("type") == "MARKET":
+            mark = cfg.prices.get(symbol, 100.0)
+            sign = 1 if p.get("side") == "BUY" else -1
+            fill = mark * (1 + sign * cfg.slippage_bps / 10_000)
+            self.positions[symbol] = self.positions.get(symbol, 0.0) + sign * qty
+            order.update(status="FILLED", executedQty=p.get("quantity"), avgPrice=f"{fill:.2f}")
+        else:
+            order.update(status="NEW", executedQty="0", avgPrice="0")
+        self.orders[order_id] = order
+        self._by_client_id[order["clientOrderId"]] = order
+        return order
+
+    def _expired(self, p: dict) -> bool:
+        if "timestamp" not in p:
+            return False
+        if time.time() * 1000 <= int(p["timestamp"]) + int(p.get("recvWindow", 5000)):
+            return False
+        self.stats["expired"] += 1
+        return True
+
+    def _place_late(self, p: dict):
+        if not self._expired(p):
+            self._place(p)
+
+    def fill(self, client_order_id: str) -> Optional[dict]:
+        """Fill an open order as the matching engine would, e.g. a TP reached in a test."""
+        order = self._by_client_id.get(client_order_id)
+        if order is None or order["status"] != "NEW":
+            return None
+        order.update(status="FILLED", executedQty=order["origQty"], avgPrice=order["price"])
+        return order
+
+    def _find(self, p: dict) -> Optional[dict]:
+        if "orderId" in p:
+            return self.orders.get(int(p["orderId"]))
+        return self._by_client_id.get(p.get("origClientOrderId"))
+
+    # --- handlers --------------------------------------------------------
+
+    async def _ping(self, request):
+        return web.json_response({})
+
+    async def _time(self, request):
+        return web.json_response({"serverTime": int(time.time() * 1000)})
+
+    async def _exchange_info(self, request):
+        symbols = []
+        for s in self.config.prices:
+            symbols.append({
+                "symbol": s,
+                "pricePrecision": 2,
+                "quantityPrecision": 3,
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": "0.01"},
+                    {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001", "maxQty": "1000"},
+                    {"filterType": "MARKET_LOT_SIZE", "stepSize": "0.001", "minQty": "0.001", "maxQty": "100"},
+                    {"filterType": "MIN_NOTIONAL", "notional": "5"},
+                ],
+            })
+        return web.json_response({"symbols": symbols})
+
+    async def _new_order(self, request):
+        p = await self._params(request)
+        if self._expired(p):
+            return self._error(400, -1021, "Timestamp for this request is outside of the recvWindow.")
+        result = self._place(p)
+        if "code" in result:
+            return self._error(400, result["code"], result["msg"])
+        return web.json_response(result)
+
+    async def _batch_orders(self, request):
+        p = await self._params(request)
+        if self._expired(p):
+            return self._error(400, -1021, "Timestamp for this request is outside of the recvWindow.")
+        return web.json_response([self._place(o) for o in json.loads(p.get("batchOrders", "[]"))])
+
+    async def _query_order(self, request):
+        order = self._find(await self._params(request))
+        if order is None:
+            return self._error(400, -2013, "Order does not exist.")
+        return web.json_response(order)
+
+    async def _cancel_order(self, request):
+        order = self._find(await self._params(request))
+        if order is None or order["status"] != "NEW":
+            return self._error(400, -2011, "Unknown order sent.")
+        order["status"] = "CANCELED"
+        return web.json_response(order)
+
+    async def _open_orders(self, request):
+        symbol = request.query.get("symbol")
+        return web.json_response([
+            o for o in self.orders.values()
+            if o["status"] == "NEW" and (symbol is None or o["symbol"] == symbol)
+        ])
+
+    async def _leverage(self, request):
+        p = await self._params(request)
+        return web.json_response({"symbol": p.get("symbol"), "leverage": int(p.get("leverage", 1))})
+
+    async def _listen_key(self, request):
+        return web.json_response({"listenKey": "mock-listen-key"})
+
+    async def _balance(self, request):
+        w = f"{self.wallet:.2f}"
+        return web.json_response([{"asset": "USDT", "balance": w, "availableBalance": w, "crossUnPnl": "0"}])
+
+    async def _account(self, request):
+        w = f"{self.wallet:.2f}"
+        return web.json_response({"totalWalletBalance": w, "totalUnrealizedProfit": "0", "availableBalance": w})
+
+    async def _position_risk(self, request):
+        return web.json_response([
+            {"symbol": s, "positionAmt": f"{amt:.3f}", "entryPrice": str(self.config.prices.get(s, 0)),
+             "unRealizedProfit": "0", "positionSide": "BOTH"}
+            for s, amt in self.positions.items()
+        ])
@@ -0,0 +1,123 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional, Union
+
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+
+from app.latency import latency
+from app.metrics import TELEGRAM_SEND
+
+log = logging.getLogger("app.notifier")
+
+# Telegram hard limit is 4096 chars; leave room for markdown entities
+MAX_MESSAGE_LEN = 4000
+
+
+def to_chat_id(chat_id) -> Union[int, str]:
+    """Numeric chat IDs from settings are strings; Telethon wants ints for those."""
+    target = str(chat_id).strip()
+    if target.replace("-", "").isdigit():
+        return int(target)
+    return target
+
+
+class NotificationOutbox:
+    """Bounded queue drained by one worker, so order placement never waits on Telegram.
+
+    Messages sharing a `key` (one signal) are coalesced into a single
+    message per chat that is edited in place as new lines arrive.
+    """
+
+    def __init__(self, client: TelegramClient, chat_ids: list, maxsize: int = 1000, max_threads: int = 256):
+        self.client = client
+        self.chat_ids = [to_chat_id(c) for c in chat_ids if c]
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.max_threads = max_threads
+        # (chat_id, key) -> (message_id, text) of the message being edited in place
+        self._threads: OrderedDict = OrderedDict()
+        self._worker: Optional[asyncio.Task] = None
+        self.dropped = 0
+
+    def notify(self, message: str, key: Optional[str] = None) -> bool:
+        """Enqueue without blocking. Returns False if the outbox is full."""
+        if not self.chat_ids:
+            return True
+        try:
+            self.queue.put_nowait((key, message))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            log.warning(f"Notification outbox full, dropped message ({self.dropped} total)")
+            return False
+
+    def start(self):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def close(self, timeout: float = 10.0):
+        """Flush pending notifications, then stop the worker."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"Outbox flush timed out with {self.queue.qsize()} message(s) pending")
+        self._worker.cancel()
+        self._worker = None
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            # drain whatever is already queued so a signal's lines go out as one edit
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            grouped: OrderedDict = OrderedDict()
+            for key, message in batch:
+                # un-keyed messages are never merged with each other
+                grouped.setdefault(key if key is not None else object(), []).append(message)
+            for key, messages in grouped.items():
+                thread_key = key if isinstance(key, str) else None
+                for chat_id in self.chat_ids:
+                    try:
+                        await self._deliver(chat_id, thread_key, "\n\n".join(messages))
+                    except Exception as e:
+                        log.error(f"Failed to send notification to {chat_id}: {e}")
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _deliver(self, chat_id, key: Optional[str], text: str):
+        thread = self._threads.get((chat_id, key)) if key else None
+        if thread and len(thread[1]) + len(text) + 2 <= MAX_MESSAGE_LEN:
+            msg_id, prev = thread
+            new_text = f"{prev}\n\n{text}"
+            await self._with_flood_wait(self.client.edit_message, chat_id, msg_id, new_text)
+            self._remember(chat_id, key, msg_id, new_text)
+            return
+        sent = await self._with_flood_wait(self.client.send_message, chat_id, text[:MAX_MESSAGE_LEN])
+        if key:
+            self._remember(chat_id, key, sent.id, text[:MAX_MESSAGE_LEN])
+
+    def _remember(self, chat_id, key: str, msg_id: int, text: str):
+        self._threads[(chat_id, key)] = (msg_id, text)
+        self._threads.move_to_end((chat_id, key))
+        while len(self._threads) > self.max_threads:
+            self._threads.popitem(last=False)
+
+    async def _with_flood_wait(self, func, *args, retries: int = 3):
+        for attempt in range(retries + 1):
+            t0 = time.perf_counter()
+            try:
+                try:
+                    with latency.span("telegram.send"):
+                        return await func(*args)
+                finally:
+                    # the call itself, returned or raised; the backoff sleep below is not counted
+                    TELEGRAM_SEND.observe(time.perf_counter() - t0, func.__name__)
+            except FloodWaitError as e:
+                if attempt == retries:
+                    raise
+                log.warning(f"FloodWait {e.seconds}s from Telegram, backing off")
+                await asyncio.sleep(e.seconds)
@@ -1,7 +1,9 @@
 import re
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Optional
+
+from app.latency import latency
 
 log = logging.getLogger("app.parser")
 
@@ -13,81 +15,114 @@ class Signal:
     tps: list[float]
     sl: Optional[float]
 
+# Find things like 2025.5, 4872_75, 4872
+_NUMBER_RE = re.compile(r"\b\d+(?:[._]\d+)?\b")
+_SYMBOL_RE = re.compile(r"#?([A-Z0-9]{3,10})", re.I)
+# Support BUY, SELL, LONG, SHORT
+_SIDE_RE = re.compile(r"\b(BUY|SELL|LONG|SHORT|LIMIT BUY|LIMIT SELL)\b", re.I)
+# Look for "ENTRY", "ENTRIES", "ENT", "PRICE", "AT", etc.
+_ENTRY_RE = re.compile(r"\b(ENTRY|ENTRIES|ENT|PRICE|BUY AT|SELL AT|LIMIT)\b", re.I)
+_TP_RE = re.compile(r"TP\s*(?:\d\b)?\s*[:\s-]*\s*([0-9]+(?:\.[0-9]+)?)", re.I)
+_SL_RE = re.compile(r"SL\s*[:\s-]*\s*([0-9]+(?:\.[0-9]+)?)", re.I)
+
+# The regexes above can only match if these plain substrings are present in
+# the _fold()ed text, so checking them first skips most regex work.
+
+def _fold(s: str) -> str:
+    up = s.upper()
+    # upper() keeps DOTTED CAPITAL I and KELVIN SIGN although re.I matches them to i / k
+    if "\u0130" in up or "\u212a" in up:
+        up = up.replace("\u0130", "I").replace("\u212a", "K")
+    return up
+
+
+def _has_side_word(up: str) -> bool:
+    return "BUY" in up or "SELL" in up or "LONG" in up or "SHORT" in up
+
+
+def _has_entry_word(up: str) -> bool:
+    # ENT also covers ENTRY / ENTRIES
+    return "ENT" in up or "PRICE" in up or "LIMIT" in up or "BUY AT" in up or "SELL AT" in up
+
+
+def looks_like_signal(text: str) -> bool:
+    """Cheap pre-screen: False means parse_signal would certainly return None."""
+    return _has_side_word(_fold(text))
+
+
 def parse_numbers(s: str) -> list[float]:
     """Extract all numbers from a string, supporting dots and underscores as decimal/suffix."""
-    # Find things like 2025.5, 4872_75, 4872
-    matches = re.findall(r"\b\d+(?:[._]\d+)?\b", s)
     results = []
-    for m in matches:
+    for m in _NUMBER_RE.findall(s):
         if "_" in m:
-            parts = m.split("_")
-            if len(parts) == 2:
-                base, suffix = parts[0], parts[1]
-                if len(suffix) < len(base):
-                    # logic: 4872_75 -> 4875
-                    results.append(float(base[:-len(suffix)] + suffix))
-                else:
-                    results.append(float(suffix))
+            base, suffix = m.split("_")
+            if len(suffix) < len(base):
+                # logic: 4872_75 -> 4875
+                results.append(float(base[:-len(suffix)] + suffix))
+            else:
+                results.append(float(suffix))
         else:
-            results.append(float(m.replace("_", ".")))
+            results.append(float(m))
     return results
 
-def parse_signal(text: str) -> Optional[Signal]:
+
+def _parse(text: str) -> Optional[Signal]:
+    folded = _fold(text)
+    if not _has_side_word(folded):
+        return None
     lines = [x.strip() for x in text.splitlines() if x.strip()]
     if not lines:
         return None
-    
-    # Extract Symbol and Side (searching entire message if needed, but prioritize first line)
-    symbol, side = None, None
-    for line in lines:
-        if not symbol:
-            sym_m = re.search(r"#?([A-Z0-9]{3,10})", line, re.I)
-            if sym_m: symbol = sym_m.group(1).upper()
-        if not side:
-            # Support BUY, SELL, LONG, SHORT
-            side_m = re.search(r"\b(BUY|SELL|LONG|SHORT|LIMIT BUY|LIMIT SELL)\b", line, re.I)
-            if side_m:
-                raw = side_m.group(1).upper()
-                if raw in ["BUY", "LONG"] or "BUY" in raw:
-                    side = "BUY"
-                else:
-                    side = "SELL"
-    
-    if not symbol or not side:
-        return None
+    # upper() never adds or removes line breaks or whitespace-only lines,
+    # so this stays aligned with `lines`
+    folded_lines = [x for x in folded.splitlines() if x.strip()]
 
+    # One pass over the lines. Symbol and side come from the first line that
+    # has them (prioritising the first line); entries, TPs and SL per line.
+    symbol, side = None, None
     entries: list[float] = []
     tps: list[float] = []
     sl: Optional[float] = None
 
-    for i, line in enumerate(lines):
-        # 1. Entry detection
-        # Look for "ENTRY", "ENTRIES", "ENT", "PRICE", "AT", etc.
-        # Or look for numbers on the first line if it contains the side
-        is_entry_line = re.search(r"\b(ENTRY|ENTRIES|ENT|PRICE|BUY AT|SELL AT|LIMIT)\b", line, re.I)
-        if is_entry_line:
+    for i, (line, up) in enumerate(zip(lines, folded_lines)):
+        if symbol is None:
+            sym_m = _SYMBOL_RE.search(line)
+            if sym_m:
+                symbol = sym_m.group(1).upper()
+        if side is None and _has_side_word(up):
+            side_m = _SIDE_RE.search(line)
+            if side_m:
+                raw = side_m.group(1).upper()
+                side = "BUY" if raw == "LONG" or "BUY" in raw else "SELL"
+
+        # 1. Entry detection: keyword lines, else numbers on the first line.
+        # A symbol first found on a later line cannot occur in line 0 (line 0
+        # would have matched it), so only stripping a known symbol is equivalent.
+        if _has_entry_word(up) and _ENTRY_RE.search(line):
             entries.extend(parse_numbers(line))
         elif i == 0:
-            # Check first line numbers if no side was explicitly matched here, 
-            # or just harvest all remaining numbers as potential entries
-            line_clean = line.replace(symbol, "")
-            entries.extend(parse_numbers(line_clean))
-            
+            entries.extend(parse_numbers(line.replace(symbol, "") if symbol else line))
+
         # 2. TP detection
-        m_tp = re.search(r"TP\s*(?:\d\b)?\s*[:\s-]*\s*([0-9]+(?:\.[0-9]+)?)", line, re.I)
-        if m_tp:
-            tps.append(float(m_tp.group(1)))
-            
+        if "TP" in up:
+            m_tp = _TP_RE.search(line)
+            if m_tp:
+                tps.append(float(m_tp.group(1)))
+
         # 3. SL detection
-        m_sl = re.search(r"SL\s*[:\s-]*\s*([0-9]+(?:\.[0-9]+)?)", line, re.I)
-        if m_sl:
-            sl = float(m_sl.group(1))
+        if "SL" in up:
+            m_sl = _SL_RE.search(line)
+            if m_sl:
+                sl = float(m_sl.group(1))
+
+    if not symbol or not side:
+        return None
 
     if not entries:
         # Fallback: if no explicit entry found, check second line numbers
         if len(lines) > 1:
             entries.extend(parse_numbers(lines[1]))
-            
+
     if not entries:
         return None
 
@@ -100,3 +135,14 @@ def parse_signal(text: str) -> Optional[Signal]:
         entry = min(entries)
 
     return Signal(symbol=symbol, side=side, entry=entry, tps=tps, sl=sl)
+
+
+@latency.timed("parse")
+def parse_signal(text: str) -> Optional[Signal]:
+    return _parse(text)
+
+
+def parse_many(texts: Iterable[str]) -> list[Optional[Signal]]:
+    """Batch API: parse_signal for each text, timed as a single span."""
+    with latency.span("parse_many"):
+        return [_parse(t) for t in texts]
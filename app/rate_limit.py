@@ -0,0 +1,285 @@
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from collections import Counter
+from enum import IntEnum
+from typing import Callable, Optional
+
+log = logging.getLogger("app.rate_limit")
+
+
+class Priority(IntEnum):
+    """Lower value goes first."""
+    ENTRY = 0
+    PROTECTIVE = 1
+    ACCOUNT = 2
+    METADATA = 3
+
+
+# Share of each budget a priority may fill; the rest is headroom kept for higher priorities
+DEFAULT_CAPS = {
+    Priority.ENTRY: 1.0,
+    Priority.PROTECTIVE: 1.0,
+    Priority.ACCOUNT: 0.7,
+    Priority.METADATA: 0.5,
+}
+# How long (s) a request may wait for budget before it is shed instead of sent
+DEFAULT_MAX_WAIT = {
+    Priority.ENTRY: 1.0,
+    Priority.PROTECTIVE: 5.0,
+    Priority.ACCOUNT: 3.0,
+    Priority.METADATA: 2.0,
+}
+
+# (method, path) -> IP request weight; anything missing costs 1.
+# New orders only count against the order-rate limits.
+ENDPOINT_WEIGHTS = {
+    ("POST", "/fapi/v1/order"): 0,
+    ("POST", "/fapi/v1/batchOrders"): 5,
+    ("GET", "/fapi/v2/balance"): 5,
+    ("GET", "/fapi/v2/account"): 5,
+    ("GET", "/fapi/v2/positionRisk"): 5,
+    ("GET", "/fapi/v1/openOrders"): 1,  # 40 without a symbol, see weight_for()
+}
+
+
+def weight_for(method: str, path: str, params: Optional[dict] = None) -> int:
+    if path == "/fapi/v1/openOrders" and not (params and params.get("symbol")):
+        return 40
+    return ENDPOINT_WEIGHTS.get((method, path), 1)
+
+
+class RequestShed(Exception):
+    """A low-priority request was dropped to protect the rate-limit budget."""
+
+    def __init__(self, priority: Priority, reason: str):
+        super().__init__(f"{priority.name} request shed: {reason}")
+        self.priority = priority
+        self.reason = reason
+
+
+class RateBudget:
+    """One Binance rate-limit counter (fixed wall-clock window).
+
+    `used` follows the X-MBX-* response header when present (counted locally
+    otherwise); `inflight` is cost already granted but not yet answered.
+    """
+
+    def __init__(self, name: str, limit: int, window_sec: int, header: str, blocks_all: bool = False):
+        self.name = name
+        self.limit = limit
+        self.window_sec = window_sec
+        self.header = header
+        # once exhausted Binance rejects every request, even ones that cost nothing here
+        self.blocks_all = blocks_all
+        self.used = 0
+        self.inflight = 0
+        self.window_start = 0.0
+        # set on 429 / 418; nothing is sent until then
+        self.blocked_until = 0.0
+        # every RequestScheduler drawing on this budget, woken whenever one of them frees some
+        self.schedulers: list["RequestScheduler"] = []
+
+    def _roll(self, now: float):
+        start = now - now % self.window_sec
+        if start != self.window_start:
+            self.window_start = start
+            self.used = 0
+
+    def estimate(self, now: float) -> int:
+        self._roll(now)
+        return self.used + self.inflight
+
+    def fits(self, cost: int, cap: float, now: float) -> bool:
+        if cost == 0 and not self.blocks_all:
+            return True
+        return self.estimate(now) + cost <= self.limit * cap
+
+    def next_reset(self, now: float) -> float:
+        self._roll(now)
+        return self.window_start + self.window_sec
+
+    def ready_at(self, cost: int, cap: float, now: float) -> float:
+        """Earliest time `cost` can fit: now if only in-flight requests are in the way
+        (their responses free it), otherwise the window reset."""
+        self._roll(now)
+        if self.used + cost <= self.limit * cap:
+            return now
+        return self.next_reset(now)
+
+    def observe(self, headers, cost: int, now: float):
+        self._roll(now)
+        raw = headers.get(self.header) if headers is not None else None
+        if raw is not None:
+            try:
+                self.used = max(self.used, int(raw))
+                return
+            except ValueError:
+                pass
+        self.used += cost
+
+
+class RequestScheduler:
+    """Priority gate in front of every Binance REST call.
+
+    Tracks request weight and order-count budgets from response headers and
+    releases queued requests strictly by priority (entry > protective >
+    account > metadata). Lower priorities may only use part of each budget
+    and are shed when they would wait longer than their max wait, so
+    /balance or exchangeInfo traffic can never push orders into a 429/418.
+    """
+
+    def __init__(
+        self,
+        weight_limit: int = 2400,
+        order_limit_10s: int = 300,
+        order_limit_1m: int = 1200,
+        caps: Optional[dict] = None,
+        max_wait: Optional[dict] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        # wall clock the fixed windows are aligned to (injectable for tests)
+        self.clock = clock
+        # request weight is per IP; FanOutExecutor shares this budget across accounts
+        self.weight = RateBudget("weight_1m", weight_limit, 60, "X-MBX-USED-WEIGHT-1M", blocks_all=True)
+        self.weight.schedulers.append(self)
+        self.orders_10s = RateBudget("orders_10s", order_limit_10s, 10, "X-MBX-ORDER-COUNT-10S")
+        self.orders_1m = RateBudget("orders_1m", order_limit_1m, 60, "X-MBX-ORDER-COUNT-1M")
+        self.caps = {**DEFAULT_CAPS, **(caps or {})}
+        self.max_wait = {**DEFAULT_MAX_WAIT, **(max_wait or {})}
+        self.shed: Counter = Counter()
+        self._waiters: list = []  # heap of (priority, seq, future, weight, orders)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def share_weight(self, primary: "RequestScheduler"):
+        """Draw request weight from `primary`'s budget (Binance counts weight per IP)."""
+        self.weight.schedulers.remove(self)
+        self.weight = primary.weight
+        self.weight.schedulers.append(self)
+
+    def _costs(self, weight: int, orders: int):
+        return ((self.weight, weight), (self.orders_10s, orders), (self.orders_1m, orders))
+
+    def _can_run(self, priority: Priority, weight: int, orders: int, now: float) -> bool:
+        if now < self.weight.blocked_until:
+            return False
+        cap = self.caps[priority]
+        return all(b.fits(cost, cap, now) for b, cost in self._costs(weight, orders))
+
+    def _wait_time(self, priority: Priority, weight: int, orders: int, now: float) -> float:
+        """Lower bound on how long until this request could be released."""
+        ready = self.weight.blocked_until
+        cap = self.caps[priority]
+        for b, cost in self._costs(weight, orders):
+            if not b.fits(cost, cap, now):
+                ready = max(ready, b.ready_at(cost, cap, now))
+        return max(0.0, ready - now)
+
+    def _take(self, weight: int, orders: int):
+        for b, cost in self._costs(weight, orders):
+            b.inflight += cost
+
+    def _give_back(self, weight: int, orders: int):
+        for b, cost in self._costs(weight, orders):
+            b.inflight = max(0, b.inflight - cost)
+
+    def _queued_ahead(self, priority: Priority) -> bool:
+        return any(p <= priority and not fut.done() for p, _, fut, _, _ in self._waiters)
+
+    async def acquire(self, priority: Priority, weight: int, orders: int = 0):
+        now = self.clock()
+        if not self._queued_ahead(priority) and self._can_run(priority, weight, orders, now):
+            self._take(weight, orders)
+            return
+
+        wait = self._wait_time(priority, weight, orders, now)
+        max_wait = self.max_wait[priority]
+        if wait > max_wait:
+            self.shed[priority.name] += 1
+            raise RequestShed(priority, f"needs {wait:.1f}s for rate-limit budget (max {max_wait:.1f}s)")
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut, weight, orders))
+        self._schedule_wake()
+        try:
+            # not wait_for: it can swallow a cancel that lands right after the grant
+            await asyncio.wait((fut,), timeout=max_wait)
+        except asyncio.CancelledError:
+            self._abandon(fut, weight, orders)
+            raise
+        if fut.done():
+            return
+        self._abandon(fut, weight, orders)
+        self.shed[priority.name] += 1
+        raise RequestShed(priority, f"waited {max_wait:.1f}s for rate-limit budget")
+
+    def _abandon(self, fut: asyncio.Future, weight: int, orders: int):
+        """A waiter gave up: withdraw it, or hand back what _wake() granted it in the same tick."""
+        if fut.done():
+            self._give_back(weight, orders)
+        else:
+            fut.cancel()
+        self._wake_all()
+
+    def release(self, weight: int, orders: int, headers=None, status: int = 200):
+        now = self.clock()
+        for b, cost in self._costs(weight, orders):
+            b.inflight = max(0, b.inflight - cost)
+            b.observe(headers, cost, now)
+        if status in (418, 429):
+            retry_after = None
+            if headers is not None and headers.get("Retry-After"):
+                try:
+                    retry_after = float(headers["Retry-After"])
+                except ValueError:
+                    pass
+            if retry_after is None:
+                retry_after = self.weight.next_reset(now) - now
+            self.weight.blocked_until = max(self.weight.blocked_until, now + retry_after)
+            log.warning(f"Binance rate limit hit ({status}), pausing requests for {retry_after:.1f}s")
+        self._wake_all()
+
+    def _wake_all(self):
+        # the weight budget may be shared: freed weight can unblock another account's queue
+        for scheduler in self.weight.schedulers:
+            scheduler._wake()
+
+    def _wake(self):
+        now = self.clock()
+        while self._waiters:
+            priority, _, fut, weight, orders = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            # strict priority: nothing overtakes the head of the queue
+            if not self._can_run(priority, weight, orders, now):
+                break
+            heapq.heappop(self._waiters)
+            self._take(weight, orders)
+            fut.set_result(None)
+        self._schedule_wake()
+
+    def _schedule_wake(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._waiters:
+            return
+        priority, _, _, weight, orders = self._waiters[0]
+        delay = self._wait_time(priority, weight, orders, self.clock())
+        # waiting only on in-flight requests: release() wakes us, the timer is just a backstop
+        self._timer = asyncio.get_running_loop().call_later(delay if delay > 0 else 1.0, self._wake)
+
+    def snapshot(self) -> dict:
+        now = self.clock()
+        return {
+            "weight_1m": self.weight.estimate(now),
+            "orders_10s": self.orders_10s.estimate(now),
+            "orders_1m": self.orders_1m.estimate(now),
+            "queued": sum(1 for w in self._waiters if not w[2].done()),
+            "blocked_for": max(0.0, self.weight.blocked_until - now),
+            "shed": dict(self.shed),
+        }
@@ -0,0 +1,89 @@
+import time
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, Optional
+
+from app.metrics import MESSAGES
+
+log = logging.getLogger("app.router")
+
+Handler = Callable[[object], Awaitable[None]]
+
+
+class MessageRouter:
+    """chat_id -> handlers table, built once at startup.
+
+    Registered on a single events.NewMessage(); updates from chats with no
+    handler are dropped with one dict lookup.
+    """
+
+    def __init__(self):
+        self._routes: list[tuple[Handler, Optional[frozenset]]] = []
+        self._by_chat: dict[int, tuple[Handler, ...]] = {}
+        self._default: tuple[Handler, ...] = ()
+
+    def add(self, handler: Handler, chat_ids: Optional[Iterable[int]] = None):
+        """Route chat_ids to handler; chat_ids=None means every chat. Order is dispatch order."""
+        self._routes.append((handler, frozenset(chat_ids) if chat_ids is not None else None))
+        self._compile()
+
+    def _compile(self):
+        catch_all = tuple(h for h, chats in self._routes if chats is None)
+        chat_ids = set()
+        for _, chats in self._routes:
+            if chats:
+                chat_ids |= chats
+        self._by_chat = {
+            cid: tuple(h for h, chats in self._routes if chats is None or cid in chats)
+            for cid in chat_ids
+        }
+        self._default = catch_all
+
+    def handlers_for(self, chat_id: int) -> tuple[Handler, ...]:
+        return self._by_chat.get(chat_id, self._default)
+
+    async def dispatch(self, event):
+        handlers = self._by_chat.get(event.chat_id)
+        # per-chat series only for chats with their own routes; the rest would be unbounded
+        MESSAGES.inc(event.chat_id if handlers is not None else "other")
+        for handler in handlers if handlers is not None else self._default:
+            try:
+                await handler(event)
+            except Exception as e:
+                log.error(f"Handler {handler.__name__} failed for chat {event.chat_id}: {e}")
+
+
+class EntityCache:
+    """LRU of chat display names with a TTL, shared by all handlers."""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items: OrderedDict = OrderedDict()
+
+    def get(self, chat_id: int) -> Optional[str]:
+        item = self._items.get(chat_id)
+        if item is None:
+            return None
+        value, expires = item
+        if expires < time.monotonic():
+            del self._items[chat_id]
+            return None
+        self._items.move_to_end(chat_id)
+        return value
+
+    def put(self, chat_id: int, value: str):
+        self._items[chat_id] = (value, time.monotonic() + self.ttl)
+        self._items.move_to_end(chat_id)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    async def chat_info(self, event) -> str:
+        """'<title or first name> (ID: <chat_id>)', fetching the chat only on a miss."""
+        info = self.get(event.chat_id)
+        if info is None:
+            chat = await event.get_chat()
+            name = getattr(chat, "title", None) or getattr(chat, "first_name", None) or "?"
+            info = f"{name} (ID: {event.chat_id})"
+            self.put(event.chat_id, info)
+        return info
@@ -0,0 +1,149 @@
+"""Parser regression + benchmark harness.
+
+    python bench_parser.py                    # check golden results, then benchmark
+    python bench_parser.py --min-rate 50000   # also fail if throughput drops below 50k msg/s
+    python bench_parser.py --update-golden    # rewrite expected results from the current parser
+
+The corpus is JSONL, one {"id", "text", "expected"} object per line;
+"expected" is the Signal as a dict, or null for non-signal messages.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from dataclasses import asdict
+from typing import Optional
+
+from app.parser import Signal, parse_signal
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "parser_corpus.jsonl")
+
+# parse_signal without the latency-tracking wrapper
+_parse = parse_signal.__wrapped__
+
+
+def signal_to_dict(sig: Optional[Signal]) -> Optional[dict]:
+    return None if sig is None else asdict(sig)
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_corpus(rows: list[dict], path: str = CORPUS_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def check_golden(rows: list[dict]) -> list[tuple[str, Optional[dict], Optional[dict]]]:
+    """(id, expected, actual) for every message whose parse differs from the golden result."""
+    mismatches = []
+    for row in rows:
+        actual = signal_to_dict(_parse(row["text"]))
+        if actual != row.get("expected"):
+            mismatches.append((row["id"], row.get("expected"), actual))
+    return mismatches
+
+
+def _pct(sorted_samples: list[float], pct: float) -> float:
+    idx = max(0, min(len(sorted_samples) - 1, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[idx]
+
+
+def bench_throughput(texts: list[str], repeat: int = 20) -> dict:
+    # warm-up pass so regex compilation / caches are not measured
+    for t in texts:
+        _parse(t)
+    samples = []
+    perf = time.perf_counter
+    start = perf()
+    for _ in range(repeat):
+        for t in texts:
+            t0 = perf()
+            _parse(t)
+            samples.append(perf() - t0)
+    elapsed = perf() - start
+    samples.sort()
+    return {
+        "messages": len(samples),
+        "msgs_per_sec": len(samples) / elapsed,
+        "p50_us": _pct(samples, 50) * 1e6,
+        "p95_us": _pct(samples, 95) * 1e6,
+        "p99_us": _pct(samples, 99) * 1e6,
+        "max_us": samples[-1] * 1e6,
+    }
+
+
+def bench_allocations(texts: list[str]) -> dict:
+    """Peak traced memory while parsing, and blocks/bytes retained by the results."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        results = [_parse(t) for t in texts]
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(s.count_diff for s in stats if s.count_diff > 0)
+    size = sum(s.size_diff for s in stats if s.size_diff > 0)
+    n = len(texts)
+    return {
+        "peak_kib": peak / 1024,
+        "retained_blocks_per_msg": blocks / n,
+        "retained_bytes_per_msg": size / n,
+        "signals": sum(r is not None for r in results),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--corpus", default=CORPUS_PATH)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--update-golden", action="store_true")
+    ap.add_argument("--min-rate", type=float, default=0, help="fail below this many msg/s")
+    ap.add_argument("--max-p99-us", type=float, default=0, help="fail above this p99 latency")
+    args = ap.parse_args(argv)
+
+    rows = load_corpus(args.corpus)
+    if args.update_golden:
+        for row in rows:
+            row["expected"] = signal_to_dict(_parse(row["text"]))
+        save_corpus(rows, args.corpus)
+        print(f"Updated golden results for {len(rows)} messages in {args.corpus}")
+        return 0
+
+    failed = False
+    mismatches = check_golden(rows)
+    print(f"golden: {len(rows) - len(mismatches)}/{len(rows)} match")
+    for msg_id, expected, actual in mismatches[:20]:
+        print(f"  {msg_id}: expected={expected} actual={actual}")
+    failed |= bool(mismatches)
+
+    texts = [row["text"] for row in rows]
+    t = bench_throughput(texts, args.repeat)
+    print(
+        f"throughput: {t['msgs_per_sec']:,.0f} msg/s over {t['messages']} parses | "
+        f"p50={t['p50_us']:.1f}us p95={t['p95_us']:.1f}us p99={t['p99_us']:.1f}us max={t['max_us']:.1f}us"
+    )
+    a = bench_allocations(texts)
+    print(
+        f"memory: peak={a['peak_kib']:.1f}KiB retained={a['retained_blocks_per_msg']:.2f} blocks/msg "
+        f"({a['retained_bytes_per_msg']:.0f} B/msg), {a['signals']} signals"
+    )
+
+    if args.min_rate and t["msgs_per_sec"] < args.min_rate:
+        print(f"FAIL: throughput below {args.min_rate:,.0f} msg/s")
+        failed = True
+    if args.max_p99_us and t["p99_us"] > args.max_p99_us:
+        print(f"FAIL: p99 above {args.max_p99_us:.1f}us")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
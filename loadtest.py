@@ -0,0 +1,240 @@
+"""End-to-end load test: synthetic Telegram signals -> on_new_message -> mock Binance.
+
+    python loadtest.py                                  # 10 bursts of 20 messages
+    python loadtest.py --bursts 5 --burst-size 100 --accounts 3
+    python loadtest.py --latency-ms 40 --error-rate 0.05 --weight-limit 300
+    python loadtest.py --account-qps 50 --weight-limit 600   # /balance spam vs. orders
+    python loadtest.py --lost-rate 0.1 --stall-rate 0.05      # unknown order status
+
+Starts app.mock_binance on localhost, points BINANCE_BASE_URL (and any extra
+ACCOUNTS) at it, then replays bursts of synthetic events through the real
+router and on_new_message. Telegram and the market/account streams are never
+connected; notifications are disabled unless TG_ADMIN_CHAT_ID is set.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from app.mock_binance import MockBinance, MockConfig
+
+LISTEN_CHAT_ID = 777000
+
+
+class SyntheticEvent:
+    """The subset of a Telethon NewMessage event the handlers use."""
+
+    def __init__(self, chat_id: int, msg_id: int, text: str):
+        self.chat_id = chat_id
+        self.raw_text = text
+        self.message = SimpleNamespace(id=msg_id, date=datetime.now(timezone.utc))
+
+    async def get_chat(self):
+        return SimpleNamespace(title="Load Test")
+
+
+def synthetic_text(rng: random.Random, chatter_ratio: float, seq: int, base: float = 4870.0) -> str:
+    if rng.random() < chatter_ratio:
+        return rng.choice([
+            "Good morning traders, market opens soon",
+            "Running +40 pips, move SL to entry",
+            "Gold looking strong today 🚀",
+            "Close half now",
+        ])
+    side = rng.choice(["BUY", "SELL"])
+    # distinct levels per message so the deduper only catches deliberate repeats
+    entry = round(base - 5 + (seq % 1000) / 100, 2)
+    step = 4 if side == "BUY" else -4
+    tps = "\n".join(f"TP {entry + step * i:.2f}" for i in range(1, 4))
+    sl = entry - 12 if side == "BUY" else entry + 12
+    return f"#XAUUSD {side} {entry:.2f}\n\n{tps}\n\nSL {sl:.2f}"
+
+
+def _pct(sorted_samples: list[float], pct: float) -> float:
+    idx = max(0, min(len(sorted_samples) - 1, int(round(pct / 100 * len(sorted_samples))) - 1))
+    return sorted_samples[idx]
+
+
+def configure_env(base_url: str, accounts: int, session_dir: str):
+    """Settings are read on first use, so this must run before the container is touched."""
+    os.environ["BINANCE_BASE_URL"] = base_url
+    os.environ["TG_LISTEN_CHAT_ID"] = str(LISTEN_CHAT_ID)
+    os.environ["ACCOUNTS"] = json.dumps([
+        {"name": f"sub{i}", "api_key": f"key{i}", "api_secret": f"secret{i}"}
+        for i in range(1, accounts)
+    ])
+    os.environ["MARKET_DATA_ENABLED"] = "false"
+    os.environ["ACCOUNT_STREAM_ENABLED"] = "false"
+    defaults = {
+        "BINANCE_API_KEY": "key0",
+        "BINANCE_API_SECRET": "secret0",
+        "TG_API_ID": "1",
+        "TG_API_HASH": "loadtest",
+        "TG_BOT_TOKEN": "1:loadtest",
+        "TG_ADMIN_CHAT_ID": "",
+        "TG_SESSION": os.path.join(session_dir, "loadtest"),
+        "JOURNAL_PATH": os.path.join(session_dir, "trades.db"),
+        "LOG_LEVEL": "WARNING",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+
+async def run(args) -> dict:
+    mock = MockBinance(MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        reject_rate=args.reject_rate,
+        lost_rate=args.lost_rate,
+        stall_rate=args.stall_rate,
+        stall_ms=args.stall_ms,
+        weight_limit_1m=args.weight_limit,
+        order_limit_10s=args.order_limit_10s,
+        order_limit_1m=args.order_limit,
+    ), seed=args.seed)
+    base_url = await mock.start()
+    session_dir = tempfile.mkdtemp(prefix="loadtest-")
+    configure_env(base_url, args.accounts, session_dir)
+    # the client-side scheduler enforces the same budgets as the mock
+    os.environ["BINANCE_WEIGHT_LIMIT_1M"] = str(args.weight_limit)
+    os.environ["BINANCE_ORDER_LIMIT_10S"] = str(args.order_limit_10s)
+    os.environ["BINANCE_ORDER_LIMIT_1M"] = str(args.order_limit)
+
+    import app.main as bot
+    from app.latency import latency, format_report
+
+    container = bot.container
+    container.log  # configures logging from LOG_LEVEL
+    bot.add_routes()
+    await container.executor.warm_up(["XAUUSDT"])
+    await container.binance.exchange_info.load()
+    container.outbox.start()
+    if container.journal:
+        container.journal.open()
+        container.journal.start()
+    latency.reset()
+
+    rng = random.Random(args.seed)
+    e2e: list[float] = []
+    msg_id = 0
+    sent: list[SyntheticEvent] = []
+    account_calls = {"ok": 0, "failed": 0}
+
+    async def account_traffic():
+        # /balance-style background load competing with orders for request weight
+        while True:
+            await asyncio.sleep(1 / args.account_qps)
+            try:
+                await container.binance.futures_account_info()
+                account_calls["ok"] += 1
+            except Exception:
+                account_calls["failed"] += 1
+
+    background = asyncio.create_task(account_traffic()) if args.account_qps > 0 else None
+
+    async def deliver(event):
+        t0 = time.perf_counter()
+        await bot.router.dispatch(event)
+        e2e.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    try:
+        for _ in range(args.bursts):
+            events = []
+            for _ in range(args.burst_size):
+                if sent and rng.random() < args.dup_ratio:
+                    # Telethon-style redelivery of an earlier update
+                    events.append(rng.choice(sent))
+                    continue
+                msg_id += 1
+                event = SyntheticEvent(LISTEN_CHAT_ID, msg_id, synthetic_text(rng, args.chatter_ratio, msg_id))
+                sent.append(event)
+                events.append(event)
+            await asyncio.gather(*(deliver(e) for e in events))
+            if args.interval:
+                await asyncio.sleep(args.interval)
+        elapsed = time.perf_counter() - started - args.interval * args.bursts
+    finally:
+        if background is not None:
+            background.cancel()
+        await container.outbox.close()
+        if container.journal:
+            await container.journal.close()
+        await container.executor.close()
+        await mock.stop()
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+    e2e.sort()
+    return {
+        "messages": len(e2e),
+        "elapsed": elapsed,
+        "msgs_per_sec": len(e2e) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": _pct(e2e, 50) * 1000,
+        "p95_ms": _pct(e2e, 95) * 1000,
+        "p99_ms": _pct(e2e, 99) * 1000,
+        "max_ms": e2e[-1] * 1000,
+        "mock": dict(mock.stats),
+        "account_calls": account_calls,
+        "scheduler": container.binance.scheduler.snapshot(),
+        "duplicates": container.deduper.duplicates,
+        "stages": format_report(latency),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--bursts", type=int, default=10)
+    ap.add_argument("--burst-size", type=int, default=20)
+    ap.add_argument("--interval", type=float, default=0.0, help="seconds between bursts")
+    ap.add_argument("--chatter-ratio", type=float, default=0.5, help="fraction of non-signal messages")
+    ap.add_argument("--dup-ratio", type=float, default=0.0, help="fraction of redelivered messages")
+    ap.add_argument("--accounts", type=int, default=1)
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    ap.add_argument("--jitter-ms", type=float, default=2.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--reject-rate", type=float, default=0.0)
+    ap.add_argument("--lost-rate", type=float, default=0.0, help="orders executed but answered with 503")
+    ap.add_argument("--stall-rate", type=float, default=0.0, help="orders answered only after --stall-ms")
+    ap.add_argument("--stall-ms", type=float, default=3000.0)
+    ap.add_argument("--weight-limit", type=int, default=2400)
+    ap.add_argument("--order-limit", type=int, default=1200)
+    ap.add_argument("--order-limit-10s", type=int, default=300)
+    ap.add_argument("--account-qps", type=float, default=0.0, help="background account queries per second")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-p99-ms", type=float, default=0, help="fail above this end-to-end p99")
+    args = ap.parse_args(argv)
+
+    r = asyncio.run(run(args))
+    print(
+        f"throughput: {r['msgs_per_sec']:,.1f} msg/s over {r['messages']} messages in {r['elapsed']:.2f}s | "
+        f"e2e p50={r['p50_ms']:.1f}ms p95={r['p95_ms']:.1f}ms p99={r['p99_ms']:.1f}ms max={r['max_ms']:.1f}ms"
+    )
+    m = r["mock"]
+    print(
+        f"mock binance: {m['requests']} requests, {m['orders']} orders, {m['errors']} 5xx, "
+        f"{m['rejects']} rejects, {m['lost']} lost, {m['stalled']} stalled, {m['rate_limited']} rate-limited | "
+        f"{r['duplicates']} duplicates skipped"
+    )
+    a, sched = r["account_calls"], r["scheduler"]
+    print(
+        f"account queries: {a['ok']} ok, {a['failed']} failed | "
+        f"scheduler: weight={sched['weight_1m']} shed={sched['shed']}"
+    )
+    print(r["stages"])
+
+    if args.max_p99_ms and r["p99_ms"] > args.max_p99_ms:
+        print(f"FAIL: e2e p99 above {args.max_p99_ms:.1f}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import asyncio
+
+from app.account_stream import AccountMirror
+
+
+class SlowRest:
+    """REST snapshot that answers only when `release` is set, with a position of 1."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    async def _wait(self, value):
+        await self.release.wait()
+        return value
+
+    def futures_account_balance(self):
+        return self._wait([{"asset": "USDT", "balance": "100", "availableBalance": "100"}])
+
+    def futures_account_info(self):
+        return self._wait({"totalWalletBalance": "100", "totalUnrealizedProfit": "0", "availableBalance": "100"})
+
+    def positions_risk(self):
+        return self._wait([{"symbol": "XAUUSDT", "positionSide": "BOTH", "positionAmt": "1"}])
+
+    def open_orders(self):
+        return self._wait([{"orderId": 1, "symbol": "XAUUSDT", "status": "NEW"}])
+
+
+def account_update(amt: str) -> dict:
+    return {"e": "ACCOUNT_UPDATE", "a": {"B": [], "P": [{"s": "XAUUSDT", "ps": "BOTH", "pa": amt, "ep": "1", "up": "0"}]}}
+
+
+def order_update(order_id: int, status: str) -> dict:
+    return {"e": "ORDER_TRADE_UPDATE", "o": {"i": order_id, "c": f"c{order_id}", "s": "XAUUSDT", "X": status}}
+
+
+def test_stream_events_during_snapshot_are_applied_on_top():
+    async def scenario():
+        rest = SlowRest()
+        mirror = AccountMirror(rest, "wss://example")
+        seen = []
+        mirror.order_listeners.append(lambda o: seen.append(o["status"]))
+        task = asyncio.create_task(mirror.reconcile())
+        await asyncio.sleep(0)
+        # newer than the snapshot that is still in flight
+        mirror.on_event(account_update("2"))
+        mirror.on_event(order_update(1, "FILLED"))
+        assert seen == ["FILLED"]  # listeners are not held back
+        rest.release.set()
+        await task
+        return mirror
+
+    mirror = asyncio.run(scenario())
+    assert mirror.position_amt("XAUUSDT") == 2
+    assert mirror.open_orders == {}
+
+
+def test_events_apply_directly_outside_a_snapshot():
+    async def scenario():
+        rest = SlowRest()
+        rest.release.set()
+        mirror = AccountMirror(rest, "wss://example", refresh_delay=0)
+        mirror.on_event(order_update(7, "NEW"))
+        mirror.on_event(account_update("-3"))
+        assert list(mirror.open_orders) == [7]
+        assert mirror.position_amt("XAUUSDT") == -3
+        await mirror._refresh
+        return mirror
+
+    mirror = asyncio.run(scenario())
+    # totals come from the refresh an ACCOUNT_UPDATE triggers
+    assert mirror.account["availableBalance"] == "100"
+
+
+def test_account_update_burst_shares_one_refresh():
+    class CountingRest(SlowRest):
+        calls = 0
+
+        def futures_account_info(self):
+            CountingRest.calls += 1
+            return super().futures_account_info()
+
+    async def scenario():
+        rest = CountingRest()
+        rest.release.set()
+        mirror = AccountMirror(rest, "wss://example", refresh_delay=0.01)
+        for amt in ("1", "2", "3"):
+            mirror.on_event(account_update(amt))
+        await mirror._refresh
+
+    asyncio.run(scenario())
+    assert CountingRest.calls == 1
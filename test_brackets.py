@@ -0,0 +1,178 @@
+import asyncio
+import copy
+
+from app.binance_client import BinanceFutures
+from app.brackets import BracketManager
+from app.executor import Account, FanOutExecutor, OrderPlan
+from app.journal import TradeJournal
+from app.mock_binance import MockBinance, MockConfig
+
+SYMBOL = "XAUUSDT"
+# SELL at the mock mark of 4870: TP below, SL above
+PLAN = OrderPlan(SYMBOL, "SELL", 4870.0, tp_price=4850.0, sl_price=4885.0, signal_key="1:1", tps=(4865.0, 4850.0))
+
+
+async def settle(manager: BracketManager):
+    while manager._tasks:
+        await asyncio.gather(*list(manager._tasks))
+
+
+def live_orders(mock: MockBinance, kind: str) -> list[dict]:
+    return [o for o in mock.orders.values() if o["type"] == kind and o["status"] == "NEW"]
+
+
+def armed(manager: BracketManager) -> int:
+    return sum(len(heap) for heaps in (manager._up, manager._down) for heap in heaps.values())
+
+
+def run(tmp_path, scenario, streamed=frozenset({"main"}), breakeven_after_tp=0):
+    """Open one bracket for account "main" against the mock, then hand everything to `scenario`."""
+    async def main():
+        mock = MockBinance(MockConfig(latency_ms=0, jitter_ms=0))
+        url = await mock.start()
+        client = BinanceFutures("key", "secret", url)
+        journal = TradeJournal(str(tmp_path / "trades.db"))
+        journal.open()
+        journal.start()
+        manager = BracketManager(
+            journal, {"main": client}, streamed=streamed, breakeven_after_tp=breakeven_after_tp, recheck_sec=0.01,
+        )
+        try:
+            executor = FanOutExecutor([Account("main", client, 100.0, 10, asyncio.Semaphore(2))])
+            results = await executor.execute(PLAN)
+            (bracket,) = journal.record_execution(PLAN, results)
+            manager.watch(bracket)
+            await scenario(mock, manager, bracket)
+        finally:
+            await manager.close()
+            await journal.close()
+            await client.close()
+            await mock.stop()
+
+    asyncio.run(main())
+
+
+def test_tp_fill_cancels_sl(tmp_path):
+    async def scenario(mock, manager, bracket):
+        manager.on_order_update(mock.fill(PLAN.client_id("main", "TP")))
+        await settle(manager)
+        assert mock._by_client_id[PLAN.client_id("main", "SL")]["status"] == "CANCELED"
+        assert bracket.status == "closed"
+        assert manager.stats["canceled"] == 1
+
+    run(tmp_path, scenario)
+
+
+def test_sl_fill_cancels_tp(tmp_path):
+    async def scenario(mock, manager, bracket):
+        manager.on_order_update(mock.fill(PLAN.client_id("main", "SL")))
+        await settle(manager)
+        assert mock._by_client_id[PLAN.client_id("main", "TP")]["status"] == "CANCELED"
+        assert live_orders(mock, "LIMIT") == live_orders(mock, "STOP_MARKET") == []
+
+    run(tmp_path, scenario)
+
+
+def test_breakeven_leaves_exactly_one_live_stop(tmp_path):
+    async def scenario(mock, manager, bracket):
+        entry = bracket.entry_price
+        manager.on_price(SYMBOL, 4870.0)
+        await settle(manager)
+        assert manager.stats["breakeven"] == 0
+        # TP1 reached
+        manager.on_price(SYMBOL, 4864.0)
+        await settle(manager)
+        stops = live_orders(mock, "STOP_MARKET")
+        assert len(stops) == 1
+        assert float(stops[0]["stopPrice"]) == round(entry, 2)
+        assert bracket.legs["SL"]["client_id"] == stops[0]["clientOrderId"]
+        assert bracket.legs["SL0"]["status"] == "CANCELED"
+        # ticking through the level again does not move it twice
+        manager.on_price(SYMBOL, 4860.0)
+        await settle(manager)
+        assert manager.stats["breakeven"] == 1
+        assert len(live_orders(mock, "STOP_MARKET")) == 1
+
+    run(tmp_path, scenario, breakeven_after_tp=1)
+
+
+def test_breakeven_then_tp_fill_cancels_the_new_stop(tmp_path):
+    async def scenario(mock, manager, bracket):
+        manager.on_price(SYMBOL, 4864.0)
+        await settle(manager)
+        manager.on_order_update(mock.fill(PLAN.client_id("main", "TP")))
+        await settle(manager)
+        assert live_orders(mock, "STOP_MARKET") == []
+
+    run(tmp_path, scenario, breakeven_after_tp=1)
+
+
+def test_unstreamed_tp_fill_is_found_on_price_cross(tmp_path):
+    async def scenario(mock, manager, bracket):
+        # filled on the exchange, but this account has no user data stream
+        mock.fill(PLAN.client_id("main", "TP"))
+        manager.on_price(SYMBOL, 4860.0)
+        await settle(manager)
+        assert bracket.status == "open"
+        manager.on_price(SYMBOL, 4849.0)
+        await settle(manager)
+        assert bracket.status == "closed"
+        assert mock._by_client_id[PLAN.client_id("main", "SL")]["status"] == "CANCELED"
+
+    run(tmp_path, scenario, streamed=frozenset())
+
+
+def test_unstreamed_sl_cross_without_fill_keeps_tp(tmp_path):
+    async def scenario(mock, manager, bracket):
+        # the mark touched the stop but the order never filled
+        manager.on_price(SYMBOL, 4890.0)
+        await settle(manager)
+        assert bracket.status == "open"
+        assert manager.stats["checks"] == manager.max_checks
+        assert mock._by_client_id[PLAN.client_id("main", "TP")]["status"] == "NEW"
+
+    run(tmp_path, scenario, streamed=frozenset())
+
+
+def test_streamed_account_ignores_price_for_fills(tmp_path):
+    async def scenario(mock, manager, bracket):
+        mock.fill(PLAN.client_id("main", "TP"))
+        manager.on_price(SYMBOL, 4849.0)
+        await settle(manager)
+        # fills for streamed accounts arrive as ORDER_TRADE_UPDATE, never via lookups
+        assert manager.stats["checks"] == 0
+        assert bracket.status == "open"
+
+    run(tmp_path, scenario)
+
+
+def test_closed_bracket_leaves_no_triggers_behind(tmp_path):
+    async def scenario(mock, manager, bracket):
+        assert armed(manager) == 3  # TP and SL lookups, breakeven
+        manager.on_order_update(mock.fill(PLAN.client_id("main", "SL")))
+        await settle(manager)
+        # none of those levels was ever reached
+        assert armed(manager) == 0
+        assert manager._up == manager._down == {}
+
+    run(tmp_path, scenario, streamed=frozenset(), breakeven_after_tp=1)
+
+
+def test_heaps_shrink_as_brackets_close(tmp_path):
+    async def scenario(mock, manager, bracket):
+        brackets = []
+        for i in range(50):
+            other = copy.deepcopy(bracket)
+            other.signal_key = f"2:{i}"
+            manager.journal._track(other)
+            manager.watch(other)
+            brackets.append(other)
+        assert armed(manager) == 2 * 51
+        for other in brackets[:40]:
+            manager._update_leg(other, "TP", {"status": "FILLED"})
+        assert armed(manager) == 2 * 11
+        # the survivors still fire
+        manager.on_price(SYMBOL, 4849.0)
+        assert armed(manager) == 11
+
+    run(tmp_path, scenario, streamed=frozenset())
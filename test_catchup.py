@@ -0,0 +1,82 @@
+import asyncio
+
+from app.catchup import BACKLOG, LIVE, STALE, CatchUpGate
+
+
+def test_classify_boundaries():
+    gate = CatchUpGate(max_age=60, backlog_age=5)
+    assert gate.classify(None) == LIVE  # no server time to compare against
+    assert gate.classify(0) == LIVE
+    assert gate.classify(5) == LIVE
+    assert gate.classify(5.01) == BACKLOG
+    assert gate.classify(60) == BACKLOG
+    assert gate.classify(60.01) == STALE
+    assert gate.stale == 1
+
+
+def test_zero_ages_disable_each_gate():
+    assert CatchUpGate(max_age=0, backlog_age=5).classify(3600) == BACKLOG
+    assert CatchUpGate(max_age=60, backlog_age=0).classify(30) == LIVE
+
+
+def test_backlog_collapses_to_newest_per_symbol():
+    async def scenario():
+        gate = CatchUpGate(window=0.05)
+        # replayed out of order: the newest XAU signal is not the last to arrive
+        waiters = {
+            key: asyncio.create_task(gate.newest(symbol, ts, key))
+            for symbol, ts, key in (
+                ("XAUUSDT", 100.0, "1:1"),
+                ("XAUUSDT", 130.0, "1:3"),
+                ("BTCUSDT", 110.0, "1:2"),
+                ("XAUUSDT", 120.0, "1:4"),
+            )
+        }
+        results = {key: await task for key, task in waiters.items()}
+        return gate, results
+
+    gate, results = asyncio.run(scenario())
+    assert results == {"1:1": False, "1:3": True, "1:2": True, "1:4": False}
+    assert gate.collapsed == 2
+
+
+def test_same_timestamp_is_broken_by_signal_key():
+    async def scenario():
+        gate = CatchUpGate(window=0.01)
+        return await asyncio.gather(gate.newest("XAUUSDT", 100.0, "1:7"), gate.newest("XAUUSDT", 100.0, "1:8"))
+
+    assert asyncio.run(scenario()) == [False, True]
+
+
+def test_live_signal_supersedes_waiting_backlog():
+    async def scenario():
+        gate = CatchUpGate(window=0.05)
+        old = asyncio.create_task(gate.newest("XAUUSDT", 100.0, "1:1"))
+        other = asyncio.create_task(gate.newest("BTCUSDT", 100.0, "1:2"))
+        await asyncio.sleep(0)
+        gate.supersede("XAUUSDT", 200.0, "1:9")
+        return await old, await other
+
+    # only the symbol the live signal is for is dropped
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_supersede_without_backlog_leaves_nothing_behind():
+    async def scenario():
+        gate = CatchUpGate(window=0.01)
+        gate.supersede("XAUUSDT", 200.0, "1:9")
+        # a later backlog window starts clean
+        return await gate.newest("XAUUSDT", 100.0, "1:1")
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_windows_reopen_after_closing():
+    async def scenario():
+        gate = CatchUpGate(window=0.01)
+        first = await gate.newest("XAUUSDT", 200.0, "1:2")
+        # an older signal after the window closed is judged in a window of its own
+        second = await gate.newest("XAUUSDT", 100.0, "1:1")
+        return first, second, gate._flush, gate._newest
+
+    assert asyncio.run(scenario()) == (True, True, {}, {})
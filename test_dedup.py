@@ -0,0 +1,97 @@
+import re
+
+import pytest
+
+from app import dedup
+from app.dedup import SignalDeduper, client_order_id, fingerprint
+from app.parser import Signal, parse_signal
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(dedup.time, "monotonic", clock)
+    return clock
+
+
+SIG = Signal("XAUUSDT", "SELL", 4870.0, [4865.0, 4850.0], 4885.0)
+
+
+def test_fingerprint_ignores_formatting():
+    a = parse_signal("XAUUSD SELL 4870\nTP1 4865\nTP2 4850\nSL 4885")
+    b = parse_signal("#xauusd sell now @ 4870.0\nTP 1: 4865.00\nTP 2: 4850\nSL: 4885.0")
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint(Signal("xauusdt", "sell", 4870, [4865, 4850], 4885)) == fingerprint(SIG)
+
+
+def test_fingerprint_separates_different_trades():
+    assert fingerprint(SIG) != fingerprint(Signal("XAUUSDT", "BUY", 4870.0, [4865.0, 4850.0], 4885.0))
+    assert fingerprint(SIG) != fingerprint(Signal("XAUUSDT", "SELL", 4870.0, [4865.0], 4885.0))
+    assert fingerprint(SIG) != fingerprint(Signal("XAUUSDT", "SELL", 4870.0, [4865.0, 4850.0], None))
+
+
+def test_fingerprint_is_stable_across_processes():
+    # journaled fingerprints are restored after a restart, so they must not depend on hash seeds
+    assert fingerprint(SIG) == "089b1a48264a67ba"
+
+
+def test_client_order_id_is_deterministic_and_valid():
+    cid = client_order_id("-100123:42", "main", "SL0")
+    assert cid == client_order_id("-100123:42", "main", "SL0")
+    assert cid != client_order_id("-100123:42", "sub", "SL0")
+    assert re.fullmatch(r"[.A-Z:/a-z0-9_-]{1,36}", cid)
+
+
+def test_redelivered_message_and_repost_are_duplicates(clock):
+    d = SignalDeduper(window_sec=300)
+    fp = fingerprint(SIG)
+    assert d.check("1:10", fp) is None
+    assert d.check("1:10", fp) == "message"
+    # the same trade posted again, or in another channel
+    assert d.check("2:99", fp) == "signal"
+    assert d.duplicates == 2
+
+
+def test_window_expiry(clock):
+    d = SignalDeduper(window_sec=300)
+    fp = fingerprint(SIG)
+    d.check("1:10", fp)
+    clock.now += 299
+    assert d.check("1:11", fp) == "signal"
+    clock.now += 2
+    assert d.check("1:12", fp) is None
+
+
+def test_zero_window_disables(clock):
+    d = SignalDeduper(window_sec=0)
+    assert d.check("1:10", "fp") is None
+    assert d.check("1:10", "fp") is None
+
+
+def test_lru_evicts_oldest(clock):
+    # every signal takes two entries: its message and its fingerprint
+    d = SignalDeduper(maxsize=4, window_sec=300)
+    d.check("1:1", "a")
+    d.check("1:2", "b")
+    d.check("1:3", "c")
+    assert len(d._items) == 4
+    assert d.check("1:9", "a") is None  # evicted by c
+    assert d.check("1:9", "c") == "message"
+
+
+def test_restore_keeps_only_the_remaining_window(clock):
+    d = SignalDeduper(window_sec=300)
+    d.restore("1:10", "fp", age_sec=250)
+    d.restore("1:11", "old", age_sec=400)
+    assert d.check("2:1", "fp") == "signal"
+    assert d.check("2:2", "old") is None
+    clock.now += 51
+    assert d.check("2:3", "fp") is None
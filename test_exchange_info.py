@@ -0,0 +1,89 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from app.binance_client import BinanceFutures
+from app.exchange_info import ExchangeInfoCache
+from app.mock_binance import MockBinance, MockConfig
+
+INFO = {"symbols": [{
+    "symbol": "XAUUSDT",
+    "filters": [
+        {"filterType": "PRICE_FILTER", "tickSize": "0.01"},
+        {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001", "maxQty": "1000"},
+    ],
+}]}
+
+
+class FlakyFetch:
+    def __init__(self):
+        self.calls = 0
+        self.fail = True
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise ConnectionError("exchangeInfo down")
+        return INFO
+
+
+def test_failed_load_is_not_refetched_by_every_signal():
+    async def scenario():
+        fetch = FlakyFetch()
+        cache = ExchangeInfoCache(fetch, retry_sec=30)
+        results = await asyncio.gather(*(cache.ensure_loaded() for _ in range(5)), return_exceptions=True)
+        assert all(isinstance(r, Exception) for r in results)
+        assert fetch.calls == 1
+        cache.failed_at -= 10
+        with pytest.raises(RuntimeError):
+            await cache.ensure_loaded()
+        # signals see no filters, like for an unknown symbol
+        assert await cache.filters("XAUUSDT") is None
+        assert fetch.calls == 1
+        # the window is over: the next signal tries again
+        cache.failed_at -= 25
+        fetch.fail = False
+        assert (await cache.filters("XAUUSDT")).tick_size == Decimal("0.01")
+        assert fetch.calls == 2
+        assert cache.failed_at == 0
+
+    asyncio.run(scenario())
+
+
+def test_refresh_loop_retries_sooner_after_a_failure():
+    async def scenario():
+        fetch = FlakyFetch()
+        cache = ExchangeInfoCache(fetch, retry_sec=0.01)
+        with pytest.raises(ConnectionError):
+            await cache.load()
+        fetch.fail = False
+        task = asyncio.create_task(cache.run_refresh(3600))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        return cache
+
+    assert asyncio.run(scenario()).get("XAUUSDT") is not None
+
+
+def test_signal_during_the_retry_window_executes_unrounded():
+    async def scenario():
+        mock = MockBinance(MockConfig(latency_ms=0, jitter_ms=0))
+        client = BinanceFutures("key", "secret", await mock.start())
+        fetch = FlakyFetch()
+        client.exchange_info._fetch = fetch
+        try:
+            with pytest.raises(ConnectionError):
+                await client.exchange_info.load()  # startup
+            # what execute_signal and the executor do with a signal inside the window
+            assert await client.round_price("XAUUSDT", 4850.123) == 4850.123
+            assert await client.round_quantity("XAUUSDT", 0.01, market=True) == 0.01
+            order = await client.market_order("XAUUSDT", "BUY", 0.01)
+            assert order["status"] == "FILLED"
+            assert fetch.calls == 1
+        finally:
+            await client.close()
+            await mock.stop()
+
+    asyncio.run(scenario())
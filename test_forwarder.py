@@ -0,0 +1,177 @@
+import asyncio
+import json
+import re
+import threading
+
+from app import forwarder
+from app.forwarder import ForwardPipeline
+from app.router import EntityCache
+
+
+class FakeMessage:
+    def __init__(self, msg_id: int):
+        self.id = msg_id
+        self.serialized_on = None
+
+    def to_dict(self) -> dict:
+        self.serialized_on = threading.get_ident()
+        return {"id": self.id, "message": f"text {self.id}"}
+
+
+class FakeEvent:
+    chat_id = -100
+
+    def __init__(self, msg_id: int):
+        self.message = FakeMessage(msg_id)
+
+    async def get_chat(self):
+        class Chat:
+            title = "Signals"
+        return Chat()
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent: list[list[int]] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+        self.failures = 0
+
+    async def send_message(self, chat_id, text: str):
+        await self.gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Cannot send requests while disconnected")
+        doc = re.search(r"```json\n(.*)\n```", text, re.S).group(1)
+        self.sent.append([r["message"]["id"] for r in json.loads(doc)])
+
+
+def pipeline(tmp_path, client, **kwargs) -> ForwardPipeline:
+    return ForwardPipeline(
+        client, "-1001", EntityCache(), maxsize=2, interval=0.01, max_batch=2, overflow="spill",
+        spill_path=str(tmp_path / "spill.jsonl"), native_forward=False, **kwargs,
+    )
+
+
+def write_spill(path, ids):
+    path.write_text("".join(json.dumps({"from": "a", "message": {"id": i}}) + "\n" for i in ids))
+
+
+async def wait_replayed(p: ForwardPipeline, client, count: int):
+    """Until `count` messages went out and the worker found the spill empty (and deleted it)."""
+    for _ in range(500):
+        if sum(len(batch) for batch in client.sent) >= count and not p._spill_pending:
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_overflow_is_spilled_and_replayed_once_drained(tmp_path):
+    async def scenario():
+        client = FakeClient()
+        client.gate.clear()
+        p = pipeline(tmp_path, client)
+        p.start()
+        for i in range(1, 7):
+            p.submit(FakeEvent(i))
+        await asyncio.sleep(0.05)
+        # the worker is stuck sending, the queue holds two: the rest went to disk
+        assert p.spilled >= 2
+        client.gate.set()
+        await wait_replayed(p, client, 6)
+        await p.close()
+        return client, p
+
+    client, p = asyncio.run(scenario())
+    assert sorted(i for batch in client.sent for i in batch) == list(range(1, 7))
+    assert p.dropped == 0
+    assert not (tmp_path / "spill.jsonl").exists()
+    assert not (tmp_path / "spill.jsonl.replay").exists()
+
+
+def test_spill_left_by_an_earlier_run_is_replayed(tmp_path):
+    (tmp_path / "spill.jsonl.replay").write_text(
+        json.dumps({"from": "a", "message": {"id": 1}}) + "\n" + '{"from": "a", "mess',  # cut short by a crash
+    )
+    (tmp_path / "spill.jsonl").write_text(json.dumps({"from": "a", "message": {"id": 2}}) + "\n")
+
+    async def scenario():
+        client = FakeClient()
+        p = pipeline(tmp_path, client)
+        p.start()
+        await wait_replayed(p, client, 2)
+        await p.close()
+        return client
+
+    assert asyncio.run(scenario()).sent == [[1], [2]]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_close_drains_the_queue_before_stopping(tmp_path):
+    async def scenario():
+        client = FakeClient()
+        p = pipeline(tmp_path, client)
+        p.start()
+        p.submit(FakeEvent(1))
+        p.submit(FakeEvent(2))
+        await p.close()
+        return client
+
+    assert asyncio.run(scenario()).sent == [[1, 2]]
+
+
+def test_replay_reads_the_spill_in_chunks(tmp_path):
+    write_spill(tmp_path / "spill.jsonl", range(1, 6))
+
+    async def scenario():
+        client = FakeClient()
+        p = pipeline(tmp_path, client)
+        lines, offset = p._read_spill(0)
+        # only one chunk is held in memory; the rest stays on disk behind the offset
+        assert len(lines) == p.max_batch
+        assert 0 < offset < (tmp_path / "spill.jsonl.replay").stat().st_size
+        p.start()
+        await wait_replayed(p, client, 5)
+        await p.close()
+        return client
+
+    assert asyncio.run(scenario()).sent == [[1, 2], [3, 4], [5]]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_replay_keeps_the_chunk_and_retries(tmp_path, monkeypatch):
+    monkeypatch.setattr(forwarder, "REPLAY_RETRY_SEC", 0.02)
+    write_spill(tmp_path / "spill.jsonl", range(1, 4))
+
+    async def scenario():
+        client = FakeClient()
+        client.failures = 2
+        p = pipeline(tmp_path, client)
+        p.start()
+        await asyncio.sleep(0.005)
+        # backing off, with nothing lost
+        assert client.sent == []
+        assert (tmp_path / "spill.jsonl.replay").exists()
+        await wait_replayed(p, client, 3)
+        await p.close()
+        return client
+
+    assert asyncio.run(scenario()).sent == [[1, 2], [3]]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spilled_messages_are_serialized_off_the_event_loop(tmp_path):
+    async def scenario():
+        client = FakeClient()
+        client.gate.clear()
+        p = pipeline(tmp_path, client)
+        events = [FakeEvent(i) for i in range(1, 6)]
+        for event in events:
+            p.submit(event)
+        await p._spill_task
+        return events
+
+    events = asyncio.run(scenario())
+    spilled = [e for e in events if e.message.serialized_on is not None]
+    assert spilled
+    assert all(e.message.serialized_on != threading.get_ident() for e in spilled)
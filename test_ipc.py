@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from app.ipc import IpcClient, IpcServer
+
+
+async def until(predicate, timeout: float = 2.0):
+    for _ in range(int(timeout / 0.01)):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_messages_round_trip_and_are_acknowledged(tmp_path):
+    path = str(tmp_path / "ipc.sock")
+
+    async def scenario():
+        received, notified = [], []
+
+        async def handler(msg):
+            received.append(msg["n"])
+
+        async def on_notify(msg):
+            notified.append(msg["message"])
+
+        server = IpcServer(path, handler)
+        await server.start()
+        client = IpcClient(path, "listener", handler=on_notify)
+        task = asyncio.create_task(client.run())
+        try:
+            for n in range(5):
+                client.send({"op": "signal", "n": n})
+            await until(lambda: len(received) == 5 and not client._unacked)
+            # the executor talks back to one role
+            await until(lambda: "listener" in server._clients.values())
+            assert server.broadcast({"op": "notify", "message": "hi"}, role="listener") == 1
+            assert server.broadcast({"op": "notify", "message": "x"}, role="bot") == 0
+            await until(lambda: notified == ["hi"])
+        finally:
+            task.cancel()
+            await server.close()
+        return received
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+
+
+def test_request_gets_its_reply(tmp_path):
+    path = str(tmp_path / "ipc.sock")
+
+    async def scenario():
+        async def handler(msg):
+            if msg["op"] == "fail":
+                raise ValueError("nope")
+            return {"echo": msg["x"]}
+
+        server = IpcServer(path, handler)
+        await server.start()
+        client = IpcClient(path, "bot")
+        task = asyncio.create_task(client.run())
+        try:
+            await asyncio.wait_for(client.connected.wait(), 2)
+            assert await client.request("echo", x=7) == {"echo": 7}
+            with pytest.raises(RuntimeError, match="nope"):
+                await client.request("fail")
+            # replies are the acknowledgement; requests are never kept for a resend
+            assert client._unacked == {}
+        finally:
+            task.cancel()
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_request_fails_fast_while_disconnected(tmp_path):
+    async def scenario():
+        client = IpcClient(str(tmp_path / "ipc.sock"), "bot")
+        with pytest.raises(ConnectionError):
+            await client.request("balance")
+
+    asyncio.run(scenario())
+
+
+def test_nothing_is_lost_while_the_executor_restarts(tmp_path):
+    path = str(tmp_path / "ipc.sock")
+
+    async def scenario():
+        dying_got, received = [], []
+        never = asyncio.Event()
+
+        async def dying(msg):
+            # reads the message, then the process goes away before it is handled
+            dying_got.append(msg["n"])
+            await never.wait()
+
+        async def handler(msg):
+            received.append(msg["n"])
+
+        server = IpcServer(path, dying)
+        await server.start()
+        client = IpcClient(path, "listener")
+        task = asyncio.create_task(client.run())
+        try:
+            client.send({"op": "signal", "n": 1})
+            await until(lambda: dying_got == [1])
+            await server.close()
+            await until(lambda: not client.connected.is_set())
+            # queued while the executor is down
+            client.send({"op": "signal", "n": 2})
+            server = IpcServer(path, handler)
+            await server.start()
+            await until(lambda: len(received) == 2 and not client._unacked, timeout=5)
+        finally:
+            task.cancel()
+            await server.close()
+        return received
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_unacknowledged_messages_count_against_the_bound(tmp_path):
+    async def scenario():
+        client = IpcClient(str(tmp_path / "ipc.sock"), "listener", maxsize=2)
+        client._unacked[99] = {"op": "signal", "seq": 99}
+        assert client.send({"op": "signal"})
+        assert not client.send({"op": "signal"})
+        return client
+
+    assert asyncio.run(scenario()).dropped == 1
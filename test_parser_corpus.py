@@ -0,0 +1,22 @@
+import pytest
+
+from app.parser import parse_signal, parse_many, looks_like_signal
+from bench_parser import load_corpus, signal_to_dict
+
+CORPUS = load_corpus()
+
+
+@pytest.mark.parametrize("row", CORPUS, ids=[row["id"] for row in CORPUS])
+def test_golden(row):
+    assert signal_to_dict(parse_signal(row["text"])) == row["expected"]
+
+
+def test_parse_many_matches_parse_signal():
+    texts = [row["text"] for row in CORPUS]
+    assert [signal_to_dict(s) for s in parse_many(texts)] == [row["expected"] for row in CORPUS]
+
+
+def test_prescreen_never_rejects_a_signal():
+    for row in CORPUS:
+        if row["expected"] is not None:
+            assert looks_like_signal(row["text"]), row["id"]
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from app.rate_limit import Priority, RequestScheduler, RequestShed
+
+
+class FakeClock:
+    """Wall clock the budget windows read; only moves when a test says so."""
+
+    def __init__(self, now: float = 1_000_040.0):  # 20s into a minute window
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def scheduler(clock: FakeClock, **kwargs) -> RequestScheduler:
+    return RequestScheduler(weight_limit=100, order_limit_10s=10, order_limit_1m=50, clock=clock, **kwargs)
+
+
+def test_inflight_and_header_accounting():
+    async def scenario():
+        s = scheduler(FakeClock())
+        await s.acquire(Priority.ENTRY, 10, orders=1)
+        assert s.snapshot()["weight_1m"] == 10
+        assert s.snapshot()["orders_10s"] == 1
+        # the response header is authoritative over the local count
+        s.release(10, 1, headers={"X-MBX-USED-WEIGHT-1M": "42", "X-MBX-ORDER-COUNT-10S": "3"})
+        snap = s.snapshot()
+        assert (snap["weight_1m"], snap["orders_10s"], snap["orders_1m"]) == (42, 3, 1)
+
+    asyncio.run(scenario())
+
+
+def test_window_rollover_resets_usage():
+    async def scenario():
+        clock = FakeClock()
+        s = scheduler(clock)
+        await s.acquire(Priority.ENTRY, 30)
+        s.release(30, 0)
+        assert s.snapshot()["weight_1m"] == 30
+        clock.now += 40  # next minute
+        assert s.snapshot()["weight_1m"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_low_priority_is_shed_at_its_cap_while_orders_still_go():
+    async def scenario():
+        s = scheduler(FakeClock())
+        s.release(0, 0, headers={"X-MBX-USED-WEIGHT-1M": "65"})
+        # ACCOUNT may fill 70% of the budget; the window resets in 40s, beyond its 3s max wait
+        with pytest.raises(RequestShed):
+            await s.acquire(Priority.ACCOUNT, 10)
+        await s.acquire(Priority.ENTRY, 10)
+        return s
+
+    s = asyncio.run(scenario())
+    assert s.shed == {"ACCOUNT": 1}
+
+
+def test_waiters_are_released_by_priority():
+    async def scenario():
+        s = scheduler(FakeClock(), max_wait={Priority.METADATA: 5.0})
+        await s.acquire(Priority.ENTRY, 100)
+        order = []
+
+        async def request(priority: Priority):
+            await s.acquire(priority, 5)
+            order.append(priority)
+
+        tasks = [asyncio.create_task(request(p)) for p in (Priority.METADATA, Priority.PROTECTIVE, Priority.ENTRY)]
+        await asyncio.sleep(0)
+        assert order == []
+        s.release(100, 0, headers={"X-MBX-USED-WEIGHT-1M": "0"})
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+        return order
+
+    assert asyncio.run(scenario()) == [Priority.ENTRY, Priority.PROTECTIVE, Priority.METADATA]
+
+
+def test_429_blocks_everything_until_retry_after():
+    async def scenario():
+        clock = FakeClock()
+        s = scheduler(clock)
+        s.release(0, 0, headers={"Retry-After": "30"}, status=429)
+        assert s.snapshot()["blocked_for"] == 30
+        with pytest.raises(RequestShed):
+            await s.acquire(Priority.ENTRY, 1)  # 30s > ENTRY's 1s max wait
+        clock.now += 31
+        await s.acquire(Priority.ENTRY, 1)
+
+    asyncio.run(scenario())
+
+
+def test_shared_weight_wakes_the_other_accounts_queue():
+    async def scenario():
+        clock = FakeClock()
+        primary, sub = scheduler(clock), scheduler(clock, max_wait={Priority.ENTRY: 5.0})
+        sub.share_weight(primary)
+        await primary.acquire(Priority.ENTRY, 100)
+        waiter = asyncio.create_task(sub.acquire(Priority.ENTRY, 10))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        # the clock is frozen, so only the release on the primary can unblock the sub-account
+        primary.release(100, 0, headers={"X-MBX-USED-WEIGHT-1M": "0"})
+        await asyncio.wait_for(waiter, 0.5)
+        assert primary.weight is sub.weight
+        assert primary.snapshot()["weight_1m"] == 10
+
+    asyncio.run(scenario())
+
+
+def test_grant_racing_a_cancelled_wait_is_handed_back():
+    async def scenario():
+        s = scheduler(FakeClock(), max_wait={Priority.ENTRY: 5.0})
+        await s.acquire(Priority.ENTRY, 100)
+        waiter = asyncio.create_task(s.acquire(Priority.ENTRY, 10))
+        await asyncio.sleep(0)
+        # budget frees up (the waiter is granted) and the caller gives up in the same tick
+        s.release(100, 0, headers={"X-MBX-USED-WEIGHT-1M": "0"})
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert s.weight.inflight == 0
+
+    asyncio.run(scenario())
+
+
+def test_timeout_is_shed_and_leaves_no_reservation():
+    async def scenario():
+        clock = FakeClock(now=1_000_079.0)  # 1s before the window resets
+        s = scheduler(clock, max_wait={Priority.ACCOUNT: 0.05})
+        s.release(0, 0, headers={"X-MBX-USED-WEIGHT-1M": "70"})
+        with pytest.raises(RequestShed):
+            await s.acquire(Priority.ACCOUNT, 10)
+        assert s.weight.inflight == 0
+        assert s.snapshot()["queued"] == 0
+
+    asyncio.run(scenario())
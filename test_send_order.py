@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from app.binance_client import BinanceFutures, StatusException
+from app.mock_binance import MockBinance, MockConfig
+
+SYMBOL = "XAUUSDT"
+
+
+def run(config: MockConfig, scenario, attempt_timeout=0.3, entry_deadline=3.0):
+    """Hand a client with a loaded exchangeInfo, talking to a mock set up with `config`, to `scenario`."""
+    async def main():
+        mock = MockBinance(config)
+        url = await mock.start()
+        client = BinanceFutures("key", "secret", url, attempt_timeout=attempt_timeout, entry_deadline=entry_deadline)
+        try:
+            await client.exchange_info.load()
+            return await scenario(mock, client)
+        finally:
+            await client.close()
+            await mock.stop()
+
+    return asyncio.run(main())
+
+
+def fills(mock: MockBinance) -> list[dict]:
+    return [o for o in mock.orders.values() if o["type"] == "MARKET"]
+
+
+def test_lost_response_is_found_by_client_id():
+    async def scenario(mock, client):
+        order = await client.market_order(SYMBOL, "BUY", 0.01, client_order_id="entry-1")
+        assert order["status"] == "FILLED"
+        assert mock.stats["lost"] == 1
+        return mock
+
+    mock = run(MockConfig(latency_ms=0, jitter_ms=0, lost_rate=1.0), scenario)
+    assert len(fills(mock)) == 1
+    assert mock.positions[SYMBOL] == pytest.approx(0.01)
+
+
+def test_attempt_times_out_but_the_order_was_accepted():
+    async def scenario(mock, client):
+        order = await client.market_order(SYMBOL, "BUY", 0.01)
+        assert mock.stats["stalled"] == 1
+        return mock, order
+
+    # executed at once, answered only after the attempt gave up
+    mock, order = run(MockConfig(latency_ms=0, jitter_ms=0, stall_rate=1.0, stall_ms=1000), scenario)
+    assert order["status"] == "FILLED"
+    assert len(fills(mock)) == 1
+
+
+def test_market_order_executing_after_the_lookup_is_not_doubled():
+    async def scenario(mock, client):
+        mock.config.late_rate = 1.0
+        order = await client.market_order(SYMBOL, "SELL", 0.01)
+        return mock, order
+
+    # the first lookup runs before the order lands; a filled MARKET order no longer blocks its
+    # client ID, so only waiting out the recvWindow keeps the retry from opening a second position
+    # (lands after the longest first backoff of 0.2s, but inside the 500ms recvWindow)
+    mock, order = run(MockConfig(latency_ms=0, jitter_ms=0, late_ms=300), scenario, attempt_timeout=0.5)
+    assert mock.stats["late"] == 1
+    assert order["status"] == "FILLED"
+    assert len(fills(mock)) == 1
+    assert mock.positions[SYMBOL] == pytest.approx(-0.01)
+
+
+def test_attempt_past_its_recv_window_never_executes():
+    async def scenario(mock, client):
+        with pytest.raises(StatusException):
+            await client.market_order(SYMBOL, "BUY", 0.01)
+        # let the last late attempt reach the matching engine too
+        await asyncio.sleep(0.6)
+        return mock
+
+    # every attempt lands after its 300ms recvWindow, so the exchange drops them all
+    mock = run(MockConfig(latency_ms=0, jitter_ms=0, late_rate=1.0, late_ms=500), scenario, entry_deadline=1.5)
+    assert mock.stats["expired"] == mock.stats["late"] >= 2
+    assert mock.orders == {}
+
+
+def test_rejection_is_not_retried():
+    async def scenario(mock, client):
+        with pytest.raises(StatusException) as exc:
+            await client.market_order(SYMBOL, "BUY", 0.01)
+        assert exc.value.code == -2010
+        return mock
+
+    mock = run(MockConfig(latency_ms=0, jitter_ms=0, reject_rate=1.0), scenario)
+    assert mock.stats["rejects"] == 1
+    assert mock.orders == {}
+
+
+def test_deadline_exceeded_gives_up_without_an_order():
+    async def scenario(mock, client):
+        started = time.monotonic()
+        with pytest.raises(StatusException) as exc:
+            await client.market_order(SYMBOL, "BUY", 0.01)
+        assert exc.value.status == 503
+        assert time.monotonic() - started < 1.0
+        return mock
+
+    mock = run(MockConfig(latency_ms=0, jitter_ms=0, error_rate=1.0), scenario, entry_deadline=0.8)
+    assert mock.stats["errors"] >= 1
+    assert mock.orders == {}
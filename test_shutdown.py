@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app import main
+from app.notifier import NotificationOutbox
+
+
+class FakeTelegram:
+    """Just enough of TelegramClient for run_telethon: sends fail once disconnected, like Telethon's."""
+
+    def __init__(self):
+        self.connected = True
+        self.sent: list[str] = []
+        self._disconnected = None
+
+    def add_event_handler(self, handler, event):
+        pass
+
+    async def start(self):
+        self._disconnected = asyncio.get_running_loop().create_future()
+
+    async def get_me(self):
+        class Me:
+            first_name, username = "test", "test"
+        return Me()
+
+    async def __call__(self, request):
+        return None
+
+    @property
+    def disconnected(self):
+        return asyncio.shield(self._disconnected)
+
+    async def run_until_disconnected(self):
+        # as Telethon 1.34 does it
+        try:
+            return await self.disconnected
+        finally:
+            await self.disconnect()
+
+    async def disconnect(self):
+        self.connected = False
+        if not self._disconnected.done():
+            self._disconnected.set_result(None)
+
+    async def send_message(self, chat_id, text):
+        if not self.connected:
+            raise ConnectionError("Cannot send requests while disconnected")
+        await asyncio.sleep(0.01)
+        self.sent.append(text)
+
+        class Sent:
+            id = len(self.sent)
+        return Sent()
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    client = FakeTelegram()
+    monkeypatch.setitem(main.container.__dict__, "tg_client", client)
+    monkeypatch.setitem(main.container.__dict__, "forwarder", None)
+    monkeypatch.setitem(main.container.__dict__, "outbox", NotificationOutbox(client, ["1"]))
+    return client
+
+
+def test_queued_notifications_go_out_before_disconnect_on_cancel(telegram):
+    async def scenario():
+        main.container.outbox.start()
+        task = asyncio.create_task(main.run_telethon())
+        await asyncio.sleep(0)
+        for i in range(3):
+            main.container.outbox.notify(f"line {i}")
+        # SIGTERM / Ctrl-C
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert telegram.sent == ["line 0", "line 1", "line 2"]
+    assert not telegram.connected